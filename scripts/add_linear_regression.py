@@ -6,7 +6,14 @@ add_linear_regression.py - Add linear regression function to database
 import os
 import sys
 import logging
-from pymongo import MongoClient
+
+# Make the AutoDS source tree importable
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "src"))
+
+from vector.embedding_store import compute_content_hash
+from catalog.param_schema import compile_param_schema
+from catalog.mongo_client import close_client, get_catalog, require_connection
 
 # Setup logging
 logging.basicConfig(
@@ -20,9 +27,8 @@ def add_linear_regression():
     """Add linear regression function directly to the functions_catalog"""
     try:
         # Connect to MongoDB
-        client = MongoClient("mongodb://localhost:27017/")
-        db = client["AutoDS"]
-        functions_catalog = db["functions_catalog"]
+        require_connection()
+        functions_catalog = get_catalog()
 
         # Check if linear regression function already exists
         lr_exists = functions_catalog.count_documents({
@@ -42,14 +48,16 @@ def add_linear_regression():
                     "language": "r",
                     "package": "stats",
                     "function_name": "lm",
-                    "arguments": ["formula", "data"],
-                    "defaults": ["", ""],
+                    "arguments": ["formula", "data", "..."],
+                    "defaults": ["", "", ""],
                     "signature": "stats::lm(formula, data, ...)",
                     "docstring": "Fits Linear Models. The lm function is used to fit linear models to data for linear regression analysis."
                 }
             }
 
             # Insert it into the database
+            lr_function["value"]["param_schema"] = compile_param_schema(lr_function["value"])
+            lr_function["content_hash"] = compute_content_hash(lr_function)
             functions_catalog.insert_one(lr_function)
             logger.info("Added linear regression function to database")
 
@@ -62,8 +70,8 @@ def add_linear_regression():
                     "language": "r",
                     "package": "stats",
                     "function_name": "lm",
-                    "arguments": ["formula", "data"],
-                    "defaults": ["", ""],
+                    "arguments": ["formula", "data", "..."],
+                    "defaults": ["", "", ""],
                     "signature": "stats::lm(formula, data, ...)",
                     "docstring": "Linear regression modeling for statistical analysis. Used to fit linear models to data."
                 }
@@ -74,8 +82,8 @@ def add_linear_regression():
                     "language": "r",
                     "package": "stats",
                     "function_name": "lm",
-                    "arguments": ["formula", "data"],
-                    "defaults": ["", ""],
+                    "arguments": ["formula", "data", "..."],
+                    "defaults": ["", "", ""],
                     "signature": "stats::lm(formula, data, ...)",
                     "docstring": "Fits a linear regression model using ordinary least squares."
                 }
@@ -85,6 +93,8 @@ def add_linear_regression():
         # Insert additional entries (skip if key already exists)
         for entry in additional_entries:
             if functions_catalog.count_documents({"key": entry["key"]}) == 0:
+                entry["value"]["param_schema"] = compile_param_schema(entry["value"])
+                entry["content_hash"] = compute_content_hash(entry)
                 functions_catalog.insert_one(entry)
                 logger.info(f"Added entry: {entry['key']}")
 
@@ -95,19 +105,21 @@ def add_linear_regression():
                 "language": "r",
                 "package": "stats",
                 "function_name": "lm",
-                "arguments": ["formula", "data"],
-                "defaults": ["", ""],
+                "arguments": ["formula", "data", "..."],
+                "defaults": ["", "", ""],
                 "signature": "stats::lm(formula, data, ...)",
                 "docstring": "Perform linear regression analysis using R's linear model function."
             }
         }
 
         if functions_catalog.count_documents({"key": special_entry["key"]}) == 0:
+            special_entry["value"]["param_schema"] = compile_param_schema(special_entry["value"])
+            special_entry["content_hash"] = compute_content_hash(special_entry)
             functions_catalog.insert_one(special_entry)
             logger.info("Added special entry for 'perform linear regression' query")
 
         logger.info("Linear regression functions successfully added/updated")
-        client.close()
+        close_client()
         return True
 
     except Exception as e:
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+benchmark_batch_search.py - Compare looping search_function over queries
+against one search_functions call for all of them
+
+Runs offline: a synthetic catalog (see benchmark_suite.py) is held in an
+in-memory stand-in for MongoDB, embedded with the local hashing embedder and
+indexed with vector_store.build_faiss_index. Both paths therefore do the same
+work per query - embedding, BM25 ranking, FAISS search, fusion and resolving
+matches from the doc store - and the query embedding, result and semantic
+caches are off so neither path is served from the other's work.
+
+Both paths are timed twice: once doing local work only, and once with
+--embed-latency-ms charged per embedding call to model the embedding API
+round trip (default 20ms; 0 skips this run). The simulated run mostly
+measures how many API calls batching saves, so the run fails only when the
+local-only batch path is less than --min-speedup times faster (default
+1.2x; 0 turns the check off).
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import logging
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "src"))
+
+from benchmark_suite import InMemoryClient, synthetic_catalog, synthetic_queries
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger("AutoDS")
+
+
+class SimulatedLatencyEmbedder:
+    """Wrap an embedding provider and sleep once per call to model an API round trip."""
+
+    def __init__(self, provider, latency_s):
+        self.provider = provider
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
+
+    def embed(self, texts):
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self.provider.embed(texts)
+
+
+def run_loop(vs, queries, top_k):
+    results = []
+    for query in queries:
+        matches = vs.search_function(query, top_k=top_k)
+        # top_k=1 returns the best match itself rather than a list
+        results.append([matches] if isinstance(matches, dict) else matches or [])
+    return results
+
+
+def run_batch(vs, queries, top_k, batch_size):
+    return vs.search_functions(queries, top_k=top_k, batch_size=batch_size)
+
+
+def measure(vs, provider, queries, args, latency_s):
+    """
+    Time the loop and batch paths with latency_s charged per embedding call.
+    """
+    vs.embedding_provider = embedder = SimulatedLatencyEmbedder(provider, latency_s)
+    start = time.perf_counter()
+    loop_results = run_loop(vs, queries, args.top_k)
+    loop_seconds = time.perf_counter() - start
+    loop_calls = embedder.calls
+
+    vs.embedding_provider = embedder = SimulatedLatencyEmbedder(provider, latency_s)
+    start = time.perf_counter()
+    batch_results = run_batch(vs, queries, args.top_k, args.batch_size)
+    batch_seconds = time.perf_counter() - start
+    vs.embedding_provider = provider
+
+    agreement = sum(bool(a) and bool(b) and a[0]["key"] == b[0]["key"]
+                    for a, b in zip(loop_results, batch_results)) / len(queries)
+    return {
+        "loop_seconds": loop_seconds,
+        "batch_seconds": batch_seconds,
+        "loop_calls": loop_calls,
+        "batch_calls": embedder.calls,
+        "speedup": loop_seconds / batch_seconds if batch_seconds else float("inf"),
+        "agreement": agreement
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog-size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dimension", type=int, default=256, help="Hashing embedder dimension")
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0,
+                        help="Simulated round-trip latency charged per embedding call in the second run "
+                             "(0 skips it)")
+    parser.add_argument("--min-speedup", type=float, default=1.2,
+                        help="Exit non-zero if the local-only batch path is not at least this much faster "
+                             "(0 disables)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vector_dir = tempfile.mkdtemp(prefix="autods-batch-bench-")
+    # Settings are read when the modules are imported, so they go first
+    os.environ.update({
+        "AUTODS_EMBEDDING_BACKEND": "hashing",
+        "AUTODS_EMBEDDING_MODEL": str(args.dimension),
+        "AUTODS_VECTOR_DIR": vector_dir,
+        "AUTODS_EMBEDDING_CACHE": "",
+        "AUTODS_EMBEDDING_CACHE_MEMORY": "0",
+        "AUTODS_RESULT_CACHE_SIZE": "0",
+        "AUTODS_SEMANTIC_CACHE_THRESHOLD": "0",
+        "AUTODS_TRACE": "0"
+    })
+
+    from catalog.mongo_client import get_catalog, set_client
+    set_client(InMemoryClient())
+    import vector.vector_store as vs
+
+    try:
+        catalog = synthetic_catalog(args.catalog_size, args.seed)
+        get_catalog().insert_many([dict(entry) for entry in catalog])
+        logger.info(f"Building flat index over {len(catalog)} synthetic functions")
+        vs.save_faiss_index(*vs.build_faiss_index("flat"))
+        vs.index_manager.snapshot()
+        queries = synthetic_queries(catalog, args.queries, args.seed + 1)
+
+        # Per-query log lines would dominate the loop's timing
+        logger.setLevel(logging.WARNING)
+        provider = vs.embedding_provider
+        local = measure(vs, provider, queries, args, 0.0)
+        simulated = measure(vs, provider, queries, args, args.embed_latency_ms / 1000.0) \
+            if args.embed_latency_ms else None
+    finally:
+        logger.setLevel(logging.INFO)
+        shutil.rmtree(vector_dir, ignore_errors=True)
+
+    for label, run in (("Local only", local), (f"With {args.embed_latency_ms:g}ms embedding latency", simulated)):
+        if run is None:
+            continue
+        logger.info(f"{label}:")
+        logger.info(f"  Loop:  {run['loop_seconds']:.3f}s, {len(queries) / run['loop_seconds']:.1f} queries/s, "
+                    f"{run['loop_calls']} embedding calls")
+        logger.info(f"  Batch: {run['batch_seconds']:.3f}s, {len(queries) / run['batch_seconds']:.1f} queries/s, "
+                    f"{run['batch_calls']} embedding calls")
+        logger.info(f"  Speedup: {run['speedup']:.2f}x (top-1 agreement {run['agreement']:.1%})")
+
+    if args.min_speedup and local["speedup"] < args.min_speedup:
+        logger.error(f"Local-only batch search speedup {local['speedup']:.2f}x "
+                     f"is below the required {args.min_speedup:.2f}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+benchmark_import_time.py - Guard the startup cost of importing AutoDS
+
+Imports each module in a fresh interpreter under `python -X importtime`,
+takes the median cumulative import time over several runs, and fails if it
+is over budget or if any heavy dependency (FAISS, OpenAI, rpy2/R, NumPy,
+pymongo) was imported eagerly. These belong to the first query, not to
+startup.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import logging
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger("AutoDS")
+
+DEFAULT_MODULES = ["agent.agent"]
+HEAVY_MODULES = ["faiss", "openai", "rpy2", "numpy", "pymongo"]
+
+
+def import_profile(module):
+    """
+    Import module in a fresh interpreter and return {imported module:
+    (self µs, cumulative µs)} for the modules its import pulled in, parsed
+    from the -X importtime report (which also covers interpreter startup).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.getenv("PYTHONPATH")])))
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr.strip().splitlines()[-1]}")
+    # Lines come in post-order, so a top-level import follows everything it imported
+    block = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        block[name.strip()] = (int(self_us), int(cumulative_us))
+        if name.startswith("  "):
+            continue
+        if name.strip() == module:
+            return block
+        block = {}
+    raise RuntimeError(f"import {module} did not appear in the -X importtime report")
+
+
+def measure(module, runs):
+    """
+    Median cumulative import time of module in ms over runs, with the
+    profile of the last run.
+    """
+    times = []
+    profile = {}
+    for _ in range(runs):
+        profile = import_profile(module)
+        times.append(profile[module][1] / 1000.0)
+    return statistics.median(times), profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import (default: agent.agent)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module; the median is reported")
+    parser.add_argument("--budget-ms", type=float, default=250.0,
+                        help="Exit non-zero if a module's median import time exceeds this")
+    parser.add_argument("--allow", action="append", default=[],
+                        help="Heavy module that may be imported eagerly (repeatable)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per module")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON to PATH")
+    args = parser.parse_args()
+
+    forbidden = [name for name in HEAVY_MODULES if name not in args.allow]
+    results = {}
+    failed = False
+    for module in args.modules:
+        try:
+            median_ms, profile = measure(module, args.runs)
+        except RuntimeError as e:
+            logger.error(str(e))
+            results[module] = {"error": str(e)}
+            failed = True
+            continue
+        eager = sorted(name for name in forbidden if name in profile)
+        slowest = sorted(profile.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+        results[module] = {
+            "median_ms": round(median_ms, 2),
+            "budget_ms": args.budget_ms,
+            "eager_heavy_imports": eager,
+            "slowest": [{"module": name, "cumulative_ms": round(cumulative / 1000.0, 2)}
+                        for name, (_, cumulative) in slowest]
+        }
+
+        logger.info(f"import {module}: {median_ms:.1f}ms median over {args.runs} runs (budget {args.budget_ms:.0f}ms)")
+        for name, (_, cumulative) in slowest:
+            logger.info(f"  {cumulative / 1000.0:8.1f}ms  {name}")
+        if median_ms > args.budget_ms:
+            logger.error(f"import {module} takes {median_ms:.1f}ms, over the {args.budget_ms:.0f}ms budget")
+            failed = True
+        if eager:
+            logger.error(f"import {module} eagerly imports {', '.join(eager)}; import them on first use")
+            failed = True
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
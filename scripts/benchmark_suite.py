@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+benchmark_suite.py - Offline benchmark of the AutoDS hot paths
+
+Builds an index over a synthetic catalog (10k, 100k or 1M functions) held in
+an in-memory stand-in for MongoDB, embedded with the deterministic local
+hashing embedder, then times each stage on generated queries:
+
+  search        search_function on natural-language queries (caches off)
+  search_batch  search_functions over batches of the same queries (caches
+                off, so none are served from the search stage's work)
+  inference     infer_parameters for matched catalog entries
+  r_args        R argument conversion in r_exec (skipped without rpy2)
+  python_exec   execute_python_function on a small statistics call
+  pipeline      process_query end to end on real Python functions
+
+Throughput and p50/p95/p99 latencies are printed and written as JSON.
+Passing an earlier run's JSON to --compare prints the change per stage.
+
+Usage:
+    python scripts/benchmark_suite.py --size 100k --output bench.json
+    python scripts/benchmark_suite.py --size 100k --output new.json --compare bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import itertools
+import shutil
+import argparse
+import platform
+import tempfile
+import logging
+from datetime import datetime, timezone
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "src"))
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger("AutoDS")
+
+SIZES = {"10k": 10000, "100k": 100000, "1m": 1000000}
+
+WORDS = [
+    "linear", "regression", "model", "test", "correlation", "cluster", "kmeans", "tree", "forest",
+    "matrix", "mean", "variance", "fit", "predict", "transform", "sample", "distribution", "normal",
+    "density", "plot", "series", "frame", "array", "sparse", "quantile", "smooth", "kernel", "logistic",
+    "bootstrap", "residual", "estimate", "covariance", "principal", "component", "survival", "hazard"
+]
+VERBS = ["fit", "compute", "estimate", "plot", "test", "transform", "summarize", "predict", "sample", "score"]
+PACKAGE_STEMS = ["stats", "learn", "plotlib", "timeseries", "survive", "cluster", "linalg", "bayes"]
+ARG_NAMES = ["x", "y", "data", "formula", "weights", "method", "alpha", "n", "axis", "k", "na_rm", "seed"]
+
+# Real functions mixed into the catalog so the pipeline stage can execute
+# what it finds
+REAL_FUNCTIONS = [
+    ("statistics", "mean", "Return the sample arithmetic mean of data", "arithmetic mean of the data"),
+    ("statistics", "median", "Return the median (middle value) of numeric data", "median middle value of the data"),
+    ("statistics", "variance", "Return the sample variance of data", "sample variance of the data"),
+    ("statistics", "pstdev", "Return the population standard deviation of data", "population standard deviation"),
+]
+
+
+class InMemoryCollection:
+    """
+    The subset of a pymongo Collection that AutoDS uses to read the catalog:
+    find / find_one / count_documents with equality and $in filters on
+    (dotted) fields, inclusion projections, and insert_many.
+    """
+
+    def __init__(self):
+        self.documents = []
+
+    @staticmethod
+    def _field(document, path):
+        for part in path.split("."):
+            if not isinstance(document, dict) or part not in document:
+                return None
+            document = document[part]
+        return document
+
+    def _matches(self, document, query):
+        for path, condition in (query or {}).items():
+            value = self._field(document, path)
+            if isinstance(condition, dict) and "$in" in condition:
+                if value not in condition["$in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    @staticmethod
+    def _project(document, projection):
+        if not projection:
+            return dict(document)
+        return {name: document[name] for name in ["_id", *projection]
+                if name in document and projection.get(name, 1)}
+
+    def insert_many(self, documents):
+        for document in documents:
+            document.setdefault("_id", len(self.documents))
+            self.documents.append(document)
+
+    def find(self, query=None, projection=None):
+        if query and set(query) == {"key"} and isinstance(query["key"], dict):
+            wanted = set(query["key"]["$in"])
+            return [self._project(doc, projection) for doc in self.documents if doc.get("key") in wanted]
+        return [self._project(doc, projection) for doc in self.documents if self._matches(doc, query)]
+
+    def find_one(self, query=None, projection=None):
+        return next(iter(self.find(query, projection)), None)
+
+    def count_documents(self, query):
+        return sum(1 for doc in self.documents if self._matches(doc, query))
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name):
+        return self._collections.setdefault(name, InMemoryCollection())
+
+    def list_collection_names(self):
+        return list(self._collections)
+
+
+class _Admin:
+    def command(self, name):
+        return {"ok": 1.0}
+
+
+class InMemoryClient:
+    """
+    Stands in for MongoClient via catalog.mongo_client.set_client().
+    """
+
+    def __init__(self):
+        self._databases = {}
+        self.admin = _Admin()
+
+    def __getitem__(self, name):
+        return self._databases.setdefault(name, InMemoryDatabase())
+
+    def close(self):
+        pass
+
+
+def parse_size(text):
+    text = text.lower()
+    if text in SIZES:
+        return SIZES[text]
+    return int(text)
+
+
+def synthetic_entry(rng, i):
+    language = "r" if i % 3 == 0 else "python"
+    package = f"{rng.choice(PACKAGE_STEMS)}{i % 500}"
+    function_name = f"{rng.choice(VERBS)}_{rng.choice(WORDS)}_{i}"
+    docstring = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 15))).capitalize()
+    names = rng.sample(ARG_NAMES, rng.randint(1, 5))
+    defaults = ["" if j == 0 or rng.random() < 0.3 else rng.choice(["NULL", "1", "0.05", "TRUE"])
+                for j in range(len(names))]
+    if language == "r":
+        value = {"language": "r", "package": package, "function_name": function_name,
+                 "arguments": names, "defaults": defaults,
+                 "signature": f"{package}::{function_name}({', '.join(names)})", "docstring": docstring}
+        key = f"R: {package}::{function_name} - {docstring[:100]}"
+    else:
+        value = {"language": "python", "package": package, "function_name": function_name,
+                 "parameters": [{"name": name, "kind": "POSITIONAL_OR_KEYWORD", "default": default or None}
+                                for name, default in zip(names, defaults)],
+                 "signature": f"{function_name}({', '.join(names)})", "docstring": docstring}
+        key = f"Python: {package}.{function_name} - {docstring[:100]}"
+    return {"key": key, "value": value}
+
+
+def real_entry(package, function_name, docstring):
+    return {
+        "key": f"Python: {package}.{function_name} - {docstring}",
+        "value": {"language": "python", "package": package, "function_name": function_name,
+                  "parameters": [{"name": "data", "kind": "POSITIONAL_OR_KEYWORD", "default": None}],
+                  "signature": f"{function_name}(data)", "docstring": docstring}
+    }
+
+
+def synthetic_catalog(size, seed):
+    """
+    size catalog documents shaped like unify_database.py output, the real
+    functions first.
+    """
+    from catalog.param_schema import compile_param_schema
+    from vector.embedding_store import compute_content_hash
+
+    rng = random.Random(seed)
+    entries = [real_entry(package, name, doc) for package, name, doc, _ in REAL_FUNCTIONS]
+    entries += [synthetic_entry(rng, i) for i in range(max(size - len(entries), 0))]
+    for entry in entries:
+        entry["value"]["param_schema"] = compile_param_schema(entry["value"])
+        entry["content_hash"] = compute_content_hash(entry)
+    return entries
+
+
+def synthetic_queries(catalog, count, seed):
+    """
+    Paraphrase-like queries: a few words of a random entry's docstring, with
+    a verb in front, so each one has a plausible best match.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = catalog[rng.randrange(len(catalog))]["value"]["docstring"].lower().split()
+        picked = rng.sample(words, min(len(words), rng.randint(2, 5)))
+        queries.append(f"{rng.choice(VERBS)} {' '.join(picked)}")
+    return queries
+
+
+def summarize(latencies, items=None, elapsed=None):
+    """
+    Throughput and latency percentiles (ms) for one stage. items is the
+    number of operations when a sample covers more than one (batches).
+    """
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000.0
+    elapsed = elapsed if elapsed is not None else latencies.sum() / 1000.0
+    items = items if items is not None else len(latencies)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "count": items,
+        "samples": len(latencies),
+        "throughput_per_second": round(items / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(float(latencies.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(latencies.max()), 4)
+    }
+
+
+def timed(function, inputs):
+    latencies = []
+    start = time.perf_counter()
+    for item in inputs:
+        call_start = time.perf_counter()
+        function(item)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+def bench_search(vs, queries, top_k):
+    latencies, elapsed = timed(lambda query: vs.search_function(query, top_k=top_k), queries)
+    return summarize(latencies, elapsed=elapsed)
+
+
+def bench_search_batch(vs, queries, top_k, batch_size):
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+    latencies, elapsed = timed(lambda batch: vs.search_functions(batch, top_k=top_k, batch_size=batch_size), batches)
+    return summarize(latencies, items=len(queries), elapsed=elapsed)
+
+
+def bench_inference(agent, catalog, queries, rng):
+    cases = []
+    for query in queries:
+        entry = catalog[rng.randrange(len(catalog))]
+        args = {name: 1 for name in entry["value"]["param_schema"]["required"]}
+        cases.append(({"key": entry["key"], "value": entry["value"]}, query, args))
+    latencies, elapsed = timed(lambda case: agent.infer_parameters(*case), cases)
+    return summarize(latencies, elapsed=elapsed)
+
+
+def bench_r_args(iterations, rng):
+    try:
+        from execution.r_exec import convert_r_args
+        import rpy2.robjects  # noqa: F401 - boots R outside the timed loop
+    except ImportError as e:
+        return {"skipped": f"rpy2 is not available ({e})"}
+    cases = []
+    for _ in range(iterations):
+        rows = [[rng.random(), rng.random()] for _ in range(50)]
+        cases.append(rng.choice([
+            ({"formula": "y ~ x", "data": rows}, "lm"),
+            ({"x": [rng.random() for _ in range(200)]}, "sd"),
+            ({"x": rows}, "cor"),
+            ({"formula": "mpg ~ wt", "data": "mtcars"}, "lm")
+        ]))
+    latencies, elapsed = timed(lambda case: convert_r_args(*case), cases)
+    return summarize(latencies, elapsed=elapsed)
+
+
+def bench_python_exec(iterations, rng):
+    from execution.python_exec import execute_python_function
+    details = {"package": "statistics", "function_name": "mean"}
+    inputs = [{"data": [rng.random() for _ in range(100)]} for _ in range(iterations)]
+    latencies, elapsed = timed(lambda args: execute_python_function(details, args), inputs)
+    return summarize(latencies, elapsed=elapsed)
+
+
+def bench_pipeline(agent, iterations, rng):
+    inputs = [(rng.choice(REAL_FUNCTIONS)[3], {"data": [rng.random() for _ in range(20)]}) for _ in range(iterations)]
+    failures = []
+
+    def run(case):
+        if not agent.process_query(*case).get("success"):
+            failures.append(case[0])
+
+    latencies, elapsed = timed(run, inputs)
+    summary = summarize(latencies, elapsed=elapsed)
+    summary["failures"] = len(failures)
+    return summary
+
+
+def compare(results, baseline_path):
+    """
+    Log the change of each stage against an earlier run, as new/old ratios
+    of the latency percentiles and of throughput.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    logger.info(f"Compared with {baseline_path} ({baseline.get('created', 'unknown time')}):")
+    for stage, new in results["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if not old or "p50_ms" not in old or "p50_ms" not in new:
+            continue
+        ratios = []
+        for field in ("p50_ms", "p95_ms", "p99_ms", "throughput_per_second"):
+            ratios.append(f"{field[:-3] if field.endswith('_ms') else 'throughput'} "
+                          f"{new[field] / old[field] if old[field] else float('inf'):.2f}x")
+        logger.info(f"  {stage:<13} {', '.join(ratios)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k", help="Catalog size: 10k, 100k, 1m or a number")
+    parser.add_argument("--queries", type=int, default=500, help="Queries per search stage")
+    parser.add_argument("--iterations", type=int, default=500, help="Calls per inference/execution stage")
+    parser.add_argument("--pipeline-queries", type=int, default=100, help="End-to-end process_query calls")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dimension", type=int, default=256, help="Hashing embedder dimension")
+    parser.add_argument("--index-type", default="flat", help="Index type to build (flat, hnsw, ivf, ivfpq)")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_false", help="Skip duplicate collapsing at build")
+    parser.add_argument("--warm-caches", action="store_true",
+                        help="Keep the query embedding, result and semantic caches on during search stages")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed queries before the search stages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", metavar="PATH", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    vector_dir = tempfile.mkdtemp(prefix="autods-bench-")
+    # Settings are read when the modules are imported, so they go first
+    os.environ.update({
+        "AUTODS_EMBEDDING_BACKEND": "hashing",
+        "AUTODS_EMBEDDING_MODEL": str(args.dimension),
+        "AUTODS_VECTOR_DIR": vector_dir,
+        "AUTODS_EMBEDDING_CACHE": "",
+        "AUTODS_TRACE": "0",
+        "AUTODS_EXEC_CACHE": "0"
+    })
+    if not args.warm_caches:
+        os.environ.update({"AUTODS_EMBEDDING_CACHE_MEMORY": "0", "AUTODS_RESULT_CACHE_SIZE": "0",
+                           "AUTODS_SEMANTIC_CACHE_THRESHOLD": "0"})
+
+    from catalog.mongo_client import get_catalog, set_client
+    set_client(InMemoryClient())
+    import vector.vector_store as vs
+    import agent.agent as agent
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "config": {**vars(args), "size": size},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "build": {},
+        "stages": {}
+    }
+    try:
+        start = time.perf_counter()
+        catalog = synthetic_catalog(size, args.seed)
+        get_catalog().insert_many([dict(entry) for entry in catalog])
+        results["build"]["catalog_seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"Generated {len(catalog)} catalog entries in {results['build']['catalog_seconds']}s")
+
+        start = time.perf_counter()
+        index, documents, function_map, build_info = vs.build_faiss_index(args.index_type, {"dedup": args.dedup})
+        vs.save_faiss_index(index, documents, function_map, build_info)
+        results["build"]["index_seconds"] = round(time.perf_counter() - start, 3)
+        results["build"]["index_bytes"] = build_info.get("index_bytes")
+
+        start = time.perf_counter()
+        vs.index_manager.snapshot()
+        results["build"]["index_load_seconds"] = round(time.perf_counter() - start, 3)
+
+        # Per-call log lines would dominate the timings
+        logger.setLevel(logging.WARNING)
+        rng = random.Random(args.seed)
+        queries = synthetic_queries(catalog, args.queries + args.warmup, args.seed + 1)
+        for query in queries[:args.warmup]:
+            vs.search_function(query, top_k=args.top_k)
+        queries = queries[args.warmup:]
+
+        stages = results["stages"]
+        stages["search"] = bench_search(vs, queries, args.top_k)
+        stages["search_batch"] = bench_search_batch(vs, queries, args.top_k, args.batch_size)
+        stages["inference"] = bench_inference(agent, catalog, itertools.islice(itertools.cycle(queries), args.iterations), rng)
+        stages["r_args"] = bench_r_args(args.iterations, rng)
+        stages["python_exec"] = bench_python_exec(args.iterations, rng)
+        stages["pipeline"] = bench_pipeline(agent, args.pipeline_queries, rng)
+    finally:
+        logger.setLevel(logging.INFO)
+        shutil.rmtree(vector_dir, ignore_errors=True)
+
+    logger.info(f"Catalog of {size} functions, {args.index_type} index built in {results['build']['index_seconds']}s")
+    for stage, summary in results["stages"].items():
+        if "skipped" in summary:
+            logger.info(f"  {stage:<13} skipped: {summary['skipped']}")
+            continue
+        logger.info(f"  {stage:<13} {summary['throughput_per_second']:>10.1f}/s  p50 {summary['p50_ms']:.3f}ms  "
+                    f"p95 {summary['p95_ms']:.3f}ms  p99 {summary['p99_ms']:.3f}ms")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Wrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
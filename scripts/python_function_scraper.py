@@ -52,9 +52,14 @@ for package in required_packages:
 
 # Now import after ensuring they're installed
 import numpy as np
-from pymongo import MongoClient, errors
 from dotenv import load_dotenv
 
+# Make the AutoDS source tree importable
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "src"))
+
+from catalog.mongo_client import close_client, get_collection, require_connection
+
 # Try to import faiss
 try:
     import faiss
@@ -84,20 +89,6 @@ else:
     logger.warning("OpenAI API key not found in environment variables.")
 
 
-# MongoDB connection with retry
-def get_mongo_client(max_retries=3):
-    for attempt in range(max_retries):
-        try:
-            return MongoClient("mongodb://localhost:27017/", maxPoolSize=50)
-        except errors.ConnectionFailure as e:
-            if attempt < max_retries - 1:
-                logger.warning(f"MongoDB connection attempt {attempt + 1} failed: {e}. Retrying...")
-                time.sleep(2)
-            else:
-                logger.error(f"Failed to connect to MongoDB after {max_retries} attempts: {e}")
-                raise
-
-
 # Core Python packages needed for AutoDS
 AUTODS_PYTHON_PACKAGES = [
     # Core data science
@@ -293,9 +284,7 @@ def store_functions_mongo(functions):
         return 0
 
     try:
-        client = get_mongo_client()
-        db = client["AutoDS"]
-        collection = db["python_functions"]
+        collection = get_collection("python_functions")
 
         # Insert in batches to avoid issues with large datasets
         batch_size = 100
@@ -309,7 +298,6 @@ def store_functions_mongo(functions):
             except Exception as e:
                 logger.error(f"Error in batch insertion: {e}")
 
-        client.close()
         return inserted_count
 
     except Exception as e:
@@ -321,9 +309,7 @@ def store_functions_mongo(functions):
 def add_linear_regression_functions():
     """Add specific linear regression functions to ensure they're available"""
     try:
-        client = get_mongo_client()
-        db = client["AutoDS"]
-        collection = db["python_functions"]
+        collection = get_collection("python_functions")
 
         # Check if we need to add sklearn LinearRegression
         lr_exists = collection.count_documents({
@@ -378,8 +364,6 @@ def add_linear_regression_functions():
             collection.insert_one(linregress_function)
             logger.info("Added scipy.stats.linregress to database")
 
-        client.close()
-
     except Exception as e:
         logger.error(f"Error adding linear regression functions: {e}")
 
@@ -389,10 +373,11 @@ def main():
     logger.info("Starting AutoDS database expansion for Python functions")
 
     try:
+        # Fail now, not after scraping, if MongoDB is down
+        require_connection()
+
         # Clear existing data
-        client = get_mongo_client()
-        db = client["AutoDS"]
-        collection = db["python_functions"]
+        collection = get_collection("python_functions")
 
         before_count = collection.count_documents({})
         logger.info(f"Current Python function count: {before_count}")
@@ -400,8 +385,6 @@ def main():
         collection.delete_many({})
         logger.info("Cleared existing Python functions")
 
-        client.close()
-
         # Get list of packages to process
         packages = get_available_packages()
         logger.info(f"Found {len(packages)} packages to process")
@@ -448,6 +431,8 @@ def main():
     except Exception as e:
         logger.error(f"Error in main function: {e}")
         logger.error(traceback.format_exc())
+    finally:
+        close_client()
 
 
 if __name__ == "__main__":
@@ -8,10 +8,12 @@ import sys
 import logging
 import subprocess
 import time
-from pymongo import MongoClient
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 os.chdir(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "src"))
+
+from catalog.mongo_client import CatalogUnavailableError, require_connection
 
 # Setup logging
 logging.basicConfig(
@@ -29,13 +31,11 @@ def check_mongodb():
     """Check if MongoDB is running and accessible"""
     logger.info("Checking MongoDB connection...")
     try:
-        client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=5000)
-        client.server_info()  # Will raise exception if connection fails
+        require_connection()
         logger.info("✓ MongoDB is running and accessible")
         return True
-    except Exception as e:
+    except CatalogUnavailableError as e:
         logger.error(f"✗ MongoDB connection failed: {e}")
-        logger.error("Please make sure MongoDB is running on localhost:27017")
         return False
 
 
@@ -3,7 +3,14 @@
 import os
 import sys
 import logging
-from pymongo import MongoClient
+
+# Make the AutoDS source tree importable
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PROJECT_ROOT, "src"))
+
+from vector.embedding_store import compute_content_hash
+from catalog.param_schema import ParameterError, check_arguments, compile_param_schema, get_param_schema
+from catalog.mongo_client import close_client, get_database, require_connection
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -15,8 +22,8 @@ def unify_database():
     Unify Python and R functions into a consistent format in the
     'functions_catalog' collection. This catalog is used for vector search.
     """
-    client = MongoClient("mongodb://localhost:27017/")
-    db = client["AutoDS"]
+    require_connection()
+    db = get_database()
 
     # 1) Pull all Python function documents
     python_functions = list(db.python_functions.find({}))
@@ -55,6 +62,7 @@ def unify_database():
             "value": {
                 "language": "python",
                 "package": package,
+                "module": func.get("module", package),
                 "function_name": func_name,
                 "arguments": [p.get("name", "") for p in parameters],
                 "defaults": default_values,
@@ -107,8 +115,8 @@ def unify_database():
                 "language": "r",
                 "package": "stats",
                 "function_name": "lm",
-                "arguments": ["formula", "data"],
-                "defaults": ["", ""],
+                "arguments": ["formula", "data", "..."],
+                "defaults": ["", "", ""],
                 "signature": "stats::lm(formula, data, ...)",
                 "docstring": "Fits Linear Models. The lm function is used to fit linear models."
             }
@@ -122,8 +130,8 @@ def unify_database():
                 "language": "r",
                 "package": "stats",
                 "function_name": "lm",
-                "arguments": ["formula", "data"],
-                "defaults": ["", ""],
+                "arguments": ["formula", "data", "..."],
+                "defaults": ["", "", ""],
                 "signature": "stats::lm(formula, data, ...)",
                 "docstring": "Linear regression modeling for statistical analysis. Used to fit linear models to data."
             }
@@ -134,8 +142,8 @@ def unify_database():
                 "language": "r",
                 "package": "stats",
                 "function_name": "t.test",
-                "arguments": ["x", "y"],
-                "defaults": ["", "NULL"],
+                "arguments": ["x", "y", "..."],
+                "defaults": ["", "NULL", ""],
                 "signature": "stats::t.test(x, y = NULL, ...)",
                 "docstring": "Student's t-test for comparing means between samples."
             }
@@ -146,8 +154,8 @@ def unify_database():
                 "language": "r",
                 "package": "stats",
                 "function_name": "cor",
-                "arguments": ["x", "y"],
-                "defaults": ["", "NULL"],
+                "arguments": ["x", "y", "..."],
+                "defaults": ["", "NULL", ""],
                 "signature": "stats::cor(x, y = NULL, ...)",
                 "docstring": "Correlation coefficient calculation between variables."
             }
@@ -158,8 +166,14 @@ def unify_database():
     r_catalog.extend(common_tasks)
     logger.info(f"Added {len(common_tasks)} explicit entries for common data science tasks")
 
-    # 8) Merge and insert into 'functions_catalog'
+    # 8) Merge and insert into 'functions_catalog'. Each entry gets its
+    # normalized parameter schema, so the agent checks arguments with a
+    # dictionary lookup, and a content hash so vector_store.py --update only
+    # re-embeds what changed
     all_catalog = python_catalog + r_catalog
+    for entry in all_catalog:
+        entry["value"]["param_schema"] = compile_param_schema(entry["value"])
+        entry["content_hash"] = compute_content_hash(entry)
     if all_catalog:
         db.functions_catalog.insert_many(all_catalog)
         logger.info(f"Inserted {len(all_catalog)} total functions into 'functions_catalog'")
@@ -187,11 +201,16 @@ def unify_database():
     lm_check = db.functions_catalog.find_one({"value.package": "stats", "value.function_name": "lm"})
     if lm_check:
         logger.info("✓ stats::lm function found in database")
+        try:
+            check_arguments(get_param_schema(lm_check["value"]), {"formula": "y ~ x", "data": "mtcars"})
+            logger.info("✓ stats::lm accepts {formula, data}")
+        except ParameterError as e:
+            logger.warning(f"⚠ stats::lm rejects {{formula, data}}: {e}")
     else:
         logger.warning("⚠ stats::lm function not found in database!")
 
     # 12) Cleanup
-    client.close()
+    close_client()
 
 
 if __name__ == "__main__":
@@ -2,29 +2,32 @@
 import sys
 import os
 import logging
-from pymongo import MongoClient
 import json
+import asyncio
+import threading
 import traceback
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Ensure we can import from sibling folders
 script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
 sys.path.append(parent_dir)
 
-# Import the vector search function
-from vector.vector_store import search_function
+# The vector search (FAISS, NumPy, the embedding client) is imported on the
+# first query, so the CLI starts without loading it
 from execution.python_exec import execute_python_function
-from execution.r_exec import execute_r_function
+from execution.r_exec import execute_r_function, loaded_packages as r_loaded_packages
+from execution.result_cache import DEFAULT_PURE_FUNCTIONS, ExecutionCache
+from agent import metrics
+from agent.tracing import span, start_trace
+from catalog.param_schema import ParameterError, check_arguments, get_param_schema
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AutoDS")
 
-# Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["AutoDS"]
-functions_catalog = db["functions_catalog"]
-
 
 def generate_code_snippet(function_details, args):
     """
@@ -74,156 +77,264 @@ def generate_code_snippet(function_details, args):
 
 def infer_parameters(function_details, query, provided_args):
     """
-    Intelligently fill in missing function parameters based on the function's
-    defined arguments and any provided user-supplied values.
+    Fill in the call arguments from the user's args and the function's
+    parameter schema (precomputed by unify_database.py; see param_schema).
+    Raises ParameterError for unknown or missing arguments, before anything
+    is imported or sent to R.
     """
-    language = function_details["value"]["language"]
-    package = function_details["value"]["package"]
-    func_name = function_details["value"]["function_name"]
-    logger.info(f"Inferring parameters for {language} function: {package}.{func_name}")
-
-    # Extract function arguments
-    if language == "python":
-        fn_args = [param.get("name", "") for param in function_details["value"].get("parameters", [])]
-        defaults = [param.get("default", None) for param in function_details["value"].get("parameters", [])]
-    else:  # R
-        fn_args = function_details["value"].get("arguments", [])
-        defaults = function_details["value"].get("defaults", [])
-
-    # If no arguments found, use empty lists
-    if not fn_args:
-        fn_args = []
-    if not defaults:
-        defaults = [""] * len(fn_args)
-
-    logger.info(f"Function arguments: {fn_args}")
-    logger.info(f"Default values: {defaults}")
-
-    # Build a dictionary of required parameters (those with no default)
-    required_args = {}
-    for i, arg in enumerate(fn_args):
-        default_val = defaults[i] if i < len(defaults) else None
-        if not default_val or default_val in ["", "None", "NULL"]:
-            required_args[arg] = None
-
-    logger.info(f"Required arguments: {list(required_args.keys())}")
-
-    final_args = {}
-    # First, assign user-supplied parameters matching the required args
-    for req_arg in required_args:
-        if req_arg in provided_args:
-            final_args[req_arg] = provided_args[req_arg]
-
-    # Include any additional provided arguments
-    for arg, val in provided_args.items():
-        if arg not in final_args:
-            final_args[arg] = val
+    value = function_details["value"]
+    language = value["language"]
+    logger.info(f"Inferring parameters for {language} function: {value['package']}.{value['function_name']}")
+    schema = get_param_schema(value)
 
     # For linear regression, ensure we have formula and data
+    suggested = {}
     if "linear regression" in query.lower():
-        if language == "r" and "formula" not in final_args:
-            final_args["formula"] = "y ~ x"
-
-        # If data is missing and required, supply a default
-        if "data" in required_args and "data" not in final_args:
-            if language == "r":
-                final_args["data"] = "mtcars"  # a common default dataset in R
-            else:
-                # For Python, provide a simple numpy array
-                final_args["data"] = [[1, 2], [2, 3], [3, 4]]
-
+        if language == "r" and "formula" in schema["names"]:
+            suggested["formula"] = "y ~ x"
+        if "data" in schema["names"] and "data" not in schema["defaults"]:
+            # mtcars is a common default dataset in R; Python gets a small array
+            suggested["data"] = "mtcars" if language == "r" else [[1, 2], [2, 3], [3, 4]]
+
+    final_args = {**suggested, **provided_args}
+    check_arguments(schema, final_args)
     logger.info(f"Final inferred arguments: {final_args}")
     return final_args
 
 
-def find_r_linear_model_function():
-    """Find the R linear model function directly from the database"""
-    # First, look for exact matches for stats::lm
-    r_lm = functions_catalog.find_one({"value.package": "stats", "value.function_name": "lm"})
+# Opt-in memoization of allowlisted pure functions (AUTODS_EXEC_CACHE=1);
+# AUTODS_EXEC_CACHE_ALLOW adds comma-separated names such as
+# "r:stats::cor" or "python:mypkg.*" to the built-in allowlist, and
+# AUTODS_EXEC_CACHE_PATH keeps results in an SQLite file across restarts
+execution_cache = ExecutionCache(
+    enabled=os.getenv("AUTODS_EXEC_CACHE", "0") == "1",
+    max_entries=int(os.getenv("AUTODS_EXEC_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("AUTODS_EXEC_CACHE_TTL", "3600")),
+    db_path=os.getenv("AUTODS_EXEC_CACHE_PATH"),
+    allowlist=DEFAULT_PURE_FUNCTIONS + tuple(
+        name.strip() for name in os.getenv("AUTODS_EXEC_CACHE_ALLOW", "").split(",") if name.strip()
+    )
+)
 
-    if r_lm:
-        logger.info("Found stats::lm function directly from database")
-        return {
-            "key": r_lm["key"],
-            "value": r_lm["value"]
-        }
 
-    # Try searching with regex for similar function names
-    r_lm_regex = functions_catalog.find_one({
-        "key": {"$regex": "R: stats::lm"},
-        "value.language": "r"
-    })
+def _vector_store():
+    # None until the first query has imported the vector search
+    return sys.modules.get("vector.vector_store")
 
-    if r_lm_regex:
-        logger.info("Found stats::lm function with regex search")
-        return {
-            "key": r_lm_regex["key"],
-            "value": r_lm_regex["value"]
-        }
 
-    # Create a fallback for R's lm function if not found
-    logger.info("Creating fallback for R linear regression")
-    return {
-        "key": "R: stats::lm - Linear Models",
-        "value": {
-            "language": "r",
-            "package": "stats",
-            "function_name": "lm",
-            "arguments": ["formula", "data"],
-            "defaults": ["", ""],
-            "signature": "stats::lm(formula, data)",
-            "docstring": "Fits Linear Models"
-        }
-    }
+def _cache_counts():
+    vector_store = _vector_store()
+    search_stats = vector_store.search_cache_stats() if vector_store is not None else {}
+    counts = {}
+    for cache, stats in {**search_stats, "executions": execution_cache.stats()}.items():
+        hits = stats.get("hits", stats.get("memory_hits", 0) + stats.get("disk_hits", 0))
+        counts[(cache,)] = (hits, stats["misses"])
+    return counts
+
+
+def _snapshot():
+    vector_store = _vector_store()
+    return vector_store.index_manager.current if vector_store is not None else None
+
+
+def _shards_loaded():
+    snapshot = _snapshot()
+    return len(getattr(snapshot.index, "loaded_shards", ())) if snapshot is not None else 0
+
+
+# Cache and warm-state metrics are read from their sources at scrape time
+metrics.CACHE_HITS.set_function(lambda: {cache: hits for cache, (hits, _) in _cache_counts().items()})
+metrics.CACHE_MISSES.set_function(lambda: {cache: misses for cache, (_, misses) in _cache_counts().items()})
+metrics.CACHE_HIT_RATIO.set_function(
+    lambda: {cache: hits / (hits + misses) if hits + misses else 0.0
+             for cache, (hits, misses) in _cache_counts().items()}
+)
+metrics.FAISS_INDEX_LOADED.set_function(lambda: int(_snapshot() is not None))
+metrics.FAISS_SHARDS_LOADED.set_function(_shards_loaded)
+metrics.R_PACKAGES_LOADED.set_function(lambda: len(r_loaded_packages))
+
+
+# Blocking executions run off the event loop: Python functions on a small
+# thread pool, R on a single thread because the embedded R interpreter is
+# not thread-safe
+PYTHON_EXEC_WORKERS = int(os.getenv("AUTODS_PYTHON_EXEC_WORKERS", "4"))
+_python_executor = None
+_r_executor = None
+_executor_lock = threading.Lock()
+
+# Event loop on a background thread that serves the synchronous API
+_sync_loop = None
+
+
+def _executors():
+    global _python_executor, _r_executor
+    with _executor_lock:
+        if _python_executor is None:
+            _python_executor = ThreadPoolExecutor(max_workers=PYTHON_EXEC_WORKERS,
+                                                  thread_name_prefix="autods-python")
+            _r_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autods-r")
+    return _python_executor, _r_executor
+
+
+def set_python_exec_workers(workers):
+    """
+    Size the Python execution thread pool, e.g. to a batch run's worker
+    count. A pool already created is replaced; calls running on it finish
+    there. R executions stay on their single thread.
+    """
+    global PYTHON_EXEC_WORKERS, _python_executor
+    workers = max(1, workers)
+    with _executor_lock:
+        if workers == PYTHON_EXEC_WORKERS:
+            return
+        PYTHON_EXEC_WORKERS = workers
+        if _python_executor is not None:
+            previous = _python_executor
+            _python_executor = ThreadPoolExecutor(max_workers=PYTHON_EXEC_WORKERS,
+                                                  thread_name_prefix="autods-python")
+            previous.shutdown(wait=False)
+
+
+def _run_sync(coroutine):
+    """
+    Run a coroutine to completion from synchronous code. Every call shares
+    one long-lived loop, so async clients keep their connection pools, and
+    it works even when the caller is itself inside a running event loop.
+    """
+    global _sync_loop
+    with _executor_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="autods-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coroutine, _sync_loop).result()
 
 
-def process_query(user_query, args):
+async def process_query_async(user_query, args, filters=None):
     """
     Main pipeline:
-      1) Search for the best function match in the vector store.
+      1) Search for the best function match in the vector store, optionally
+         restricted by filters (language, package prefix, module prefix).
       2) Infer any missing parameters.
       3) Generate a code snippet for transparency.
       4) Attempt to execute the function (Python or R).
+    The search awaits the embedding call and execution runs in an executor,
+    so one process can serve many queries concurrently. With tracing on
+    (AUTODS_TRACE=1), the result carries a "timings" block with the time
+    spent in each stage.
+    """
+    return await _observe_request(user_query, lambda: _process_query_async(user_query, args, filters))
+
+
+async def process_match_async(function_details, user_query, args, search_seconds=0.0):
     """
+    process_query_async for a query whose function was already resolved
+    (None when nothing matched), e.g. by a batched search_functions call
+    covering many queries. search_seconds is this query's share of that
+    search; it is recorded in the search latency histogram and counted in
+    the request latency, so batch runs report the same metrics and trace
+    timings as single queries.
+    """
+    metrics.SEARCH_SECONDS.observe(search_seconds)
+    return await _observe_request(user_query, lambda: _resolved_query_async(function_details, user_query, args),
+                                  search_seconds, batched_search_ms=round(search_seconds * 1000.0, 3))
+
+
+async def _observe_request(user_query, pipeline, search_seconds=0.0, **trace_attrs):
+    """
+    Run one request's pipeline() under a trace and record its latency and
+    outcome in the request metrics.
+    """
+    start = time.perf_counter()
+    with start_trace("process_query", query=user_query, **trace_attrs) as trace:
+        result = await pipeline()
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - start + search_seconds)
+    metrics.REQUESTS.inc(outcome="success" if result.get("success") else "failure")
+    if trace is not None:
+        result["timings"] = trace.timings()
+        trace.export()
+    return result
+
+
+async def _process_query_async(user_query, args, filters):
+    from vector.vector_store import search_function_async
+
     logger.info(f"Processing user query: '{user_query}'")
 
-    # Special case for linear regression - we know this is a common use case
-    # and we want to make sure we get the right function
-    if "linear regression" in user_query.lower() or "linear model" in user_query.lower():
-        logger.info("Detected linear regression request - using R stats::lm")
-        function_details = find_r_linear_model_function()
-    else:
-        # For other queries, use the vector store search
-        function_details = search_function(user_query)
+    # Hybrid lexical + vector search over the catalog; the args inform the
+    # optional re-ranking stage
+    with metrics.SEARCH_SECONDS.time():
+        function_details = await search_function_async(user_query, filters=filters, args=args)
+    return await _resolved_query_async(function_details, user_query, args)
+
 
-        if not function_details:
-            logger.warning("No function found for that query.")
-            return {"success": False, "error": "No matching function found"}
+async def _resolved_query_async(function_details, user_query, args):
+    if not function_details:
+        logger.warning("No function found for that query.")
+        metrics.ERRORS.inc(stage="search", language="none")
+        return {"success": False, "error": "No matching function found"}
 
     logger.info(f"Best match => {function_details['key']}")
+    return await execute_match_async(function_details, user_query, args)
 
+
+async def execute_match_async(function_details, user_query, args):
+    """
+    Steps 2-4 of the pipeline for an already resolved function: infer the
+    parameters, generate the snippet and execute it in the matching executor.
+    """
     # Infer parameters based on provided args and function signature
-    filled_args = infer_parameters(function_details, user_query, args)
+    language = function_details["value"]["language"]
+    try:
+        with span("infer_parameters"), metrics.INFERENCE_SECONDS.time():
+            filled_args = infer_parameters(function_details, user_query, args)
+    except ParameterError as e:
+        logger.warning(f"Rejected arguments for {function_details['key']}: {e}")
+        metrics.ERRORS.inc(stage="inference", language=language)
+        return {"success": False, "error": str(e), "language": language}
     logger.info(f"Inferred arguments => {filled_args}")
 
     # Generate a code snippet to show the running example
     code_snippet = generate_code_snippet(function_details, filled_args)
-    language = function_details["value"]["language"]
     logger.info(f"Detected language => {language}")
 
+    # Identical calls to a known-pure function reuse the earlier result
+    value = function_details["value"]
+    cache_key = execution_cache.make_key(language, value.get("package"), value.get("function_name"), filled_args,
+                                         module=value.get("module"))
+    if cache_key is not None:
+        with span("execution_cache") as stage:
+            cached = execution_cache.get(cache_key)
+            stage.set(hit=cached is not None)
+        if cached is not None:
+            logger.info(f"Reusing cached result of {function_details['key']}")
+            cached.update({"cached": True, "code_snippet": code_snippet, "language": language})
+            return cached
+
     # Execute based on language
+    python_executor, r_executor = _executors()
+    loop = asyncio.get_running_loop()
+    # run_in_executor does not carry the context over; the call runs in a
+    # copy of it so its spans land in the current trace
     try:
         if language == "python":
-            exec_result = execute_python_function(function_details["value"], filled_args)
+            with span("execute", language=language), metrics.EXECUTION_SECONDS.time(language=language):
+                exec_result = await loop.run_in_executor(
+                    python_executor, contextvars.copy_context().run, execute_python_function, function_details["value"], filled_args
+                )
         elif language == "r":
-            exec_result = execute_r_function(function_details["value"], filled_args)
+            with span("execute", language=language), metrics.EXECUTION_SECONDS.time(language=language):
+                exec_result = await loop.run_in_executor(
+                    r_executor, contextvars.copy_context().run, execute_r_function, function_details["value"], filled_args
+                )
         else:
             error_msg = f"Unknown language => {language}"
             logger.warning(error_msg)
+            metrics.ERRORS.inc(stage="execution", language=language)
             return {"success": False, "error": error_msg}
     except Exception as e:
         logger.error(f"Execution error: {e}")
         logger.error(traceback.format_exc())
+        metrics.ERRORS.inc(stage="execution", language=language)
         return {
             "success": False,
             "error": str(e),
@@ -232,11 +343,21 @@ def process_query(user_query, args):
             "language": language
         }
 
+    if not exec_result.get("success"):
+        metrics.ERRORS.inc(stage="execution", language=language)
+    execution_cache.put(cache_key, exec_result)
     exec_result["code_snippet"] = code_snippet
     exec_result["language"] = language
     return exec_result
 
 
+def process_query(user_query, args, filters=None):
+    """
+    Synchronous wrapper around process_query_async.
+    """
+    return _run_sync(process_query_async(user_query, args, filters))
+
+
 # Optional local test
 if __name__ == "__main__":
     test_query = "linear regression"
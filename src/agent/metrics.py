@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+import os
+import time
+import atexit
+import threading
+import logging
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# AUTODS_METRICS_PORT serves the registry in Prometheus text format on
+# http://127.0.0.1:<port>/metrics; AUTODS_METRICS_FILE rewrites it to a file
+# every AUTODS_METRICS_DUMP_INTERVAL seconds and at exit (for node_exporter's
+# textfile collector or a sidecar)
+METRICS_PORT = int(os.getenv("AUTODS_METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("AUTODS_METRICS_FILE")
+METRICS_DUMP_INTERVAL = float(os.getenv("AUTODS_METRICS_DUMP_INTERVAL", "15"))
+
+# Latency buckets in seconds, from a cached search to a slow R model fit
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._function = None
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function):
+        """
+        Read the metric from function() at render time instead of from
+        recorded values. function returns a number, or {label values: number}.
+        """
+        self._function = function
+
+    def _current(self):
+        if self._function is None:
+            with self._lock:
+                return dict(self._values)
+        try:
+            value = self._function()
+        except Exception as e:
+            logger.warning(f"Could not collect metric {self.name}: {e}")
+            return {}
+        return value if isinstance(value, dict) else {(): value}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._current().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the block, whether or not it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            states = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in states:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    A named set of metrics rendered together in Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def dump(self, path):
+        """
+        Write the registry to path, replacing it atomically so a collector
+        never reads a half-written file.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+SEARCH_SECONDS = REGISTRY.histogram("autods_search_seconds", "Time to find the best matching function")
+INFERENCE_SECONDS = REGISTRY.histogram("autods_inference_seconds", "Time to infer and check parameters")
+EXECUTION_SECONDS = REGISTRY.histogram("autods_execution_seconds", "Time to execute the matched function",
+                                       ["language"])
+REQUEST_SECONDS = REGISTRY.histogram("autods_request_seconds", "End-to-end process_query time")
+REQUESTS = REGISTRY.counter("autods_requests_total", "Processed queries by outcome", ["outcome"])
+ERRORS = REGISTRY.counter("autods_errors_total", "Failures by pipeline stage and language", ["stage", "language"])
+CACHE_HITS = REGISTRY.counter("autods_cache_hits_total", "Search cache hits", ["cache"])
+CACHE_MISSES = REGISTRY.counter("autods_cache_misses_total", "Search cache misses", ["cache"])
+CACHE_HIT_RATIO = REGISTRY.gauge("autods_cache_hit_ratio", "Search cache hits over lookups", ["cache"])
+FAISS_INDEX_LOADED = REGISTRY.gauge("autods_faiss_index_loaded", "1 if a FAISS index is resident in memory")
+FAISS_SHARDS_LOADED = REGISTRY.gauge("autods_faiss_shards_loaded", "Shards of a sharded index loaded so far")
+R_PACKAGES_LOADED = REGISTRY.gauge("autods_r_packages_loaded", "R packages attached in the embedded R session")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, addr="127.0.0.1", registry=REGISTRY):
+    """
+    Serve the registry at http://addr:port/metrics from a daemon thread.
+    Returns the server; call shutdown() on it to stop.
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((addr, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="autods-metrics", daemon=True)
+    thread.start()
+    logger.info(f"Serving metrics on http://{addr}:{server.server_address[1]}/metrics")
+    return server
+
+
+def start_file_dumper(path, interval=METRICS_DUMP_INTERVAL, registry=REGISTRY):
+    """
+    Rewrite the registry to path every interval seconds and once at exit.
+    """
+    def dump():
+        try:
+            registry.dump(path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {path}: {e}")
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            dump()
+
+    threading.Thread(target=loop, name="autods-metrics-dump", daemon=True).start()
+    atexit.register(dump)
+    logger.info(f"Writing metrics to {path} every {interval}s")
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """
+    Start the exporters configured by AUTODS_METRICS_PORT and
+    AUTODS_METRICS_FILE, once per process.
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        if METRICS_PORT:
+            try:
+                start_http_server(METRICS_PORT)
+            except OSError as e:
+                logger.warning(f"Could not serve metrics on port {METRICS_PORT}: {e}")
+        if METRICS_FILE:
+            start_file_dumper(METRICS_FILE)
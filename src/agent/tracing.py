@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import secrets
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# AUTODS_TRACE=1 records spans for every process_query call and returns them
+# as a "timings" block; AUTODS_TRACE_EXPORT names a file that each finished
+# trace is appended to as one line of OpenTelemetry (OTLP/JSON) spans
+TRACE_ENABLED = os.getenv("AUTODS_TRACE", "0") == "1"
+TRACE_EXPORT_PATH = os.getenv("AUTODS_TRACE_EXPORT")
+
+_current_trace = contextvars.ContextVar("autods_trace", default=None)
+_current_span = contextvars.ContextVar("autods_span", default=None)
+_export_lock = threading.Lock()
+
+
+class _NoopSpan:
+    """
+    Stands in for a span when no trace is active, so instrumented code pays
+    one context variable lookup and nothing else.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    def __init__(self, trace, name, attributes):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = None
+        self.start_ns = None
+        self.end_ns = None
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        self.trace.spans.append(self)
+        return False
+
+
+class Trace:
+    """
+    The spans recorded while handling one request. Times are taken from the
+    monotonic perf counter; the wall clock is read once, at the start, to
+    place the trace in time for export.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self.start_ns = time.perf_counter_ns()
+        self.start_unix_ns = time.time_ns()
+
+    def timings(self):
+        """
+        The "timings" block returned with a result: total time, time per
+        stage name, and every span with its offset, duration and metadata.
+        """
+        spans = sorted(self.spans, key=lambda span: span.start_ns)
+        stages = {}
+        for span in spans:
+            stages[span.name] = round(stages.get(span.name, 0.0) + (span.end_ns - span.start_ns) / 1e6, 3)
+        root = next((span for span in spans if span.parent_id is None), None)
+        total_ns = (root.end_ns - root.start_ns) if root else 0
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(total_ns / 1e6, 3),
+            "stages": stages,
+            "spans": [{
+                "name": span.name,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "start_ms": round((span.start_ns - self.start_ns) / 1e6, 3),
+                "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+                "attributes": span.attributes
+            } for span in spans]
+        }
+
+    def to_otlp(self):
+        """
+        The trace as an OTLP/JSON ExportTraceServiceRequest.
+        """
+        def attribute(key, value):
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            return {"key": key, "value": typed}
+
+        def unix_ns(perf_ns):
+            return str(self.start_unix_ns + perf_ns - self.start_ns)
+
+        spans = [{
+            "traceId": self.trace_id,
+            "spanId": span.span_id,
+            **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": unix_ns(span.start_ns),
+            "endTimeUnixNano": unix_ns(span.end_ns),
+            "attributes": [attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.attributes["error"]} if "error" in span.attributes else {}
+        } for span in self.spans]
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", "autods")]},
+            "scopeSpans": [{"scope": {"name": "autods"}, "spans": spans}]
+        }]}
+
+    def export(self, path=None):
+        """
+        Append the trace to an OTLP/JSON lines file (default AUTODS_TRACE_EXPORT).
+        """
+        path = path or TRACE_EXPORT_PATH
+        if not path:
+            return
+        line = json.dumps(self.to_otlp(), default=str)
+        try:
+            with _export_lock, open(path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Could not export trace to {path}: {e}")
+
+
+def span(name, **attributes):
+    """
+    Time a stage of the current trace: `with span("faiss.search", k=10): ...`.
+    A no-op when no trace is active.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    return Span(trace, name, attributes)
+
+
+@contextmanager
+def start_trace(name, enabled=None, **attributes):
+    """
+    Start a trace with a root span of the given name and yield the Trace,
+    or yield None when tracing is disabled (default: AUTODS_TRACE).
+    """
+    if not (TRACE_ENABLED if enabled is None else enabled):
+        yield None
+        return
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        with Span(trace, name, attributes):
+            yield trace
+    finally:
+        _current_trace.reset(token)
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+batch_runner.py - Run AutoDS headless over a JSONL file of requests
+
+Each input line is a JSON object {"query": ..., "args": {...}, "filters": {...}}
+with an optional "id". Each output line is {"index", "id", "query", "function",
+"result"}, where index is the request's position among the input's non-blank
+lines. Functions are resolved with batched search, executions run concurrently
+(Python on a thread pool of --workers threads, R on one thread), and results
+are streamed out in input order or as they complete. Rerunning with --resume
+skips requests whose results are already in the output file.
+
+Usage:
+    python src/batch_runner.py requests.jsonl results.jsonl --workers 8 --resume
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+
+# Add the src directory to the path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from agent.agent import process_match_async, set_python_exec_workers
+from agent.metrics import start_exporters
+from vector.partitions import normalize_filters
+from vector.vector_store import search_functions, search_cache_stats
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("AutoDS")
+
+# The error of a request whose query matched no function
+NO_MATCH_ERROR = "No matching function found"
+
+# The error of a request whose batched search failed
+SEARCH_FAILED_ERROR = "Search failed; check that the index is built and compatible"
+
+
+class InvalidRequest:
+    """
+    Stands in for an input line that is not a valid request.
+    """
+
+    def __init__(self, error):
+        self.error = error
+
+    def get(self, name, default=None):
+        return default
+
+
+def read_requests(path):
+    """
+    Yield (index, request) for each non-blank input line. Lines that are not
+    valid JSON objects with a "query" yield an InvalidRequest.
+    """
+    index = 0
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict) or not isinstance(request.get("query"), str):
+                    raise ValueError("expected an object with a string 'query'")
+            except ValueError as e:
+                request = InvalidRequest(f"Invalid request line: {e}")
+            yield index, request
+            index += 1
+
+
+def count_requests(path):
+    with open(path, "r") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def finished_indexes(output_path):
+    """
+    Read the indexes already written to an output file, first dropping a
+    trailing partial line left by an interrupted run.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    done = set()
+    for line in data.decode("utf-8").splitlines():
+        try:
+            done.add(json.loads(line)["index"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return done
+
+
+class ResultWriter:
+    """
+    Writes result records to the output file, flushing each one. In ordered
+    mode records are held back until every earlier index has been written;
+    indexes in skip (finished by an earlier run) count as written.
+    """
+
+    def __init__(self, f, ordered, skip):
+        self.f = f
+        self.ordered = ordered
+        self.skip = skip
+        self.next_index = 0
+        self.pending = {}
+
+    def _emit(self, record):
+        self.f.write(json.dumps(record, default=str) + "\n")
+        self.f.flush()
+
+    def write(self, index, record):
+        if not self.ordered:
+            self._emit(record)
+            return
+        self.pending[index] = record
+        while True:
+            if self.next_index in self.pending:
+                self._emit(self.pending.pop(self.next_index))
+            elif self.next_index not in self.skip:
+                break
+            self.next_index += 1
+
+
+class BatchStats:
+    def __init__(self, total, skipped):
+        self.total = total
+        self.skipped = skipped
+        self.completed = 0
+        self.succeeded = 0
+        self.no_match = 0
+        self.failed = 0
+        self.search_seconds = 0.0
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    def record(self, record):
+        self.completed += 1
+        result = record["result"]
+        if result.get("success"):
+            self.succeeded += 1
+        elif record["function"] is None and result.get("error") == NO_MATCH_ERROR:
+            self.no_match += 1
+        else:
+            self.failed += 1
+
+    def maybe_report(self, interval):
+        now = time.perf_counter()
+        if now - self._last_report >= interval:
+            self._last_report = now
+            logger.info(self.progress())
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.start
+        done = self.completed + self.skipped
+        rate = self.completed / elapsed if elapsed else 0.0
+        remaining = (self.total - done) / rate if rate else float("inf")
+        return (f"Progress: {done}/{self.total} ({100.0 * done / max(self.total, 1):.1f}%), "
+                f"{rate:.1f} requests/s, ~{remaining:.0f}s remaining")
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "succeeded": self.succeeded,
+            "no_match": self.no_match,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "search_seconds": round(self.search_seconds, 3),
+            "throughput_per_second": round(self.completed / elapsed, 2) if elapsed else 0.0,
+            "caches": search_cache_stats()
+        }
+
+
+def _record(index, request, function_details, result):
+    return {
+        "index": index,
+        "id": request.get("id"),
+        "query": request.get("query"),
+        "function": function_details["key"] if function_details else None,
+        "result": result
+    }
+
+
+async def resolve_chunk(chunk, stats):
+    """
+    Resolve the best function for every request in a chunk, with one
+    batched search per distinct filter set. Returns {index: (match or None,
+    the request's share of its batched search in seconds, error or None)};
+    a request with invalid filters gets an error and is not searched, so it
+    cannot fail the search of the requests grouped with it. Each request's
+    args go to the search, so with AUTODS_RERANK the batch picks the same
+    function as an interactive query. A failed search is recorded as the
+    error of the requests in its group rather than stopping the run.
+    """
+    by_filters = {}
+    matches = {}
+    for index, request in chunk:
+        if isinstance(request, InvalidRequest):
+            continue
+        try:
+            filter_key = normalize_filters(request.get("filters"))
+        except (ValueError, TypeError, AttributeError) as e:
+            matches[index] = (None, 0.0, f"Invalid filters: {e}")
+            continue
+        by_filters.setdefault(filter_key, []).append((index, request))
+
+    search_start = time.perf_counter()
+    for filter_key, requests in by_filters.items():
+        start = time.perf_counter()
+        results = await asyncio.to_thread(search_functions, [request["query"] for _, request in requests],
+                                          1, 100, dict(filter_key or ()) or None,
+                                          [request.get("args") or {} for _, request in requests])
+        if results is None:
+            for index, _ in requests:
+                matches[index] = (None, 0.0, SEARCH_FAILED_ERROR)
+            continue
+        share = (time.perf_counter() - start) / len(requests)
+        for (index, _), found in zip(requests, results):
+            matches[index] = (found[0] if found else None, share, None)
+    stats.search_seconds += time.perf_counter() - search_start
+    return matches
+
+
+async def run_batch(input_path, output_path, batch_size=256, workers=8, ordered=True, resume=False,
+                    report_interval=5.0):
+    """
+    Process every request in input_path and write results to output_path.
+    workers bounds the requests in flight and sizes the Python execution
+    pool; R executions still run one at a time. Returns the run statistics.
+    """
+    skip = finished_indexes(output_path) if resume else set()
+    stats = BatchStats(count_requests(input_path), len(skip))
+    if skip:
+        logger.info(f"Resuming: {len(skip)} requests already finished")
+
+    set_python_exec_workers(workers)
+    slots = asyncio.Semaphore(workers)
+    tasks = set()
+
+    with open(output_path, "a" if resume else "w") as f:
+        writer = ResultWriter(f, ordered, skip)
+
+        async def run_one(index, request, match):
+            function_details, search_seconds, error = match
+            try:
+                if isinstance(request, InvalidRequest):
+                    result = {"success": False, "error": request.error}
+                elif error is not None:
+                    result = {"success": False, "error": error}
+                else:
+                    result = await process_match_async(function_details, request["query"],
+                                                       request.get("args") or {}, search_seconds)
+            except Exception as e:
+                logger.error(f"Request {index} failed: {e}")
+                result = {"success": False, "error": str(e)}
+            finally:
+                slots.release()
+            record = _record(index, request, function_details, result)
+            writer.write(index, record)
+            stats.record(record)
+            stats.maybe_report(report_interval)
+
+        async def process_chunk(chunk):
+            matches = await resolve_chunk(chunk, stats)
+            for index, request in chunk:
+                # Bounds the requests in flight, so a large input streams through
+                await slots.acquire()
+                task = asyncio.create_task(run_one(index, request, matches.get(index, (None, 0.0, None))))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        chunk = []
+        for index, request in read_requests(input_path):
+            if index in skip:
+                continue
+            chunk.append((index, request))
+            if len(chunk) >= batch_size:
+                await process_chunk(chunk)
+                chunk = []
+        if chunk:
+            await process_chunk(chunk)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    summary = stats.summary()
+    logger.info(stats.progress())
+    logger.info(f"Batch finished: {json.dumps(summary)}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run AutoDS over a JSONL file of requests")
+    parser.add_argument("input", help="JSONL file of {\"query\", \"args\", \"filters\", \"id\"} requests")
+    parser.add_argument("output", help="JSONL file to write results to")
+    parser.add_argument("--batch-size", type=int, default=256, help="Requests resolved per batched search")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Executions in flight at once; also sizes the Python execution pool "
+                             "(R executions run one at a time)")
+    parser.add_argument("--as-completed", action="store_true",
+                        help="Write results as they finish instead of in input order")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip requests already in the output file and append the rest")
+    parser.add_argument("--stats", metavar="PATH", help="Also write the run statistics as JSON to PATH")
+    cli_args = parser.parse_args()
+
+    start_exporters()
+    summary = asyncio.run(run_batch(cli_args.input, cli_args.output, cli_args.batch_size, cli_args.workers,
+                                    ordered=not cli_args.as_completed, resume=cli_args.resume))
+    if cli_args.stats:
+        with open(cli_args.stats, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import os
+import threading
+import logging
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# Connection settings; the timeouts are short so a stopped server is
+# reported in seconds rather than after pymongo's 30s default
+MONGO_URI = os.getenv("AUTODS_MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.getenv("AUTODS_MONGO_DB", "AutoDS")
+MONGO_OPTIONS = {
+    "maxPoolSize": int(os.getenv("AUTODS_MONGO_POOL_SIZE", "50")),
+    "minPoolSize": 0,
+    "maxIdleTimeMS": 60000,
+    "serverSelectionTimeoutMS": int(os.getenv("AUTODS_MONGO_SELECT_TIMEOUT_MS", "3000")),
+    "connectTimeoutMS": int(os.getenv("AUTODS_MONGO_CONNECT_TIMEOUT_MS", "2000")),
+    "socketTimeoutMS": int(os.getenv("AUTODS_MONGO_SOCKET_TIMEOUT_MS", "60000")),
+    "appname": "AutoDS"
+}
+
+CATALOG_COLLECTION = "functions_catalog"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class CatalogUnavailableError(RuntimeError):
+    """
+    MongoDB could not be reached.
+    """
+
+
+def get_client():
+    """
+    The process-wide MongoClient, created on first use. pymongo is imported
+    and the pool is opened here rather than at import time, and the client
+    is shared by every module and thread (MongoClient is thread-safe).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from pymongo import MongoClient
+                _client = MongoClient(MONGO_URI, **MONGO_OPTIONS)
+    return _client
+
+
+def set_client(client):
+    """
+    Use client (e.g. a mongomock client, or one with other options) for
+    every later get_client() call. Closes the client it replaces.
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    if previous is not None and previous is not client:
+        previous.close()
+
+
+def close_client():
+    set_client(None)
+
+
+def get_database(name=None):
+    return get_client()[name or MONGO_DB]
+
+
+def get_collection(name, db=None):
+    return get_database(db)[name]
+
+
+def get_catalog():
+    """
+    The unified 'functions_catalog' collection searched by AutoDS.
+    """
+    return get_collection(CATALOG_COLLECTION)
+
+
+def require_connection():
+    """
+    Check that the server answers, raising CatalogUnavailableError with the
+    address and how to fix it if it does not.
+    """
+    from pymongo.errors import PyMongoError
+    try:
+        get_client().admin.command("ping")
+    except PyMongoError as e:
+        raise CatalogUnavailableError(
+            f"Cannot reach MongoDB at {MONGO_URI} ({e.__class__.__name__}: {e}). "
+            f"Start mongod or point AUTODS_MONGO_URI at a running server."
+        ) from e
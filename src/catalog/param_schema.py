@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import logging
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# inspect.Parameter kinds as stored by the Python scraper
+POSITIONAL_ONLY = "positional_only"
+POSITIONAL_OR_KEYWORD = "positional_or_keyword"
+VAR_POSITIONAL = "var_positional"
+KEYWORD_ONLY = "keyword_only"
+VAR_KEYWORD = "var_keyword"
+
+# Bumped whenever compile_param_schema changes, so schemas stored by an
+# older unify_database.py run are recompiled instead of trusted
+SCHEMA_VERSION = 4
+
+
+class ParameterError(ValueError):
+    """
+    The user's arguments do not fit the function's parameters.
+    """
+
+
+def _normalize_kind(kind):
+    kind = (kind or POSITIONAL_OR_KEYWORD).lower()
+    # str(inspect.Parameter.kind) is "KEYWORD_ONLY" or, on older Pythons, "<_ParameterKind.KEYWORD_ONLY: 3>"
+    for known in (POSITIONAL_ONLY, VAR_POSITIONAL, KEYWORD_ONLY, VAR_KEYWORD, POSITIONAL_OR_KEYWORD):
+        if known in kind:
+            return known
+    return POSITIONAL_OR_KEYWORD
+
+
+def compile_param_schema(value):
+    """
+    Normalize a catalog entry's parameters, whether Python-shaped ("parameters"
+    with name/kind/default) or R-shaped ("arguments" and "defaults"), into:
+      names          - parameters that can be passed by name, in order
+      required       - the subset that must be passed
+      defaults       - {name: default as text} for parameters with one
+      kinds          - {name: kind} for parameters that are not
+                       positional-or-keyword
+      accepts_kwargs - whether unknown names are accepted (**kwargs or R's ...)
+    Python parameters without a default have default null and are required;
+    any other Python default, including "" (str of a default ''), is real. A
+    leading self or cls is dropped, since the scraper records methods as
+    plain functions of their class. R arguments without a default have
+    default "", but R functions routinely leave such formals out (lm's
+    subset, weights or offset are tested with missing()), so no R argument
+    is required. "None" and "NULL" are real defaults. An R signature with
+    "..." accepts other names even when the arguments list leaves it out,
+    as hand-written catalog entries used to.
+    """
+    r_shaped = not value.get("parameters")
+    if not r_shaped:
+        entries = [(param.get("name"), param.get("kind"), param.get("default")) for param in value["parameters"]]
+        if entries and entries[0][0] in ("self", "cls"):
+            entries = entries[1:]
+    else:
+        arguments = value.get("arguments") or []
+        defaults = list(value.get("defaults") or [])
+        defaults += [None] * (len(arguments) - len(defaults))
+        entries = [(name, None, default) for name, default in zip(arguments, defaults)]
+
+    schema = {"names": [], "required": [], "defaults": {}, "kinds": {}, "accepts_kwargs": False,
+              "version": SCHEMA_VERSION}
+    for name, kind, default in entries:
+        if not name:
+            continue
+        kind = _normalize_kind(kind)
+        if name == "..." or kind == VAR_KEYWORD:
+            schema["accepts_kwargs"] = True
+            continue
+        if kind == VAR_POSITIONAL:
+            continue
+        schema["names"].append(name)
+        if kind != POSITIONAL_OR_KEYWORD:
+            schema["kinds"][name] = kind
+        if default is None or (r_shaped and default == ""):
+            if not r_shaped:
+                schema["required"].append(name)
+        else:
+            schema["defaults"][name] = str(default)
+    if r_shaped and "..." in (value.get("signature") or ""):
+        schema["accepts_kwargs"] = True
+    return schema
+
+
+def get_param_schema(value):
+    """
+    The schema compiled by unify_database.py, or one compiled now for
+    catalog entries written before it (or before its current version) was
+    stored.
+    """
+    schema = value.get("param_schema")
+    if not schema or schema.get("version") != SCHEMA_VERSION:
+        schema = compile_param_schema(value)
+    return schema
+
+
+def check_arguments(schema, args):
+    """
+    Raise ParameterError if args name a parameter the function does not
+    accept, pass a positional-only parameter by name, or leave out a
+    required parameter.
+    """
+    names = set(schema["names"])
+    unknown = [name for name in args if name not in names]
+    if unknown and not schema["accepts_kwargs"]:
+        raise ParameterError(f"Unknown argument(s): {', '.join(unknown)}. "
+                             f"Accepted: {', '.join(schema['names']) or 'none'}")
+    positional = [name for name in args if schema["kinds"].get(name) == POSITIONAL_ONLY]
+    if positional:
+        raise ParameterError(f"Argument(s) {', '.join(positional)} are positional-only and cannot be passed by name")
+    missing = [name for name in schema["required"] if name not in args]
+    if missing:
+        raise ParameterError(f"Missing required argument(s): {', '.join(missing)}")
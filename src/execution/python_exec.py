@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
+import os
+import sys
 import importlib
 import traceback
 import logging
 
+# Ensure we can import from sibling folders when run as a script
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from agent.tracing import span
+
 # Setup logging
 logger = logging.getLogger("AutoDS")
 
@@ -21,7 +30,8 @@ def execute_python_function(function_details, args):
 
         # Import the module and get the function object
         try:
-            module = importlib.import_module(package_name)
+            with span("python.import", module=package_name, cached=package_name in sys.modules):
+                module = importlib.import_module(package_name)
         except ImportError as e:
             logger.error(f"Failed to import module {package_name}: {e}")
             return {
@@ -54,7 +64,8 @@ def execute_python_function(function_details, args):
         # Execute the function with provided arguments
         logger.info(f"Calling function with arguments: {args}")
         try:
-            result = func(**args)
+            with span("python.call", function=f"{package_name}.{function_name}"):
+                result = func(**args)
             logger.info(f"Function executed successfully")
             return {
                 "success": True,
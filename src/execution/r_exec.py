@@ -1,13 +1,125 @@
 #!/usr/bin/env python3
+import os
+import sys
 import traceback
-import rpy2.robjects as robjects
-from rpy2.robjects import vectors as rvectors
 import logging
-import numpy as np
+
+# Ensure we can import from sibling folders when run as a script
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from agent.tracing import span
 
 # Setup logging
 logger = logging.getLogger("AutoDS")
 
+# Packages attached to the embedded R session so far
+loaded_packages = set()
+
+
+def convert_r_args(args, function_name):
+    """
+    Convert JSON-style Python arguments into R objects: a "formula" string
+    becomes an R formula, a list of rows a matrix (or, for lm, a data frame),
+    a flat list a numeric or string vector, and the name of a built-in
+    dataset the dataset itself. Other values are passed as they are.
+    """
+    import rpy2.robjects as robjects
+    from rpy2.robjects import vectors as rvectors
+    import numpy as np
+
+    r_args = {}
+    for key, value in args.items():
+        logger.info(f"Processing argument '{key}' of type {type(value)}")
+
+        if key.lower() == "formula" and isinstance(value, str):
+            # Handle formula expression
+            try:
+                r_args[key] = robjects.Formula(value)
+                logger.info(f"Converted '{key}' to R formula: {value}")
+            except Exception as e:
+                logger.error(f"Error converting formula '{value}': {e}")
+                r_args[key] = value
+
+        elif isinstance(value, list):
+            # Special handling for linear regression data which is often a list of lists
+            if all(isinstance(row, list) for row in value):
+                # Convert list of lists to R matrix or data frame
+                try:
+                    # Convert to numpy array first for easier handling
+                    data_array = np.array(value)
+
+                    # Create matrix using R matrix function
+                    r_vector = rvectors.FloatVector(data_array.flatten())
+                    r_matrix = robjects.r['matrix'](r_vector,
+                                                    nrow=data_array.shape[0],
+                                                    ncol=data_array.shape[1])
+
+                    # For linear regression, convert to data frame with named columns
+                    if function_name == "lm":
+                        if data_array.shape[1] == 2:
+                            # Typical x,y data
+                            df = robjects.r['data.frame'](
+                                x=rvectors.FloatVector(data_array[:, 0]),
+                                y=rvectors.FloatVector(data_array[:, 1])
+                            )
+                            r_args[key] = df
+                            logger.info(f"Converted '{key}' to R data frame with x,y columns")
+                        else:
+                            # Multi-column data
+                            col_dict = {}
+                            for i in range(data_array.shape[1]):
+                                col_dict[f"col{i}"] = rvectors.FloatVector(data_array[:, i])
+                            df = robjects.r['data.frame'](**col_dict)
+                            r_args[key] = df
+                            logger.info(f"Converted '{key}' to R data frame with {data_array.shape[1]} columns")
+                    else:
+                        # For other functions, use the matrix as is
+                        r_args[key] = r_matrix
+                        logger.info(f"Converted '{key}' to R matrix with shape {data_array.shape}")
+                except Exception as e:
+                    logger.error(f"Error converting matrix data: {e}")
+                    # Fallback to simpler method
+                    r_cmd = "rbind("
+                    for row in value:
+                        r_cmd += f"c({','.join(str(x) for x in row)}),"
+                    r_cmd = r_cmd.rstrip(',') + ")"
+
+                    try:
+                        r_matrix = robjects.r(r_cmd)
+                        r_args[key] = r_matrix
+                        logger.info(f"Fallback: Converted '{key}' to R matrix using rbind")
+                    except Exception as e2:
+                        logger.error(f"Fallback conversion also failed: {e2}")
+                        r_args[key] = value
+            else:
+                # It's a simple list, convert to R vector
+                try:
+                    if all(isinstance(x, (int, float)) for x in value):
+                        r_args[key] = rvectors.FloatVector(value)
+                        logger.info(f"Converted '{key}' to R numeric vector of length {len(value)}")
+                    else:
+                        r_args[key] = rvectors.StrVector([str(x) for x in value])
+                        logger.info(f"Converted '{key}' to R string vector of length {len(value)}")
+                except Exception as e:
+                    logger.error(f"Error converting vector: {e}")
+                    r_args[key] = value
+
+        elif isinstance(value, str) and value.strip() in ["mtcars", "iris", "ToothGrowth", "airquality"]:
+            # Handle R built-in datasets
+            try:
+                r_args[key] = robjects.r(value)
+                logger.info(f"Using R built-in dataset: {value}")
+            except Exception as e:
+                logger.error(f"Error loading R dataset '{value}': {e}")
+                r_args[key] = value
+        else:
+            # Pass other values as is
+            r_args[key] = value
+            logger.info(f"Using '{key}' value as is: {value}")
+    return r_args
+
 
 def execute_r_function(function_details, args):
     """
@@ -15,6 +127,10 @@ def execute_r_function(function_details, args):
     with given arguments using rpy2.
     """
     try:
+        # Importing rpy2.robjects boots the embedded R interpreter, so it
+        # only happens once an R function is actually run
+        import rpy2.robjects as robjects
+
         package_name = function_details["package"]
         function_name = function_details["function_name"]
 
@@ -23,7 +139,9 @@ def execute_r_function(function_details, args):
 
         # Load the required R package
         try:
-            robjects.r(f"library({package_name})")
+            with span("r.library", package=package_name):
+                robjects.r(f"library({package_name})")
+            loaded_packages.add(package_name)
         except Exception as e:
             logger.error(f"Error loading R package {package_name}: {e}")
             return {
@@ -41,101 +159,15 @@ def execute_r_function(function_details, args):
             }
 
         # Convert Python arguments into R-compatible objects
-        r_args = {}
-        for key, value in args.items():
-            logger.info(f"Processing argument '{key}' of type {type(value)}")
-
-            if key.lower() == "formula" and isinstance(value, str):
-                # Handle formula expression
-                try:
-                    r_args[key] = robjects.Formula(value)
-                    logger.info(f"Converted '{key}' to R formula: {value}")
-                except Exception as e:
-                    logger.error(f"Error converting formula '{value}': {e}")
-                    r_args[key] = value
-
-            elif isinstance(value, list):
-                # Special handling for linear regression data which is often a list of lists
-                if all(isinstance(row, list) for row in value):
-                    # Convert list of lists to R matrix or data frame
-                    try:
-                        # Convert to numpy array first for easier handling
-                        data_array = np.array(value)
-
-                        # Create matrix using R matrix function
-                        r_vector = rvectors.FloatVector(data_array.flatten())
-                        r_matrix = robjects.r['matrix'](r_vector,
-                                                        nrow=data_array.shape[0],
-                                                        ncol=data_array.shape[1])
-
-                        # For linear regression, convert to data frame with named columns
-                        if function_name == "lm":
-                            if data_array.shape[1] == 2:
-                                # Typical x,y data
-                                df = robjects.r['data.frame'](
-                                    x=rvectors.FloatVector(data_array[:, 0]),
-                                    y=rvectors.FloatVector(data_array[:, 1])
-                                )
-                                r_args[key] = df
-                                logger.info(f"Converted '{key}' to R data frame with x,y columns")
-                            else:
-                                # Multi-column data
-                                col_dict = {}
-                                for i in range(data_array.shape[1]):
-                                    col_dict[f"col{i}"] = rvectors.FloatVector(data_array[:, i])
-                                df = robjects.r['data.frame'](**col_dict)
-                                r_args[key] = df
-                                logger.info(f"Converted '{key}' to R data frame with {data_array.shape[1]} columns")
-                        else:
-                            # For other functions, use the matrix as is
-                            r_args[key] = r_matrix
-                            logger.info(f"Converted '{key}' to R matrix with shape {data_array.shape}")
-                    except Exception as e:
-                        logger.error(f"Error converting matrix data: {e}")
-                        # Fallback to simpler method
-                        r_cmd = "rbind("
-                        for row in value:
-                            r_cmd += f"c({','.join(str(x) for x in row)}),"
-                        r_cmd = r_cmd.rstrip(',') + ")"
-
-                        try:
-                            r_matrix = robjects.r(r_cmd)
-                            r_args[key] = r_matrix
-                            logger.info(f"Fallback: Converted '{key}' to R matrix using rbind")
-                        except Exception as e2:
-                            logger.error(f"Fallback conversion also failed: {e2}")
-                            r_args[key] = value
-                else:
-                    # It's a simple list, convert to R vector
-                    try:
-                        if all(isinstance(x, (int, float)) for x in value):
-                            r_args[key] = rvectors.FloatVector(value)
-                            logger.info(f"Converted '{key}' to R numeric vector of length {len(value)}")
-                        else:
-                            r_args[key] = rvectors.StrVector([str(x) for x in value])
-                            logger.info(f"Converted '{key}' to R string vector of length {len(value)}")
-                    except Exception as e:
-                        logger.error(f"Error converting vector: {e}")
-                        r_args[key] = value
-
-            elif isinstance(value, str) and value.strip() in ["mtcars", "iris", "ToothGrowth", "airquality"]:
-                # Handle R built-in datasets
-                try:
-                    r_args[key] = robjects.r(value)
-                    logger.info(f"Using R built-in dataset: {value}")
-                except Exception as e:
-                    logger.error(f"Error loading R dataset '{value}': {e}")
-                    r_args[key] = value
-            else:
-                # Pass other values as is
-                r_args[key] = value
-                logger.info(f"Using '{key}' value as is: {value}")
+        with span("r.convert_args", args=len(args)):
+            r_args = convert_r_args(args, function_name)
 
         # Call the R function with the prepared arguments
         logger.info(f"Calling R function with arguments: {r_args}")
 
         try:
-            result = r_func(**r_args)
+            with span("r.call", function=f"{package_name}::{function_name}"):
+                result = r_func(**r_args)
 
             # For linear model results, extract coefficients for better display
             if function_name == "lm":
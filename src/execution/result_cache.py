@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+import os
+import json
+import copy
+import time
+import sqlite3
+import hashlib
+import fnmatch
+import threading
+import logging
+from collections import OrderedDict
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# Functions whose result depends only on their arguments, as
+# "python:<module>.<function>" or "r:<package>::<function>" (glob patterns
+# allowed). Anything that draws random numbers, reads files or the clock, or
+# mutates its inputs must stay off this list.
+DEFAULT_PURE_FUNCTIONS = (
+    "python:math.*",
+    # Not "statistics.*", which would also match NormalDist.samples
+    "python:statistics.mean", "python:statistics.fmean", "python:statistics.geometric_mean",
+    "python:statistics.harmonic_mean", "python:statistics.median", "python:statistics.median_low",
+    "python:statistics.median_high", "python:statistics.median_grouped", "python:statistics.mode",
+    "python:statistics.multimode", "python:statistics.quantiles", "python:statistics.stdev",
+    "python:statistics.pstdev", "python:statistics.variance", "python:statistics.pvariance",
+    "python:statistics.covariance", "python:statistics.correlation", "python:statistics.linear_regression",
+    "python:numpy.mean", "python:numpy.median", "python:numpy.std", "python:numpy.var",
+    "python:numpy.percentile", "python:numpy.quantile", "python:numpy.corrcoef", "python:numpy.cov",
+    "python:scipy.stats.linregress", "python:scipy.stats.pearsonr", "python:scipy.stats.spearmanr",
+    "python:scipy.stats.kendalltau", "python:scipy.stats.ttest_ind", "python:scipy.stats.ttest_rel",
+    "python:scipy.stats.ttest_1samp", "python:scipy.stats.describe",
+    "r:stats::cor", "r:stats::cov", "r:stats::var", "r:stats::sd", "r:stats::median", "r:stats::quantile",
+    "r:stats::lm", "r:stats::glm", "r:stats::aov", "r:stats::t.test", "r:stats::wilcox.test",
+    "r:stats::chisq.test", "r:stats::cor.test",
+    "r:base::mean", "r:base::sum", "r:base::summary",
+)
+
+
+def function_id(language, package, function_name, module=None):
+    """
+    The allowlist name of a catalog function. Python functions are named by
+    their module, since the scraper records only the top-level package
+    ("scipy" for scipy.stats.pearsonr).
+    """
+    if language == "r":
+        return f"r:{package}::{function_name}"
+    return f"{language}:{module or package}.{function_name}"
+
+
+def hash_args(args):
+    """
+    A stable hash of the call arguments: the same values give the same hash
+    whatever the key order. Returns None for arguments that are not plain
+    JSON data, which are never cached.
+    """
+    try:
+        canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ExecutionCache:
+    """
+    Memoizes successful results of allowlisted pure functions, keyed by
+    (language, package, function, hash of the arguments). Entries live in an
+    in-process LRU of at most max_entries and, when db_path is set, in an
+    SQLite file so they survive restarts. Entries older than ttl seconds are
+    dropped (ttl 0 keeps them until evicted). Disabled unless enabled is set.
+    """
+
+    def __init__(self, enabled=False, max_entries=256, ttl=3600.0, db_path=None, max_disk_entries=10000,
+                 allowlist=DEFAULT_PURE_FUNCTIONS):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.allowlist = tuple(allowlist)
+        # key -> (created_at, result), least recently used first
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        if self._conn is None and self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS executions ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_exec_last_access ON executions(last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def is_pure(self, language, package, function_name, module=None):
+        name = function_id(language, package, function_name, module)
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.allowlist)
+
+    def make_key(self, language, package, function_name, args, module=None):
+        """
+        The cache key for a call, or None if the call must not be cached.
+        """
+        if not self.enabled or not self.is_pure(language, package, function_name, module):
+            return None
+        digest = hash_args(args)
+        if digest is None:
+            return None
+        return f"{function_id(language, package, function_name, module)}:{digest}"
+
+    def _expired(self, created_at, now):
+        return bool(self.ttl) and now - created_at > self.ttl
+
+    def _remember(self, key, created_at, result):
+        self._memory[key] = (created_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Return a copy of the cached result for key, or None.
+        """
+        if key is None:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry[0], now):
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                conn = self._connection()
+                row = conn.execute("SELECT created_at, result FROM executions WHERE key = ?",
+                                   (key,)).fetchone() if conn is not None else None
+                if row is not None and not self._expired(row[0], now):
+                    entry = (row[0], json.loads(row[1]))
+                    conn.execute("UPDATE executions SET last_access = ? WHERE key = ?", (now, key))
+                    conn.commit()
+                    self._remember(key, *entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, result):
+        """
+        Remember a successful result; failures are never cached.
+        """
+        if key is None or not result.get("success"):
+            return
+        now = time.time()
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._remember(key, now, result)
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                encoded = json.dumps(result)
+            except (TypeError, ValueError):
+                return
+            conn.execute("INSERT OR REPLACE INTO executions (key, result, created_at, last_access) "
+                         "VALUES (?, ?, ?, ?)", (key, encoded, now, now))
+            if self.ttl:
+                conn.execute("DELETE FROM executions WHERE created_at < ?", (now - self.ttl,))
+            conn.execute("DELETE FROM executions WHERE key IN (SELECT key FROM executions "
+                         "ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM executions")
+                conn.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
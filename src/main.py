@@ -15,6 +15,7 @@ sys.path.append(os.path.join(script_dir, "src"))
 
 # Now import the agent
 from agent.agent import process_query
+from agent.metrics import start_exporters
 
 # Initialize colorama
 init(autoreset=True)
@@ -174,6 +175,7 @@ def handle_linear_regression():
 def main():
     """Main CLI interface for AutoDS"""
     logger.info("Starting AutoDS CLI interface")
+    start_exporters()
     debug_mode = False
     print_header()
 
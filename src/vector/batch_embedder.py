@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import os
+import time
+import random
+import shutil
+import hashlib
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# Exception class names (across openai/httpx versions) worth retrying
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "ServiceUnavailableError", "Timeout", "TimeoutError", "ConnectionError",
+    "ConnectTimeout", "ReadTimeout", "RemoteProtocolError"
+}
+
+
+def is_retryable(error):
+    """
+    Decide whether an embedding request error is transient: rate limits,
+    timeouts, connection failures and 5xx responses.
+    """
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to
+    `capacity`. acquire(n) blocks until n tokens are available and takes
+    them. A request larger than the bucket waits for a full bucket and
+    leaves the balance negative, so later callers wait out the difference
+    and the long-run rate never exceeds `rate`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1.0):
+        # Requests larger than the bucket would wait forever for all of it,
+        # so they wait for a full bucket and are charged in full
+        needed = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return
+                wait = (needed - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BatchEmbedder:
+    """
+    Embeds a long list of texts for an index build. Batches are sent
+    concurrently on a thread pool, throttled by request and token buckets,
+    and retried with exponential backoff on transient errors. Each finished
+    batch is checkpointed under a hash of its texts, so an interrupted build
+    resumes with only the unfinished batches, and a rerun after a catalog
+    change still reuses every batch whose texts did not change.
+    """
+
+    def __init__(self, embed, identity, checkpoint_root, batch_size=100, concurrency=4,
+                 requests_per_minute=None, tokens_per_minute=None, max_retries=6,
+                 initial_backoff=1.0, max_backoff=60.0):
+        self.embed = embed
+        self.identity = identity
+        self.checkpoint_root = checkpoint_root
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.request_bucket = TokenBucket(requests_per_minute / 60.0) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0) if tokens_per_minute else None
+
+    def _checkpoint_dir(self):
+        # One directory per embedding backend and model
+        return os.path.join(self.checkpoint_root, hashlib.sha256(self.identity.encode("utf-8")).hexdigest()[:16])
+
+    @staticmethod
+    def _checkpoint_name(batch):
+        digest = hashlib.sha256()
+        for text in batch:
+            digest.update(text.encode("utf-8"))
+            digest.update(b"\0")
+        return f"batch_{digest.hexdigest()[:32]}.npy"
+
+    def _embed_with_retry(self, batch, batch_number):
+        attempt = 0
+        while True:
+            if self.request_bucket:
+                self.request_bucket.acquire()
+            if self.token_bucket:
+                # Rough token estimate: ~4 characters per token
+                self.token_bucket.acquire(sum(len(text) for text in batch) / 4.0)
+            try:
+                return np.asarray(self.embed(batch), dtype=np.float32)
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e) or attempt > self.max_retries:
+                    raise
+                delay = min(self.max_backoff, self.initial_backoff * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"Batch {batch_number} failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed_all(self, texts):
+        """
+        Embed every text and return an (n, d) float32 matrix in input order.
+        Raises if a batch still fails after retries; finished batches stay
+        checkpointed for the next attempt.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        checkpoint_dir = self._checkpoint_dir()
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        paths = [os.path.join(checkpoint_dir, self._checkpoint_name(batch)) for batch in batches]
+        results = [None] * len(batches)
+
+        pending = []
+        for number, path in enumerate(paths):
+            vectors = np.load(path) if os.path.exists(path) else None
+            if vectors is not None and len(vectors) == len(batches[number]):
+                results[number] = vectors
+            else:
+                pending.append(number)
+        if len(pending) < len(batches):
+            logger.info(f"Resuming from checkpoint: {len(batches) - len(pending)} of {len(batches)} batches already done")
+
+        def run(number):
+            vectors = self._embed_with_retry(batches[number], number + 1)
+            path = paths[number]
+            with open(f"{path}.tmp", "wb") as f:
+                np.save(f, vectors)
+            os.replace(f"{path}.tmp", path)
+            return number, vectors
+
+        done = len(batches) - len(pending)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(run, number) for number in pending]
+            try:
+                for future in as_completed(futures):
+                    number, vectors = future.result()
+                    results[number] = vectors
+                    done += 1
+                    logger.info(f"Processing batch {done} of {len(batches)}")
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        return np.vstack(results)
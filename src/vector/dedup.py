@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+import logging
+import numpy as np
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# Rows of the similarity matrix computed at a time
+SIMILARITY_BLOCK = 1024
+
+# Bumped whenever the grouping rules change, so indexes grouped by older
+# rules are regrouped on the next update
+DEDUP_VERSION = 3
+
+
+def _function_identity(value):
+    # Class methods are scraped with their bare name (fit, predict), and
+    # only the module ("sklearn.cluster.KMeans") tells them apart
+    package = (value.get("package") or "").lower()
+    return ((value.get("language") or "").lower(), package, (value.get("module") or package).lower(),
+            (value.get("function_name") or "").lower())
+
+
+def dedup_bucket(value):
+    """
+    The (language, package, module) a catalog entry is compared within;
+    entries in different buckets are never grouped.
+    """
+    return _function_identity(value)[:3]
+
+
+def _richness(doc):
+    # The entry with the most documented parameters and the longest docstring
+    # represents its group
+    value = doc["value"]
+    return len(value.get("parameters") or value.get("arguments") or []), len(value.get("docstring") or "")
+
+
+def collapse_duplicates(documents, ids, vectors, threshold=0.97):
+    """
+    Group catalog entries that describe the same function: first entries
+    with the same (language, package, module, function_name), then, within
+    a language, package and module, entries whose embeddings have cosine
+    similarity >= threshold (greedy leader clustering; None or 0 skips this stage).
+    ids and vectors are aligned rows of the embedding store and documents
+    is the doc store indexed by ID.
+
+    Returns (rows, groups): the rows of ids/vectors to index, one per
+    group, and {canonical id: [alias ids]} for groups with aliases.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    by_identity = {}
+    for row, doc_id in enumerate(ids.tolist()):
+        doc = documents[doc_id] if doc_id < len(documents) else None
+        if doc is None:
+            by_identity[("", "", "", f"#{doc_id}")] = [row]
+            continue
+        by_identity.setdefault(_function_identity(doc["value"]), []).append(row)
+
+    # Canonical row of each same-name group, bucketed by language, package and module
+    canonical = {}
+    buckets = {}
+    for identity, rows in by_identity.items():
+        leader = max(rows, key=lambda row: _richness(documents[ids[row]]) if documents[ids[row]] else (0, 0))
+        canonical[leader] = [row for row in rows if row != leader]
+        buckets.setdefault(identity[:3], []).append(leader)
+
+    if threshold:
+        for bucket in buckets.values():
+            if len(bucket) < 2:
+                continue
+            bucket = sorted(bucket, key=lambda row: _richness(documents[ids[row]]) if documents[ids[row]] else (0, 0),
+                            reverse=True)
+            matrix = np.asarray(vectors[bucket], dtype=np.float32)
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            merged = np.zeros(len(bucket), dtype=bool)
+            for start in range(0, len(bucket), SIMILARITY_BLOCK):
+                similarities = matrix[start:start + SIMILARITY_BLOCK] @ matrix.T
+                for offset, row_similarities in enumerate(similarities):
+                    i = start + offset
+                    if merged[i]:
+                        continue
+                    followers = np.nonzero((row_similarities >= threshold) & ~merged)[0]
+                    followers = followers[followers > i]
+                    for j in followers.tolist():
+                        merged[j] = True
+                        leader, follower = bucket[i], bucket[j]
+                        canonical[leader].append(follower)
+                        canonical[leader].extend(canonical.pop(follower))
+
+    rows = np.array(sorted(canonical), dtype=np.int64)
+    groups = {int(ids[leader]): [int(ids[row]) for row in sorted(aliases)]
+              for leader, aliases in canonical.items() if aliases}
+    logger.info(f"Collapsed {len(ids)} catalog entries into {len(rows)} distinct functions "
+                f"({len(groups)} groups with aliases)")
+    return rows, groups
+
+
+def fold_aliases(documents, groups):
+    """
+    Record each group's alias entries on its canonical document and blank
+    the aliases, so they are neither indexed nor returned separately.
+    Each alias keeps its ID and value, so a query naming the alias exactly
+    still resolves to the alias itself (see IndexSnapshot.document).
+    """
+    for canonical_id, alias_ids in groups.items():
+        doc = documents[canonical_id]
+        aliases = []
+        for alias_id in alias_ids:
+            alias = documents[alias_id]
+            documents[alias_id] = None
+            if alias is None:
+                continue
+            value = alias["value"]
+            aliases.append({"id": alias_id, "key": alias["key"], "package": value.get("package"),
+                            "module": value.get("module"), "function_name": value.get("function_name"),
+                            "value": value})
+        documents[canonical_id] = {**doc, "aliases": aliases}
+    return documents
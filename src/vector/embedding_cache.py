@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+import os
+import json
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+
+def normalize_text(text):
+    """
+    Normalize query text so trivially different spellings share a cache entry.
+    """
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of query embeddings keyed by (model name, normalized text).
+    The first tier is an in-process LRU; the second is an SQLite file so
+    embeddings survive restarts. Both tiers are bounded by entry count.
+    """
+
+    def __init__(self, db_path=None, max_memory_entries=10000, max_disk_entries=1000000):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_entries = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        if self._conn is None and self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text TEXT NOT NULL, vector BLOB NOT NULL, "
+                "last_access INTEGER NOT NULL, PRIMARY KEY (model, text))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+            self._conn.commit()
+            self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return self._conn
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, model, text):
+        """
+        Return the cached embedding for text, or None on a miss.
+        """
+        return self._lookup((model, normalize_text(text)), record_stats=True)
+
+    def _lookup(self, key, record_stats):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                if record_stats:
+                    self.memory_hits += 1
+                return vector
+
+            conn = self._connection()
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND text = ?", key
+                ).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    conn.execute(
+                        "UPDATE embeddings SET last_access = strftime('%s','now') WHERE model = ? AND text = ?", key
+                    )
+                    conn.commit()
+                    self._remember(key, vector)
+                    if record_stats:
+                        self.disk_hits += 1
+                    return vector
+
+            if record_stats:
+                self.misses += 1
+            return None
+
+    def put(self, model, text, vector):
+        """
+        Store an embedding in both tiers, evicting the least recently used
+        entries when either tier is over its bound.
+        """
+        key = (model, normalize_text(text))
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            conn = self._connection()
+            if conn is None:
+                return
+            exists = conn.execute(
+                "SELECT 1 FROM embeddings WHERE model = ? AND text = ?", key
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (model, text, vector, last_access) "
+                "VALUES (?, ?, ?, strftime('%s','now'))",
+                (key[0], key[1], vector.tobytes())
+            )
+            if not exists:
+                self._disk_entries += 1
+            overflow = self._disk_entries - self.max_disk_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+                    (overflow,)
+                )
+                self._disk_entries -= overflow
+            conn.commit()
+
+    def get_or_compute(self, model, text, compute):
+        """
+        Return the cached embedding for text, calling compute on a miss. As in
+        prewarm, compute gets the normalized text the entry is keyed by, so an
+        entry holds the same vector whichever path filled it.
+        """
+        vector = self.get(model, text)
+        if vector is None:
+            vector = np.asarray(compute(normalize_text(text)), dtype=np.float32)
+            self.put(model, text, vector)
+        return vector
+
+    def prewarm(self, model, texts, compute_batch, batch_size=100):
+        """
+        Embed every text not already cached, batch_size texts at a time, using
+        compute_batch(list_of_texts) -> list of vectors. Returns the number of
+        new entries added.
+        """
+        pending = []
+        seen = set()
+        for text in texts:
+            normalized = normalize_text(text)
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            if self._lookup((model, normalized), record_stats=False) is None:
+                pending.append(normalized)
+
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            for text, vector in zip(batch, compute_batch(batch)):
+                self.put(model, text, vector)
+
+        logger.info(f"Pre-warmed embedding cache with {len(pending)} new queries")
+        return len(pending)
+
+    def stats(self):
+        """
+        Return hit/miss counters and current tier sizes.
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            self._connection()
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def read_query_log(path):
+    """
+    Yield queries from a log file. Lines may be plain text or JSON objects
+    with a "query" field.
+    """
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and record.get("query"):
+                    yield record["query"]
+            else:
+                yield line
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+import numpy as np
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+DEFAULT_BACKEND = "openai"
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns a list of texts into an (n, d) float32 matrix. Subclasses set
+    `name` and implement embed(); `identity` is what gets recorded in the
+    index metadata so queries are only run against compatible indexes.
+    """
+
+    name = "base"
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def identity(self):
+        return f"{self.name}:{self.model}"
+
+    @abstractmethod
+    def embed(self, texts):
+        """
+        Embed texts into an (n, d) float32 matrix, one row per text.
+        """
+
+    async def aembed(self, texts):
+        """
+        Async embed(). Providers without a native async client run embed()
+        in the default executor so the event loop is never blocked.
+        """
+        return await asyncio.to_thread(self.embed, list(texts))
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeddings from the OpenAI API (requires OPENAI_API_KEY).
+    """
+
+    name = "openai"
+
+    def __init__(self, model="text-embedding-3-small"):
+        super().__init__(model)
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("Missing OPENAI_API_KEY environment variable. Check .env file or system envs.")
+        self._module = None
+        self._api_key = api_key
+        self._client = None
+        self._async_client = None
+        self._async_loop = None
+
+    @property
+    def _openai(self):
+        # The openai package takes a noticeable part of a second to import,
+        # so it is only loaded when the first text is embedded
+        if self._module is None:
+            import openai
+            self._module = openai
+        return self._module
+
+    def embed(self, texts):
+        # One client (and connection pool) serves every thread
+        if self._client is None:
+            self._client = self._openai.OpenAI(api_key=self._api_key)
+        response = self._client.embeddings.create(model=self.model, input=list(texts))
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+    async def aembed(self, texts):
+        # The async client's connection pool belongs to the event loop it was created on
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_client = self._openai.AsyncOpenAI(api_key=self._api_key)
+            self._async_loop = loop
+        response = await self._async_client.embeddings.create(model=self.model, input=list(texts))
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Offline CPU embedder: word and character trigram features are hashed
+    into a fixed number of signed buckets (a sparse random projection),
+    weighted by log term frequency and L2-normalized. Needs no model files
+    or network, so it works on air-gapped nodes.
+    """
+
+    name = "hashing"
+    token_pattern = re.compile(r"[a-z0-9_]+")
+
+    def __init__(self, model="512"):
+        super().__init__(str(model))
+        self.dimension = int(model)
+
+    def _features(self, text):
+        text = text.lower()
+        tokens = self.token_pattern.findall(text)
+        features = list(tokens)
+        for token in tokens:
+            padded = f"#{token}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def _bucket(self, feature):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimension, 1.0 if (value >> 63) else -1.0
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                bucket, sign = self._bucket(feature)
+                matrix[row, bucket] += sign * (1.0 + np.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """
+    A sentence-transformers model loaded from the local model cache only,
+    so it never reaches out to the network.
+    """
+
+    name = "sentence-transformers"
+
+    def __init__(self, model="all-MiniLM-L6-v2"):
+        super().__init__(model)
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(model, local_files_only=True)
+
+    def embed(self, texts):
+        return np.asarray(self._model.encode(list(texts), convert_to_numpy=True), dtype=np.float32)
+
+
+PROVIDERS = {
+    OpenAIEmbeddingProvider.name: OpenAIEmbeddingProvider,
+    HashingEmbeddingProvider.name: HashingEmbeddingProvider,
+    SentenceTransformerProvider.name: SentenceTransformerProvider
+}
+
+
+def get_provider(backend=None, model=None):
+    """
+    Create the embedding provider selected by the arguments or, failing that,
+    by AUTODS_EMBEDDING_BACKEND / AUTODS_EMBEDDING_MODEL.
+    """
+    backend = backend or os.getenv("AUTODS_EMBEDDING_BACKEND", DEFAULT_BACKEND)
+    model = model or os.getenv("AUTODS_EMBEDDING_MODEL")
+    if backend not in PROVIDERS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose one of: {', '.join(PROVIDERS)}")
+
+    provider_class = PROVIDERS[backend]
+    provider = provider_class(model) if model else provider_class()
+    logger.info(f"Using embedding provider {provider.identity}")
+    return provider
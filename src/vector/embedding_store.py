@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import hashlib
+import logging
+import numpy as np
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+EMBEDDINGS_FILENAME = "embeddings.npy"
+EMBEDDING_IDS_FILENAME = "embedding_ids.npy"
+EMBEDDING_STATE_FILENAME = "embedding_state.json"
+
+STORAGE_DTYPES = ("float32", "float16")
+
+
+def compute_content_hash(entry):
+    """
+    Hash the parts of a catalog entry that affect search: its key and value.
+    """
+    payload = json.dumps({"key": entry.get("key", ""), "value": entry.get("value", {})},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    The embedding matrix the index was built from, saved next to the index.
+    Every row has a stable integer ID that is also its ID in the FAISS index,
+    and is tagged with the content hash and key text of its catalog entry,
+    so an update only has to embed entries whose hash is new. Vectors are
+    stored as float32 or, to halve the file, float16 (dtype); they are
+    cast back to float32 wherever they are indexed or searched.
+    """
+
+    def __init__(self, backend, model, vectors=None, ids=None, entries=None, next_id=0, version=None,
+                 dtype="float32"):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Embedding storage dtype must be one of {', '.join(STORAGE_DTYPES)}, not '{dtype}'")
+        self.backend = backend
+        self.model = model
+        self.dtype = dtype
+        self.vectors = vectors
+        self.ids = ids if ids is not None else np.empty(0, dtype=np.int64)
+        # id -> {"hash": content_hash, "key": text that was embedded}
+        self.entries = entries or {}
+        self.next_id = next_id
+        self.version = version
+        self.hash_to_id = {entry["hash"]: entry_id for entry_id, entry in self.entries.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def matches(self, provider):
+        return (self.backend, self.model) == (provider.name, provider.model)
+
+    def add(self, hashes, keys, vectors):
+        """
+        Append rows for new catalog entries and return their assigned IDs.
+        """
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        new_ids = np.arange(self.next_id, self.next_id + len(hashes), dtype=np.int64)
+        self.next_id += len(hashes)
+        for entry_id, content_hash, key in zip(new_ids.tolist(), hashes, keys):
+            self.entries[entry_id] = {"hash": content_hash, "key": key}
+            self.hash_to_id[content_hash] = entry_id
+
+        if self.vectors is not None and len(self.ids):
+            vectors = np.vstack([self.vectors, vectors]).astype(self.dtype, copy=False)
+        self.vectors = vectors
+        self.ids = np.concatenate([self.ids, new_ids])
+        return new_ids
+
+    def remove(self, ids):
+        """
+        Drop the rows with the given IDs.
+        """
+        if not len(ids):
+            return
+        for entry_id in ids:
+            entry = self.entries.pop(int(entry_id), None)
+            if entry:
+                self.hash_to_id.pop(entry["hash"], None)
+        keep = ~np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+        self.vectors = self.vectors[keep]
+        self.ids = self.ids[keep]
+
+    def vectors_by_key(self):
+        """
+        Map key text to a stored row, so unchanged text is never re-embedded.
+        """
+        rows = {}
+        for row, entry_id in enumerate(self.ids.tolist()):
+            rows.setdefault(self.entries[entry_id]["key"], row)
+        return rows
+
+    def descriptions(self):
+        """
+        Key text indexed by ID; IDs of removed entries are left blank.
+        """
+        descriptions = [""] * self.next_id
+        for entry_id, entry in self.entries.items():
+            descriptions[entry_id] = entry["key"]
+        return descriptions
+
+    def save(self, vector_dir):
+        """
+        Write the matrix, IDs and entry table, each via a temp file and os.replace.
+        """
+        os.makedirs(vector_dir, exist_ok=True)
+        self.version = str(time.time_ns())
+        vectors = np.asarray(self.vectors, dtype=self.dtype)
+        for filename, array in ((EMBEDDINGS_FILENAME, vectors), (EMBEDDING_IDS_FILENAME, self.ids)):
+            path = os.path.join(vector_dir, filename)
+            with open(f"{path}.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(f"{path}.tmp", path)
+
+        path = os.path.join(vector_dir, EMBEDDING_STATE_FILENAME)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({
+                "embedding_backend": self.backend,
+                "embedding_model": self.model,
+                "dtype": self.dtype,
+                "next_id": self.next_id,
+                "version": self.version,
+                "entries": {str(k): v for k, v in self.entries.items()}
+            }, f)
+        os.replace(f"{path}.tmp", path)
+        logger.info(f"Saved {len(self)} embeddings to {vector_dir}")
+
+    @classmethod
+    def load(cls, vector_dir):
+        """
+        Load a saved store, or return None if there is none. The matrix is
+        memory-mapped read-only, so it is paged in only as rows are used.
+        """
+        state_path = os.path.join(vector_dir, EMBEDDING_STATE_FILENAME)
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path, "r") as f:
+            state = json.load(f)
+        return cls(
+            backend=state["embedding_backend"],
+            model=state["embedding_model"],
+            vectors=np.load(os.path.join(vector_dir, EMBEDDINGS_FILENAME), mmap_mode="r"),
+            ids=np.load(os.path.join(vector_dir, EMBEDDING_IDS_FILENAME)),
+            entries={int(k): v for k, v in state["entries"].items()},
+            next_id=state["next_id"],
+            version=state["version"],
+            dtype=state.get("dtype", "float32")
+        )
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+import math
+import logging
+import numpy as np
+import faiss
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+
+# Index types whose vectors can be removed in place; HNSW graphs cannot
+REMOVABLE_INDEX_TYPES = ("flat", "ivf", "ivfpq")
+
+# FAISS warns when a k-means centroid gets fewer training points than this
+MIN_POINTS_PER_CENTROID = 39
+
+
+def default_nlist(num_vectors):
+    """
+    Pick an IVF list count of about 4*sqrt(N), capped so every centroid
+    still has enough training points.
+    """
+    nlist = int(4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def supported_params(index_type, index_params):
+    """
+    index_params without the options index_type cannot apply, with a
+    warning for each, so the recorded parameters describe the index that
+    was built. IVF-PQ stores product-quantized codes, so vector_dtype
+    does not apply to it.
+    """
+    if index_type == "ivfpq" and index_params.get("vector_dtype", "float32") != "float32":
+        logger.warning(f"vector_dtype={index_params['vector_dtype']} does not apply to ivfpq indexes; ignoring it")
+        return {k: v for k, v in index_params.items() if k != "vector_dtype"}
+    return index_params
+
+
+def create_index(index_type, embeddings, ids=None, nlist=None, nprobe=8, hnsw_m=32, ef_construction=40,
+                 ef_search=64, pq_m=16, pq_bits=8, reduce_dim=None, reduction="pca", vector_dtype="float32"):
+    """
+    Build and populate a FAISS index of the requested type over an (N, d)
+    float32 matrix. All types use L2 distance, like the flat baseline.
+    When ids are given the index is wrapped in an IndexIDMap2, so searches
+    return those IDs and entries can later be removed or added by ID.
+      flat   - exact exhaustive scan (IndexFlatL2)
+      hnsw   - graph index (IndexHNSWFlat); tune hnsw_m, ef_construction, ef_search
+      ivf    - inverted lists over k-means cells (IndexIVFFlat); tune nlist, nprobe
+      ivfpq  - IVF with product-quantized codes (IndexIVFPQ); also pq_m, pq_bits
+    To shrink the resident index, reduce_dim projects vectors to fewer
+    dimensions before indexing (reduction="pca" learns a PCA projection;
+    "truncate" keeps the leading dimensions and re-normalizes, for
+    Matryoshka-trained models such as text-embedding-3-*), and
+    vector_dtype="float16" stores flat/HNSW/IVF vectors at half precision
+    (IVF-PQ codes are already compressed and reject it; see supported_params).
+    Queries go through the same projection automatically.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    num_vectors, input_dimension = embeddings.shape
+    transforms, vectors = _fit_reduction(embeddings, reduce_dim, reduction)
+    dimension = vectors.shape[1]
+    half_precision = vector_dtype == "float16"
+    if vector_dtype not in ("float32", "float16"):
+        raise ValueError(f"vector_dtype must be 'float32' or 'float16', not '{vector_dtype}'")
+    if index_type == "ivfpq" and half_precision:
+        raise ValueError("vector_dtype='float16' does not apply to ivfpq indexes")
+
+    if index_type == "flat":
+        if half_precision:
+            index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+        else:
+            index = faiss.IndexFlatL2(dimension)
+    elif index_type == "hnsw":
+        if half_precision:
+            index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_fp16, hnsw_m)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+    elif index_type in ("ivf", "ivfpq"):
+        nlist = nlist or default_nlist(num_vectors)
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == "ivf" and half_precision:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist,
+                                                  faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+        elif index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_L2)
+        else:
+            if dimension % pq_m != 0:
+                raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dimension}")
+            # Each sub-quantizer trains 2**pq_bits centroids by k-means, which
+            # FAISS wants about MIN_POINTS_PER_CENTROID (39) training points each
+            pq_bits = max(1, min(pq_bits, int(math.log2(max(num_vectors / MIN_POINTS_PER_CENTROID, 2)))))
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_bits)
+        logger.info(f"Training {index_type} index with nlist={nlist} on {num_vectors} vectors")
+        index.nprobe = min(nprobe, nlist)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose one of: {', '.join(INDEX_TYPES)}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    if transforms:
+        logger.info(f"Reducing {input_dimension}-d embeddings to {dimension} dimensions ({reduction})")
+        wrapped = faiss.IndexPreTransform(transforms[-1], index)
+        for transform in reversed(transforms[:-1]):
+            wrapped.prepend_transform(transform)
+        index = wrapped
+
+    if ids is None:
+        index.add(embeddings)
+        return index
+
+    id_index = faiss.IndexIDMap2(index)
+    id_index.add_with_ids(embeddings, np.asarray(ids, dtype=np.int64))
+    return id_index
+
+
+def _fit_reduction(embeddings, reduce_dim, reduction):
+    """
+    Fit the dimension-reduction transforms, returning (transforms, reduced
+    training vectors). No reduction returns ([], embeddings).
+    """
+    input_dimension = embeddings.shape[1]
+    if not reduce_dim or reduce_dim >= input_dimension:
+        return [], embeddings
+
+    if reduction == "pca":
+        pca = faiss.PCAMatrix(input_dimension, reduce_dim)
+        pca.train(embeddings)
+        return [pca], pca.apply(embeddings)
+    if reduction == "truncate":
+        # Keep the leading dimensions, then restore unit length
+        remap = faiss.RemapDimensionsTransform(input_dimension, reduce_dim, False)
+        normalize = faiss.NormalizationTransform(reduce_dim, 2.0)
+        reduced = np.ascontiguousarray(embeddings[:, :reduce_dim])
+        faiss.normalize_L2(reduced)
+        return [remap, normalize], reduced
+    raise ValueError(f"reduction must be 'pca' or 'truncate', not '{reduction}'")
+
+
+def read_index(path):
+    """
+    Read a saved index, memory-mapped where FAISS supports it.
+    """
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+    except Exception as e:
+        # Not every index type can be memory-mapped; fall back to a full read
+        logger.debug(f"Memory-mapped read failed ({e}); reading index into memory")
+        return faiss.read_index(path)
+
+
+def index_memory_bytes(index):
+    """
+    Size of the index when serialized, a close proxy for its resident memory.
+    """
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def apply_search_params(index, nprobe=None, ef_search=None):
+    """
+    Set query-time knobs on a loaded index, looking through ID-map and
+    pre-transform wrappers. Parameters that do not apply are ignored.
+    """
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        if value is None:
+            continue
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass
+
+
+def search_parameters(index, selector=None):
+    """
+    FAISS search parameters carrying an ID selector for a loaded index,
+    looking through ID-map and pre-transform wrappers. IVF and HNSW indexes
+    reject plain SearchParameters, so they get their own parameter type
+    with the index's current nprobe or efSearch.
+    """
+    inner = index
+    while hasattr(inner, "index"):
+        inner = faiss.downcast_index(inner.index)
+    if isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = inner.nprobe
+    elif isinstance(inner, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = inner.hnsw.efSearch
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    return params
+
+
+def measure_recall(index, embeddings, ids=None, k=10, sample_size=1000, seed=0):
+    """
+    Estimate recall@k of an index against an exact flat scan. Queries are a
+    random sample of the indexed vectors, each moved in a random direction
+    by its distance to its nearest other vector, so that no query is itself
+    indexed. An indexed vector is always found first, and approximate
+    indexes then look better than they do on real queries. ids maps matrix
+    rows to the IDs the index returns, if it is ID-mapped. Returns a float
+    in [0, 1].
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    num_vectors = embeddings.shape[0]
+    k = min(k, num_vectors)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(num_vectors, size=min(sample_size, num_vectors), replace=False)
+
+    exact = faiss.IndexFlatL2(embeddings.shape[1])
+    exact.add(embeddings)
+    neighbour_distances, neighbours = exact.search(embeddings[sample], 2)
+    # IndexFlatL2 distances are squared; a lone vector has no neighbour
+    offsets = np.where(neighbours[:, 1] >= 0, np.sqrt(np.maximum(neighbour_distances[:, 1], 0.0)), 0.0)
+    directions = rng.standard_normal((len(sample), embeddings.shape[1])).astype(np.float32)
+    directions /= np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-12)
+    queries = np.ascontiguousarray(embeddings[sample] + directions * offsets[:, None].astype(np.float32))
+    _, truth = exact.search(queries, k)
+    _, found = index.search(queries, k)
+    if ids is not None:
+        truth = np.asarray(ids)[truth]
+
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / float(len(queries) * k)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import threading
+import logging
+import numpy as np
+
+from vector.index_builders import apply_search_params, read_index
+from vector.lexical_index import LexicalIndex
+from vector.embedding_store import EMBEDDINGS_FILENAME, EMBEDDING_IDS_FILENAME
+from vector.partitions import PartitionCache
+from vector.shards import SHARD_MANIFEST_FILENAME, ShardedIndex
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+INDEX_FILENAME = "functions.index"
+DESCRIPTIONS_FILENAME = "descriptions.txt"
+VERSION_FILENAME = "index.version"
+META_FILENAME = "index_meta.json"
+DOC_STORE_FILENAME = "doc_store.json"
+
+
+def read_version_stamp(vector_dir):
+    """
+    Return the version stamp written next to the index, or None if absent.
+    """
+    try:
+        with open(os.path.join(vector_dir, VERSION_FILENAME), "r") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def read_index_meta(vector_dir):
+    """
+    Return the metadata recorded when the index was built, or {} if absent.
+    """
+    try:
+        with open(os.path.join(vector_dir, META_FILENAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_version_stamp(vector_dir, version):
+    """
+    Atomically replace the version stamp so readers never see a partial write.
+    """
+    path = os.path.join(vector_dir, VERSION_FILENAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(version))
+    os.replace(tmp_path, path)
+
+
+class IndexSnapshot:
+    """
+    An immutable view of one loaded index and the descriptions, catalog
+    documents, lexical index and filtered-search partitions that go with it,
+    all keyed by the IDs the index returns.
+    Searches hold a reference to a snapshot, so swapping in a newer one never
+    disturbs a search that is already running.
+    """
+
+    def __init__(self, index, descriptions, mtime, version, meta=None, documents=None, lexical=None,
+                 partitions=None):
+        self.index = index
+        self.descriptions = descriptions
+        self.documents = documents or []
+        # Entries folded into a canonical document (see dedup.fold_aliases)
+        self.aliases = {alias["id"]: {"key": alias["key"], "value": alias["value"]}
+                        for doc in self.documents if doc
+                        for alias in doc.get("aliases", []) if "id" in alias}
+        self.lexical = lexical
+        self.partitions = partitions
+        self.mtime = mtime
+        self.version = version
+        self.meta = meta or {}
+
+    def search(self, query_vectors, top_k):
+        return self.index.search(query_vectors, top_k)
+
+    def document(self, idx):
+        """
+        Return the locally stored {"key", "value"} document for an ID, or None.
+        IDs of folded aliases return the alias's own document.
+        """
+        doc = self.documents[idx] if 0 <= idx < len(self.documents) else None
+        return doc if doc is not None else self.aliases.get(idx)
+
+
+class IndexManager:
+    """
+    Keep the FAISS index and its descriptions resident in memory across
+    searches. The index is memory-mapped where FAISS supports it and is
+    reloaded only when the index file's mtime or the version stamp changes.
+    A sharded index (see shards.ShardedIndex) is tracked by its manifest
+    and its shards are read lazily on first search.
+    search_params (nprobe, ef_search) are applied to every loaded index.
+    """
+
+    def __init__(self, vector_dir, check_interval=1.0, search_params=None):
+        self.vector_dir = vector_dir
+        self.search_params = search_params or {}
+        self.index_path = os.path.join(vector_dir, INDEX_FILENAME)
+        self.manifest_path = os.path.join(vector_dir, SHARD_MANIFEST_FILENAME)
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
+
+    def _current_stamp(self):
+        for path in (self.manifest_path, self.index_path):
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            return mtime, read_version_stamp(self.vector_dir)
+        return None, None
+
+    def _read_index(self):
+        if os.path.exists(self.manifest_path):
+            return ShardedIndex.load(self.vector_dir, search_params=self.search_params)
+        index = read_index(self.index_path)
+        apply_search_params(index, **self.search_params)
+        return index
+
+    def _load(self, mtime, version):
+        index = self._read_index()
+        with open(os.path.join(self.vector_dir, DESCRIPTIONS_FILENAME), "r") as f:
+            descriptions = f.read().splitlines()
+        meta = read_index_meta(self.vector_dir)
+        try:
+            with open(os.path.join(self.vector_dir, DOC_STORE_FILENAME), "r") as f:
+                documents = json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"No local doc store in {self.vector_dir}; search results will be resolved from MongoDB")
+            documents = []
+        if documents:
+            # The doc store holds the exact keys; descriptions.txt flattens line breaks
+            descriptions = [doc["key"] if doc else "" for doc in documents]
+        lexical = LexicalIndex.from_documents(documents, descriptions)
+        embeddings, embedding_ids = self._load_embeddings()
+        partitions = PartitionCache(index, documents, embeddings, embedding_ids)
+        logger.info(f"Loaded FAISS index ({index.ntotal} vectors, version {version}) from {self.vector_dir}")
+        return IndexSnapshot(index, descriptions, mtime, version, meta, documents, lexical, partitions)
+
+    def _load_embeddings(self):
+        """
+        Memory-map the saved embedding matrix (used to build filtered-search
+        partitions), or return (None, None) if there is none.
+        """
+        try:
+            embeddings = np.load(os.path.join(self.vector_dir, EMBEDDINGS_FILENAME), mmap_mode="r")
+            embedding_ids = np.load(os.path.join(self.vector_dir, EMBEDDING_IDS_FILENAME))
+        except (OSError, ValueError):
+            return None, None
+        return embeddings, embedding_ids
+
+    def _is_stale(self, snapshot, mtime, version):
+        return snapshot is None or snapshot.mtime != mtime or snapshot.version != version
+
+    def snapshot(self):
+        """
+        Return the resident snapshot, reloading it first if the files on disk
+        have changed. Returns None if no index has been built yet.
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._last_check < self.check_interval:
+            return snapshot
+
+        mtime, version = self._current_stamp()
+        self._last_check = now
+        if mtime is None:
+            if snapshot is None:
+                logger.error(f"No '{INDEX_FILENAME}' found in {self.vector_dir}. Run the index build process first.")
+            return snapshot
+        if not self._is_stale(snapshot, mtime, version):
+            return snapshot
+
+        if snapshot is not None:
+            # Another thread is already reloading; keep serving the old copy
+            if not self._reload_lock.acquire(blocking=False):
+                return snapshot
+        else:
+            self._reload_lock.acquire()
+
+        try:
+            current = self._snapshot
+            if not self._is_stale(current, mtime, version):
+                return current
+            try:
+                self._snapshot = self._load(mtime, version)
+            except Exception as e:
+                logger.error(f"Failed to reload FAISS index: {e}")
+                if current is None:
+                    raise
+            return self._snapshot
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def current(self):
+        """
+        The loaded snapshot, if any, without checking the files on disk.
+        """
+        return self._snapshot
+
+    def invalidate(self):
+        """
+        Force the next snapshot() call to re-check the files on disk.
+        """
+        self._last_check = 0.0
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+import re
+import threading
+import logging
+import numpy as np
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# Identifiers keep their dots and colons ("t.test", "stats::lm")
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.:]*")
+CAMEL_CASE_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+# Function name tokens count this many times more than docstring tokens
+NAME_BOOST = 3
+
+# Queries whose postings number at least 1/DENSE_POSTINGS_RATIO of the
+# catalog are scored with one dense pass; rarer ones only touch their postings
+DENSE_POSTINGS_RATIO = 8
+
+
+def tokenize(text):
+    """
+    Split text into lowercase search tokens. Each identifier yields itself
+    plus its parts, split on '.', ':', '_' and camelCase, so "t.test" matches
+    both "t.test" and "test", and "LinearRegression" matches "linear".
+    """
+    tokens = []
+    for identifier in IDENTIFIER_PATTERN.findall(text or ""):
+        identifier = identifier.strip(".:")
+        if not identifier:
+            continue
+        tokens.append(identifier.lower())
+        parts = [p for p in re.split(r"[._:]+", identifier) if p]
+        for part in parts:
+            pieces = CAMEL_CASE_PATTERN.findall(part) or [part]
+            if len(parts) > 1 or len(pieces) > 1:
+                tokens.extend(piece.lower() for piece in pieces)
+    return tokens
+
+
+def identifier_forms(value):
+    """
+    The spellings an exact-identifier query may use for a catalog function.
+    """
+    package = (value.get("package") or "").lower()
+    name = (value.get("function_name") or "").lower()
+    if not name:
+        return []
+    forms = [name, f"{package}::{name}", f"{package}.{name}"]
+    if "." in name:
+        # Class methods ("KMeans.fit") can be named by the method alone
+        forms.append(name.rsplit(".", 1)[1])
+    return forms
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 inverted index over package, function name, docstring,
+    key and alias-key tokens of the catalog documents, plus an
+    exact-identifier table.
+    Document IDs are the same IDs the FAISS index returns.
+    """
+
+    def __init__(self, postings, num_docs, identifiers, k1=1.5, b=0.75, num_ids=None):
+        # token -> (ids array, precomputed BM25 term weights array)
+        self.postings = postings
+        self.num_docs = num_docs
+        self.identifiers = identifiers
+        self.k1 = k1
+        self.b = b
+        # One past the highest document ID
+        if num_ids is None:
+            num_ids = max((int(ids[-1]) + 1 for ids, _ in postings.values() if len(ids)), default=0)
+        self.num_ids = num_ids
+        self._local = threading.local()
+
+    @classmethod
+    def from_documents(cls, documents, descriptions, k1=1.5, b=0.75):
+        """
+        Build the index from the doc store (list indexed by ID, None for
+        holes), falling back to the description text for IDs without one.
+        """
+        term_counts = {}
+        doc_lengths = np.zeros(len(descriptions), dtype=np.float32)
+        identifiers = {}
+
+        for doc_id, description in enumerate(descriptions):
+            doc = documents[doc_id] if doc_id < len(documents) else None
+            if doc is None and not description:
+                continue
+            if doc is not None:
+                value = doc.get("value", {})
+                tokens = (tokenize(value.get("function_name", "")) * NAME_BOOST
+                          + tokenize(value.get("package", ""))
+                          + tokenize(value.get("docstring", ""))
+                          + tokenize(doc.get("key", "")))
+                forms = identifier_forms(value)
+                for form in dict.fromkeys(forms):
+                    identifiers.setdefault(form, []).append(doc_id)
+                # Collapsed duplicates stay findable by their own keys and names;
+                # a name the canonical entry does not answer to resolves to the
+                # alias itself (doc stores saved before aliases kept their ID
+                # resolve it to the canonical entry)
+                for alias in doc.get("aliases", []):
+                    tokens += tokenize(alias.get("key", ""))
+                    alias_id = alias.get("id", doc_id)
+                    for form in dict.fromkeys(identifier_forms(alias)):
+                        if form not in forms:
+                            identifiers.setdefault(form, []).append(alias_id)
+            else:
+                tokens = tokenize(description)
+
+            doc_lengths[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term_counts.setdefault(token, []).append((doc_id, count))
+
+        num_docs = int(np.count_nonzero(doc_lengths)) or 1
+        avg_length = float(doc_lengths.sum()) / num_docs or 1.0
+        postings = {}
+        for token, entries in term_counts.items():
+            ids = np.fromiter((doc_id for doc_id, _ in entries), dtype=np.int64, count=len(entries))
+            tf = np.fromiter((count for _, count in entries), dtype=np.float32, count=len(entries))
+            norm = k1 * (1.0 - b + b * doc_lengths[ids] / avg_length)
+            postings[token] = (ids, tf * (k1 + 1.0) / (tf + norm))
+
+        logger.info(f"Built lexical index with {len(postings)} terms over {num_docs} documents")
+        return cls(postings, num_docs, {k: np.array(v, dtype=np.int64) for k, v in identifiers.items()}, k1, b,
+                   num_ids=len(descriptions))
+
+    def exact_matches(self, query):
+        """
+        Return the IDs whose function name exactly matches a single-identifier
+        query such as "t.test", "kmeans" or "stats::lm", or None.
+        """
+        normalized = query.strip().lower()
+        if normalized.endswith("()"):
+            normalized = normalized[:-2]
+        if not normalized or any(ch.isspace() for ch in normalized):
+            return None
+        return self.identifiers.get(normalized)
+
+    def _query_postings(self, query):
+        """
+        The (ids, idf-weighted BM25 weights) posting arrays of the query's
+        distinct tokens.
+        """
+        ids_list = []
+        weights_list = []
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            ids, weights = posting
+            idf = np.log(1.0 + (self.num_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            ids_list.append(ids)
+            weights_list.append(weights * idf)
+        return ids_list, weights_list
+
+    def search(self, query, top_k=10, candidates=None):
+        """
+        Return up to top_k (id, bm25_score) pairs, best first. candidates
+        optionally restricts scoring to those IDs.
+        """
+        allowed = (lambda ids: np.isin(ids, candidates)) if candidates is not None else None
+        ids, scores = self._score(query, top_k, allowed)
+        return [(int(doc_id), float(score)) for doc_id, score in zip(ids, scores)]
+
+    def _score(self, query, top_k, allowed=None):
+        """
+        BM25-score the documents in the query's postings and return the
+        (ids, scores) arrays of the top_k, best first. Only documents that
+        share a token with the query are touched, so the cost follows the
+        posting lengths rather than the catalog size. allowed(ids) returns
+        a mask of the posting IDs that may be scored; None scores them all.
+        Queries with long postings are summed densely instead (see
+        DENSE_POSTINGS_RATIO).
+        """
+        ids_list, weights_list = self._query_postings(query)
+        if not ids_list:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        if allowed is not None:
+            masks = [allowed(posting_ids) for posting_ids in ids_list]
+            ids_list = [posting_ids[mask] for posting_ids, mask in zip(ids_list, masks)]
+            weights_list = [posting_weights[mask] for posting_weights, mask in zip(weights_list, masks)]
+        ids = np.concatenate(ids_list)
+        if len(ids) * DENSE_POSTINGS_RATIO >= self.num_ids:
+            # Postings covering much of the catalog are summed in one pass
+            totals = np.bincount(ids, weights=np.concatenate(weights_list), minlength=self.num_ids)
+            unique_ids = np.flatnonzero(totals > 0)
+            scores = totals[unique_ids]
+        else:
+            totals, positions = self._scratch()
+            # A posting lists each document once, so each scatter-add is exact
+            for posting_ids, posting_weights in zip(ids_list, weights_list):
+                totals[posting_ids] += posting_weights
+            # Keep each document's first occurrence, without sorting the postings
+            order = np.arange(len(ids))
+            positions[ids] = order
+            unique_ids = ids[positions[ids] == order]
+            scores = totals[unique_ids]
+            totals[unique_ids] = 0.0
+
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return unique_ids[top], scores[top]
+
+    def _scratch(self):
+        # Each thread keeps its own buffers, so concurrent searches never
+        # share them and later queries find them already paged in
+        scratch = getattr(self._local, "scratch", None)
+        if scratch is None:
+            scratch = (np.zeros(self.num_ids, dtype=np.float64), np.empty(self.num_ids, dtype=np.int64))
+            self._local.scratch = scratch
+        return scratch
+
+    def search_many(self, queries, top_k=10, candidates=None):
+        """
+        BM25-rank every query. Returns (ids, scores) arrays of shape
+        (len(queries), top_k), best first, with ID -1 and score 0 padding
+        rows that match fewer than top_k documents, like a FAISS search.
+        Each query is scored sparsely over its postings (see _score).
+        """
+        num_queries = len(queries)
+        ids_out = np.full((num_queries, top_k), -1, dtype=np.int64)
+        scores_out = np.zeros((num_queries, top_k), dtype=np.float64)
+        num_ids = self.num_ids
+        if not num_queries or not num_ids or top_k <= 0:
+            return ids_out, scores_out
+
+        allowed = None
+        if candidates is not None:
+            member = np.zeros(num_ids, dtype=bool)
+            candidates = np.asarray(candidates, dtype=np.int64)
+            member[candidates[(candidates >= 0) & (candidates < num_ids)]] = True
+            allowed = lambda ids: member[ids]
+
+        for row, query in enumerate(queries):
+            ids, scores = self._score(query, top_k, allowed)
+            ids_out[row, :len(ids)] = ids
+            scores_out[row, :len(ids)] = scores
+        return ids_out, scores_out
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse several ranked ID lists: each ID scores sum(1 / (k + rank)).
+    Returns [(id, fused_score)] best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def fuse_rankings(rankings, k=60):
+    """
+    reciprocal_rank_fusion for many queries at once. rankings are ID arrays
+    of shape (num_queries, depth), best first, padded with -1 (FAISS and
+    search_many results). Returns one fused ID list per query, best first,
+    with ties kept in first-seen order as reciprocal_rank_fusion does.
+    """
+    ids = np.concatenate([np.asarray(ranking, dtype=np.int64) for ranking in rankings], axis=1)
+    weights = np.concatenate([np.broadcast_to(1.0 / (k + np.arange(ranking.shape[1]) + 1), ranking.shape)
+                              for ranking in rankings], axis=1)
+    num_queries, width = ids.shape
+    if not num_queries or not width:
+        return [[] for _ in range(num_queries)]
+
+    # Group each query's repeated IDs; the stable sort keeps first sightings first
+    order = np.argsort(ids, axis=1, kind="stable")
+    sorted_ids = np.take_along_axis(ids, order, axis=1).ravel()
+    sorted_weights = np.take_along_axis(weights, order, axis=1).ravel()
+    positions = order.ravel()
+    rows = np.repeat(np.arange(num_queries), width)
+    starts = np.ones(len(sorted_ids), dtype=bool)
+    starts[1:] = (sorted_ids[1:] != sorted_ids[:-1]) | (rows[1:] != rows[:-1])
+    starts = np.flatnonzero(starts)
+
+    group_ids = sorted_ids[starts]
+    group_rows = rows[starts]
+    group_scores = np.add.reduceat(sorted_weights, starts)
+    group_first = positions[starts]
+    valid = group_ids >= 0
+    group_ids, group_rows = group_ids[valid], group_rows[valid]
+    group_scores, group_first = group_scores[valid], group_first[valid]
+
+    ranked = np.lexsort((group_first, -group_scores, group_rows))
+    counts = np.bincount(group_rows, minlength=num_queries)
+    return [part.tolist() for part in np.split(group_ids[ranked], np.cumsum(counts)[:-1])]
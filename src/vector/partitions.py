@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+import faiss
+
+from vector.index_builders import search_parameters
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+FILTER_FIELDS = ("language", "package", "module")
+
+
+def normalize_filters(filters):
+    """
+    Turn a filters dict into a hashable key, or None when nothing is filtered.
+    Supported filters: language ("python"/"r"), package (prefix, dot-aware)
+    and module (prefix, dot-aware).
+    """
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown search filter(s): {', '.join(sorted(unknown))}")
+    key = tuple((field, str(filters[field]).lower()) for field in FILTER_FIELDS if filters.get(field))
+    return key or None
+
+
+def _has_prefix(name, prefix):
+    name = (name or "").lower()
+    return name == prefix or name.startswith(prefix + ".")
+
+
+def matches_filters(value, filter_key):
+    """
+    Check a catalog entry's value against a normalized filter key.
+    """
+    for field, wanted in filter_key:
+        if field == "language":
+            if (value.get("language") or "").lower() != wanted:
+                return False
+        elif field == "package":
+            if not _has_prefix(value.get("package"), wanted):
+                return False
+        elif field == "module":
+            if not _has_prefix(value.get("module") or value.get("package"), wanted):
+                return False
+    return True
+
+
+class Partition:
+    """
+    The IDs matching one filter, with a flat sub-index over just their
+    vectors so a filtered query scans only the partition. A sharded index
+    whose shards the filter maps to exactly (see
+    ShardedIndex.shards_for_filters) is searched on those shards instead.
+    Without stored vectors it falls back to searching the full index, or
+    the shards the filter maps to, with an ID selector.
+    """
+
+    def __init__(self, ids, sub_index=None, full_index=None, shards=None):
+        self.ids = ids
+        self.sub_index = sub_index
+        self.full_index = full_index
+        self.shards = shards
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query_vectors, top_k):
+        if self.sub_index is not None:
+            return self.sub_index.search(query_vectors, min(top_k, max(len(self.ids), 1)))
+        if self.shards is not None and self.full_index.shard_ntotal(self.shards) == len(self.ids):
+            return self.full_index.search(query_vectors, top_k, shards=self.shards)
+        selector = faiss.IDSelectorBatch(self.ids)
+        if hasattr(self.full_index, "shard_names"):
+            return self.full_index.search(query_vectors, top_k, selector=selector, shards=self.shards)
+        return self.full_index.search(query_vectors, top_k, params=search_parameters(self.full_index, selector))
+
+
+class PartitionCache:
+    """
+    Builds and caches partitions for one index snapshot, keeping the most
+    recently used max_entries of them.
+    """
+
+    def __init__(self, index, documents, embeddings=None, embedding_ids=None, max_entries=32):
+        self.index = index
+        self.documents = documents
+        self.embeddings = embeddings
+        self.embedding_ids = embedding_ids
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, filter_key):
+        ids = np.array([doc_id for doc_id, doc in enumerate(self.documents)
+                        if doc is not None and matches_filters(doc.get("value", {}), filter_key)], dtype=np.int64)
+        shards = getattr(self.index, "shards_for_filters", lambda key: None)(filter_key)
+        if shards is not None and self.index.shard_ntotal(shards) == len(ids):
+            logger.info(f"Search partition {dict(filter_key)} routed to {len(shards)} index shard(s)")
+            return Partition(ids, full_index=self.index, shards=shards)
+        if self.embeddings is None or not len(ids):
+            return Partition(ids, full_index=self.index, shards=shards)
+
+        rows = np.nonzero(np.isin(self.embedding_ids, ids))[0]
+        sub_index = faiss.IndexIDMap2(faiss.IndexFlatL2(self.embeddings.shape[1]))
+        sub_index.add_with_ids(np.ascontiguousarray(self.embeddings[rows], dtype=np.float32),
+                               np.asarray(self.embedding_ids[rows], dtype=np.int64))
+        logger.info(f"Built search partition {dict(filter_key)} with {len(ids)} functions")
+        return Partition(ids, sub_index=sub_index)
+
+    def get(self, filter_key):
+        with self._lock:
+            partition = self._cache.get(filter_key)
+            if partition is not None:
+                self._cache.move_to_end(filter_key)
+                return partition
+
+        partition = self._build(filter_key)
+        with self._lock:
+            self._cache[filter_key] = partition
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return partition
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import time
+import logging
+from functools import lru_cache
+import numpy as np
+
+from vector.lexical_index import tokenize
+from catalog.param_schema import get_param_schema
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# Words that say nothing about which function is meant
+STOPWORDS = {
+    "a", "an", "the", "to", "of", "on", "in", "for", "and", "or", "with", "by", "from", "my", "me", "i",
+    "please", "do", "run", "perform", "make", "compute", "calculate", "using", "use", "some", "data"
+}
+
+# Feature weights: original rank prior, query coverage of the docstring,
+# of the function name/signature, share of the user's args the function
+# accepts, and share of required parameters the user left out
+WEIGHTS = np.array([1.0, 0.6, 0.4, 0.8, -0.4], dtype=np.float32)
+
+
+@lru_cache(maxsize=4096)
+def _text_tokens(text):
+    # The same top candidates come back for many queries, so their distinct
+    # tokens are kept rather than re-tokenized every time
+    return tuple(set(tokenize(text)))
+
+
+def _flatten(lists):
+    """
+    Flatten per-candidate lists into (items, owners): one array of all the
+    items and the candidate row each came from.
+    """
+    owners = np.repeat(np.arange(len(lists)), [len(items) for items in lists])
+    items = np.array([item for items in lists for item in items], dtype=str)
+    return items, owners
+
+
+def _lookup(vocabulary, items):
+    """
+    Positions of items in a sorted vocabulary array, and which were found.
+    """
+    positions = np.minimum(np.searchsorted(vocabulary, items), max(len(vocabulary) - 1, 0))
+    return positions, vocabulary[positions] == items if len(vocabulary) else np.zeros(len(items), dtype=bool)
+
+
+def _coverage(token_lists, query_tokens):
+    """
+    Share of query_tokens found in each candidate's tokens, as an array.
+    """
+    vocabulary = np.array(sorted(query_tokens), dtype=str)
+    tokens, owners = _flatten(token_lists)
+    present = np.zeros((len(token_lists), len(vocabulary)), dtype=bool)
+    if len(tokens):
+        positions, hits = _lookup(vocabulary, tokens)
+        present[owners[hits], positions[hits]] = True
+    return present.mean(axis=1)
+
+
+def _name_text(value):
+    return f"{value.get('package', '')} {value.get('function_name', '')} {value.get('signature', '')}"
+
+
+def _arg_fit(values, arg_names):
+    """
+    The args features of each candidate: share of the user's args it
+    accepts and share of its required parameters the user left out.
+    """
+    schemas = [get_param_schema(value) for value in values]
+    wanted = np.array(sorted(arg_names), dtype=str)
+    names, owners = _flatten([schema["names"] for schema in schemas])
+    accepted = np.bincount(owners[_lookup(wanted, names)[1]], minlength=len(values)) / len(arg_names)
+    accepts_kwargs = np.array([schema["accepts_kwargs"] for schema in schemas])
+    required, owners = _flatten([schema["required"] for schema in schemas])
+    missing = np.bincount(owners[~_lookup(wanted, required)[1]], minlength=len(values))
+    return np.stack([np.where(accepts_kwargs, 1.0, accepted),
+                     missing / np.maximum(np.bincount(owners, minlength=len(values)), 1)], axis=1)
+
+
+def rerank(query, candidates, args=None, budget_ms=5.0):
+    """
+    Re-order search results (dicts with "key" and "value", best first) by a
+    weighted sum of local features: the original rank, how much of the query
+    the docstring and the name/signature cover, and how well the function's
+    parameters fit the user's args. Each feature is computed for all
+    candidates at once with NumPy and the candidates are scored in one
+    matrix product. The deadline is checked before each feature is built,
+    and once budget_ms has passed the candidates are returned in their
+    original order without building the rest.
+    """
+    if len(candidates) < 2:
+        return candidates
+    deadline = time.perf_counter() + budget_ms / 1000.0
+    query_tokens = {token for token in tokenize(query) if token not in STOPWORDS}
+    arg_names = set(args or {})
+    values = [candidate.get("value", {}) for candidate in candidates]
+
+    # (feature columns, builder), built in order while the budget lasts
+    stages = []
+    if query_tokens:
+        stages.append((1, lambda: _coverage([_text_tokens(value.get("docstring") or "") for value in values],
+                                            query_tokens)))
+        stages.append((2, lambda: _coverage([_text_tokens(_name_text(value)) for value in values], query_tokens)))
+    if arg_names:
+        stages.append((slice(3, 5), lambda: _arg_fit(values, arg_names)))
+
+    features = np.zeros((len(candidates), len(WEIGHTS)), dtype=np.float32)
+    features[:, 0] = 1.0 / (np.arange(len(candidates), dtype=np.float32) + 1.0)
+    for columns, build in stages:
+        if time.perf_counter() > deadline:
+            break
+        features[:, columns] = build()
+    if time.perf_counter() > deadline:
+        logger.info(f"Re-ranking exceeded its {budget_ms}ms budget; keeping search order")
+        return candidates
+
+    scores = features @ WEIGHTS
+    order = np.argsort(-scores, kind="stable")
+    return [candidates[i] for i in order]
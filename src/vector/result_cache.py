@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import copy
+import threading
+import logging
+from collections import OrderedDict
+
+from vector.embedding_cache import normalize_text
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+
+class ResultCache:
+    """
+    Bounded LRU of ranked search results keyed by (normalized query, top_k,
+    filters, index version). Because the key carries the index version,
+    entries for an older index are never served; clear() drops them eagerly
+    when a new index is saved. Results are copied on the way in and out so
+    callers may modify what they receive.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query, top_k, filter_key, version):
+        return normalize_text(query), top_k, filter_key, version
+
+    def get(self, key):
+        """
+        Return a copy of the cached results for key, or None on a miss.
+        """
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(results)
+
+    def put(self, key, results):
+        if self.max_entries <= 0:
+            return
+        results = copy.deepcopy(results)
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
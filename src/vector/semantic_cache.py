@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import copy
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+import faiss
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+# Nearest cached queries examined per lookup; the closest one may have been
+# answered for a different top_k, filter or index version
+SEARCH_NEIGHBOURS = 4
+
+
+class SemanticCache:
+    """
+    Reuses search results across paraphrased queries. The embeddings of
+    recently answered queries are kept in a small inner-product FAISS index
+    over unit vectors; a new query whose cosine similarity to a cached one
+    is at least threshold, with the same context (top_k, filters, index
+    version), gets that query's results without searching or resolving the
+    catalog. Holds at most max_entries queries, evicting the least recently
+    used. A threshold of 0 disables the cache.
+    """
+
+    def __init__(self, threshold=0.95, max_entries=1000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.index = None
+        # id -> (context, query, results), least recently used first
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return bool(self.threshold) and self.max_entries > 0
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def lookup_many(self, vectors, contexts):
+        """
+        Return cached results (or None) for each query embedding and context.
+        """
+        if not self.enabled or not len(contexts):
+            return [None] * len(contexts)
+        vectors = self._normalize(vectors)
+        found = [None] * len(contexts)
+        with self._lock:
+            if self.index is None or not self.index.ntotal or self.index.d != vectors.shape[1]:
+                self.misses += len(contexts)
+                return found
+            similarities, ids = self.index.search(vectors, min(SEARCH_NEIGHBOURS, self.index.ntotal))
+            for row, context in enumerate(contexts):
+                for similarity, entry_id in zip(similarities[row], ids[row]):
+                    if entry_id < 0 or similarity < self.threshold:
+                        break
+                    entry = self._entries.get(int(entry_id))
+                    if entry is not None and entry[0] == context:
+                        self._entries.move_to_end(int(entry_id))
+                        logger.info(f"Semantic cache hit (cosine {similarity:.3f}) on cached query '{entry[1]}'")
+                        found[row] = entry[2]
+                        break
+                if found[row] is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return [copy.deepcopy(results) if results is not None else None for results in found]
+
+    def put_many(self, vectors, contexts, queries, results):
+        """
+        Remember the results of freshly searched queries.
+        """
+        if not self.enabled or not len(contexts):
+            return
+        vectors = self._normalize(vectors)
+        results = copy.deepcopy(results)
+        with self._lock:
+            if self.index is None or self.index.d != vectors.shape[1]:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+                self._entries.clear()
+            ids = np.arange(self._next_id, self._next_id + len(contexts), dtype=np.int64)
+            self._next_id += len(contexts)
+            self.index.add_with_ids(vectors, ids)
+            for entry_id, context, query, entry_results in zip(ids.tolist(), contexts, queries, results):
+                self._entries[entry_id] = (context, query, entry_results)
+
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                evicted = [self._entries.popitem(last=False)[0] for _ in range(overflow)]
+                self.index.remove_ids(np.array(evicted, dtype=np.int64))
+
+    def clear(self):
+        with self._lock:
+            self.index = None
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import time
+import heapq
+import hashlib
+import threading
+import logging
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import faiss
+
+from vector.index_builders import apply_search_params, index_memory_bytes, read_index, search_parameters
+
+# Setup logging
+logger = logging.getLogger("AutoDS")
+
+SHARD_STRATEGIES = ("package", "hash")
+SHARD_MANIFEST_FILENAME = "shards.json"
+SHARD_DIRNAME = "shards"
+
+
+def shard_name(doc, doc_id, shard_by, num_shards):
+    """
+    Name of the shard a catalog document belongs to: its language and
+    top-level package ("python-sklearn", "r-stats"), or a bucket of its ID.
+    """
+    if shard_by == "hash":
+        return f"hash-{doc_id % num_shards:03d}"
+    value = (doc or {}).get("value", {}) if isinstance(doc, dict) else {}
+    package = (value.get("package") or "unknown").split(".")[0]
+    return _sanitize(f"{value.get('language') or 'unknown'}-{package}".lower())
+
+
+def _sanitize(name):
+    return re.sub(r"[^a-z0-9_.-]", "_", name)
+
+
+def assign_shards(documents, ids, shard_by, num_shards=8):
+    """
+    Group the rows of an ID array by shard. Returns {shard name: row indices}.
+    """
+    if shard_by not in SHARD_STRATEGIES:
+        raise ValueError(f"Unknown shard strategy '{shard_by}'. Choose one of: {', '.join(SHARD_STRATEGIES)}")
+    groups = {}
+    for row, doc_id in enumerate(np.asarray(ids).tolist()):
+        doc = documents[doc_id] if doc_id < len(documents) else None
+        groups.setdefault(shard_name(doc, doc_id, shard_by, num_shards), []).append(row)
+    return {name: np.array(rows, dtype=np.int64) for name, rows in sorted(groups.items())}
+
+
+def ids_digest(ids):
+    return hashlib.sha256(np.sort(np.asarray(ids, dtype=np.int64)).tobytes()).hexdigest()[:16]
+
+
+class ShardedIndex:
+    """
+    A set of separately saved ID-mapped FAISS indexes searched as one. A
+    search fans out across shards on a thread pool (FAISS releases the GIL)
+    and merges each shard's sorted top-k with a heap. Shards are read from
+    disk on first use, so a process only loads the shards it searches.
+    Exposes the d, ntotal and search() parts of the FAISS index interface.
+    """
+
+    def __init__(self, shard_dir, manifest, indexes=None, search_params=None, max_workers=None):
+        self.shard_dir = shard_dir
+        self.manifest = manifest
+        self.d = manifest["dimension"]
+        self.ntotal = sum(shard["ntotal"] for shard in manifest["shards"].values())
+        self.search_params = search_params or {}
+        self.max_workers = max_workers or min(len(manifest["shards"]), os.cpu_count() or 1) or 1
+        self._indexes = dict(indexes or {})
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @property
+    def shard_names(self):
+        return list(self.manifest["shards"])
+
+    @property
+    def loaded_shards(self):
+        return list(self._indexes)
+
+    def shards_for_filters(self, filter_key):
+        """
+        Names of the shards that can hold entries matching a normalized
+        filter key (see partitions.normalize_filters), or None when the
+        filter does not narrow the shards: hash sharding, or a module filter
+        alone. Package shards are named "<language>-<top-level package>", so
+        language and package filters pick shards by name.
+        """
+        if self.manifest.get("shard_by") != "package" or not filter_key:
+            return None
+        wanted = dict(filter_key)
+        if "language" not in wanted and "package" not in wanted:
+            return None
+        language = _sanitize(wanted["language"]) if "language" in wanted else None
+        package = _sanitize(wanted["package"].split(".")[0]) if "package" in wanted else None
+        names = []
+        for name in self.shard_names:
+            shard_language, _, shard_package = name.partition("-")
+            if language is not None and shard_language != language:
+                continue
+            if package is not None and shard_package != package:
+                continue
+            names.append(name)
+        return names
+
+    def shard_ntotal(self, names):
+        return sum(self.manifest["shards"][name]["ntotal"] for name in names)
+
+    def shard(self, name):
+        """
+        Return a shard's index, reading it from disk the first time.
+        """
+        index = self._indexes.get(name)
+        if index is not None:
+            return index
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                index = read_index(os.path.join(self.shard_dir, self.manifest["shards"][name]["file"]))
+                apply_search_params(index, **self.search_params)
+                self._indexes[name] = index
+                logger.info(f"Loaded index shard '{name}' ({index.ntotal} vectors)")
+        return index
+
+    def _executor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="autods-shard")
+        return self._pool
+
+    def search(self, query_vectors, top_k, selector=None, shards=None):
+        """
+        Search every shard (or just the named ones) and return FAISS-style
+        (distances, ids) arrays of shape (n_queries, top_k), padded with
+        inf / -1 when fewer results exist. selector optionally restricts
+        the IDs searched; each shard gets search parameters of its own type.
+        """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        names = [name for name in (shards or self.shard_names) if self.manifest["shards"][name]["ntotal"]]
+
+        def search_shard(name):
+            index = self.shard(name)
+            k = min(top_k, index.ntotal)
+            if selector is None:
+                return index.search(query_vectors, k)
+            return index.search(query_vectors, k, params=search_parameters(index, selector))
+
+        if len(names) > 1:
+            shard_results = list(self._executor().map(search_shard, names))
+        else:
+            shard_results = [search_shard(name) for name in names]
+
+        distances = np.full((len(query_vectors), top_k), np.inf, dtype=np.float32)
+        ids = np.full((len(query_vectors), top_k), -1, dtype=np.int64)
+        for row in range(len(query_vectors)):
+            # Each shard's hits are already sorted, so a k-way heap merge suffices
+            streams = [zip(shard_distances[row], shard_ids[row]) for shard_distances, shard_ids in shard_results]
+            hits = ((d, i) for d, i in heapq.merge(*streams, key=lambda hit: hit[0]) if i >= 0)
+            for col, (distance, doc_id) in enumerate(islice(hits, top_k)):
+                distances[row, col] = distance
+                ids[row, col] = doc_id
+        return distances, ids
+
+    def memory_bytes(self):
+        """
+        Memory held by the shards loaded so far; unloaded shards cost nothing.
+        """
+        return sum(index_memory_bytes(self._indexes[name]) for name in self.loaded_shards)
+
+    def stored_bytes(self):
+        """
+        Memory all shards take once loaded, from the sizes recorded when they
+        were built (shards from manifests without sizes are read to measure).
+        """
+        return sum(shard["bytes"] if "bytes" in shard else index_memory_bytes(self.shard(name))
+                   for name, shard in self.manifest["shards"].items())
+
+    @classmethod
+    def build(cls, groups, ids, build_shard, shard_by, dimension, num_shards=None, previous=None):
+        """
+        Build one index per shard. groups maps shard names to row indices of
+        ids; build_shard(rows) returns an ID-mapped index over those rows.
+        Shards of a previous ShardedIndex with the same IDs are reused as is,
+        so an update only rebuilds the shards whose membership changed.
+        """
+        token = str(time.time_ns())
+        shards = {}
+        indexes = {}
+        reused = 0
+        for name, rows in groups.items():
+            digest = ids_digest(ids[rows])
+            old = previous.manifest["shards"].get(name) if previous is not None else None
+            if old is not None and old.get("ids_digest") == digest:
+                shards[name] = old
+                reused += 1
+                continue
+            indexes[name] = build_shard(rows)
+            shards[name] = {"file": f"{name}-{token}.index", "ntotal": len(rows), "ids_digest": digest,
+                            "bytes": index_memory_bytes(indexes[name])}
+        logger.info(f"Built {len(indexes)} of {len(groups)} index shards by {shard_by}; reused {reused}")
+        manifest = {"shard_by": shard_by, "num_shards": num_shards, "dimension": dimension, "shards": shards}
+        shard_dir = previous.shard_dir if previous is not None else None
+        return cls(shard_dir, manifest, indexes)
+
+    def save(self, vector_dir):
+        """
+        Write newly built shards and then the manifest (via os.replace). Shard
+        files referenced by neither this manifest nor the one it replaces are
+        deleted; the previous generation is kept for searches still using it.
+        """
+        shard_dir = os.path.join(vector_dir, SHARD_DIRNAME)
+        os.makedirs(shard_dir, exist_ok=True)
+        for name, index in self._indexes.items():
+            path = os.path.join(shard_dir, self.manifest["shards"][name]["file"])
+            if not os.path.exists(path):
+                faiss.write_index(index, f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+
+        manifest_path = os.path.join(vector_dir, SHARD_MANIFEST_FILENAME)
+        previous = read_shard_manifest(vector_dir)
+        keep = {shard["file"] for shard in self.manifest["shards"].values()}
+        keep.update(shard["file"] for shard in previous.get("shards", {}).values())
+        with open(f"{manifest_path}.tmp", "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+        self.shard_dir = shard_dir
+
+        for filename in os.listdir(shard_dir):
+            if filename.endswith(".index") and filename not in keep:
+                os.remove(os.path.join(shard_dir, filename))
+
+    @classmethod
+    def load(cls, vector_dir, search_params=None):
+        """
+        Open a saved sharded index without reading any shard yet.
+        """
+        manifest = read_shard_manifest(vector_dir)
+        if not manifest:
+            return None
+        return cls(os.path.join(vector_dir, SHARD_DIRNAME), manifest, search_params=search_params)
+
+
+def read_shard_manifest(vector_dir):
+    """
+    Return the saved shard manifest, or {} if the index is not sharded.
+    """
+    try:
+        with open(os.path.join(vector_dir, SHARD_MANIFEST_FILENAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
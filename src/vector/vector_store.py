@@ -4,50 +4,193 @@ import numpy as np
 import os
 import json
 import sys
+import time
+import argparse
+import asyncio
 import logging
-from pymongo import MongoClient
 from dotenv import load_dotenv
-import openai
+
+# Ensure we can import from sibling folders when run as a script
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from vector.index_manager import (
+    IndexManager, INDEX_FILENAME, DESCRIPTIONS_FILENAME, META_FILENAME, DOC_STORE_FILENAME,
+    read_index_meta, write_version_stamp
+)
+from vector.embedding_cache import EmbeddingCache, normalize_text, read_query_log
+from vector.embedding_providers import get_provider
+from vector.embedding_store import EmbeddingStore, compute_content_hash
+from vector.batch_embedder import BatchEmbedder
+from vector.lexical_index import fuse_rankings
+from vector.partitions import matches_filters, normalize_filters
+from vector.result_cache import ResultCache
+from vector.semantic_cache import SemanticCache
+from vector.dedup import DEDUP_VERSION, collapse_duplicates, dedup_bucket, fold_aliases
+from vector.reranker import rerank as rerank_results
+from vector.shards import SHARD_MANIFEST_FILENAME, SHARD_STRATEGIES, ShardedIndex, assign_shards
+from vector.index_builders import (
+    INDEX_TYPES, REMOVABLE_INDEX_TYPES, create_index, index_memory_bytes, measure_recall, supported_params
+)
+from agent.tracing import span
+from catalog.mongo_client import CatalogUnavailableError, get_catalog, require_connection
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AutoDS")
 
-# Load environment variables (ensure OPENAI_API_KEY is set)
+# Load environment variables (OPENAI_API_KEY is required for the default
+# OpenAI backend; AUTODS_EMBEDDING_BACKEND=hashing runs fully offline)
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("Missing OPENAI_API_KEY environment variable. Check .env file or system envs.")
-openai.api_key = OPENAI_API_KEY
+embedding_provider = get_provider()
+
+# Directory holding the saved index and its supporting files
+VECTOR_DIR = os.getenv("AUTODS_VECTOR_DIR", os.path.join(script_dir, "vectors"))
+
+# Index type and tuning used for builds; see index_builders.create_index
+INDEX_TYPE = os.getenv("AUTODS_INDEX_TYPE", "flat")
+
+# Storage precision of the saved embedding matrix ("float32" or "float16")
+EMBEDDING_DTYPE = os.getenv("AUTODS_EMBEDDING_DTYPE", "float32")
+
+# Shards per index for hash sharding (--shard-by hash)
+DEFAULT_NUM_SHARDS = int(os.getenv("AUTODS_NUM_SHARDS", "8"))
+
+# Collapse catalog entries for the same function into one vector before
+# indexing; entries in one package whose embeddings are at least this
+# cosine-similar are merged too (0 merges by function name only)
+DEDUP_ENABLED = os.getenv("AUTODS_DEDUP", "1") != "0"
+DEDUP_THRESHOLD = float(os.getenv("AUTODS_DEDUP_THRESHOLD", "0.97"))
+
+# Query-time knobs for approximate indexes (unset keeps the values saved in the index)
+SEARCH_PARAMS = {
+    "nprobe": int(os.environ["AUTODS_NPROBE"]) if os.getenv("AUTODS_NPROBE") else None,
+    "ef_search": int(os.environ["AUTODS_EF_SEARCH"]) if os.getenv("AUTODS_EF_SEARCH") else None
+}
+
+# Resident index shared by every search in this process
+index_manager = IndexManager(VECTOR_DIR, search_params=SEARCH_PARAMS)
+
+# Candidates taken from each of the vector and lexical rankings before fusion
+HYBRID_CANDIDATES = int(os.getenv("AUTODS_HYBRID_CANDIDATES", "50"))
 
-# Setup MongoDB connection
-mongo_client = MongoClient("mongodb://localhost:27017/")
-db = mongo_client["AutoDS"]
-functions_catalog = db["functions_catalog"]
+# Optional local re-ranking of the top candidates (AUTODS_RERANK=1), with a
+# per-query time budget after which the search order is kept
+RERANK_ENABLED = os.getenv("AUTODS_RERANK", "0") == "1"
+RERANK_CANDIDATES = int(os.getenv("AUTODS_RERANK_CANDIDATES", "20"))
+RERANK_BUDGET_MS = float(os.getenv("AUTODS_RERANK_BUDGET_MS", "5"))
+
+# Concurrency and rate limits for embedding catalog entries during builds
+# (0 disables a limit); finished batches are checkpointed for resuming
+EMBED_CONCURRENCY = int(os.getenv("AUTODS_EMBED_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_MINUTE = int(os.getenv("AUTODS_EMBED_RPM", "0"))
+EMBED_TOKENS_PER_MINUTE = int(os.getenv("AUTODS_EMBED_TPM", "0"))
+EMBED_MAX_RETRIES = int(os.getenv("AUTODS_EMBED_MAX_RETRIES", "6"))
+
+# Query embeddings are cached in memory and in an SQLite file so repeated
+# queries never make a round trip to the embedding API
+embedding_cache = EmbeddingCache(
+    db_path=os.getenv("AUTODS_EMBEDDING_CACHE", os.path.join(VECTOR_DIR, "embedding_cache.sqlite")),
+    max_memory_entries=int(os.getenv("AUTODS_EMBEDDING_CACHE_MEMORY", "10000")),
+    max_disk_entries=int(os.getenv("AUTODS_EMBEDDING_CACHE_DISK", "1000000"))
+)
+
+
+# Ranked results of recent searches, keyed by query, top_k, filters and
+# index version (0 disables)
+result_cache = ResultCache(max_entries=int(os.getenv("AUTODS_RESULT_CACHE_SIZE", "1024")))
+
+
+# Embeddings of recently answered queries; a paraphrase within this cosine
+# similarity of one reuses its results (0 disables)
+semantic_cache = SemanticCache(
+    threshold=float(os.getenv("AUTODS_SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    max_entries=int(os.getenv("AUTODS_SEMANTIC_CACHE_SIZE", "1000"))
+)
+
+
+def fetch_embeddings(texts):
+    """
+    Retrieve embedding vectors for a list of texts from the configured provider.
+    """
+    return list(embedding_provider.embed(texts))
 
 
 def get_embedding(text: str):
     """
-    Retrieve an embedding vector from OpenAI given the text.
+    Retrieve an embedding vector for the text, from the cache if possible
+    and from the configured provider otherwise.
     """
     try:
-        response = openai.Embedding.create(
-            model="text-embedding-3-small",
-            input=[text]
+        return embedding_cache.get_or_compute(
+            embedding_provider.identity, text, lambda t: fetch_embeddings([t])[0]
         )
-        # Return the embedding vector as a NumPy array
-        return np.array(response["data"][0]["embedding"])
     except Exception as e:
         logger.error(f"Error getting embedding: {e}")
         raise
 
 
+def get_embeddings(texts, batch_size=100):
+    """
+    Retrieve embedding vectors for many texts as an (n, d) float32 matrix.
+    Cached texts are served from the cache; the rest are embedded in chunks
+    of batch_size texts per provider call. Like the cache's prewarm and
+    get_or_compute, the provider sees the normalized text the cache keys by.
+    """
+    identity = embedding_provider.identity
+    with span("embedding", texts=len(texts), backend=identity) as stage:
+        vectors = [embedding_cache.get(identity, text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        stage.set(cache_hits=len(texts) - len(missing))
+
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            embedded = fetch_embeddings([normalize_text(texts[i]) for i in chunk])
+            for i, vector in zip(chunk, embedded):
+                embedding_cache.put(identity, texts[i], vector)
+                vectors[i] = vector
+
+        return np.array(vectors, dtype=np.float32)
+
+
+async def aget_embeddings(texts, batch_size=100):
+    """
+    Async get_embeddings: cache misses are embedded with the provider's
+    async client, batch_size texts per call.
+    """
+    identity = embedding_provider.identity
+    with span("embedding", texts=len(texts), backend=identity) as stage:
+        vectors = [embedding_cache.get(identity, text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        stage.set(cache_hits=len(texts) - len(missing))
+
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            embedded = await embedding_provider.aembed([normalize_text(texts[i]) for i in chunk])
+            for i, vector in zip(chunk, embedded):
+                embedding_cache.put(identity, texts[i], vector)
+                vectors[i] = vector
+
+        return np.array(vectors, dtype=np.float32)
+
+
+def prewarm_embedding_cache(log_path):
+    """
+    Embed every query in a query log that is not cached yet.
+    """
+    added = embedding_cache.prewarm(embedding_provider.identity, read_query_log(log_path), fetch_embeddings)
+    logger.info(f"Embedding cache stats: {embedding_cache.stats()}")
+    return added
+
+
 def load_function_data():
     """
     Load all documents from 'functions_catalog'.
     Returns a list of text descriptions and a mapping of ID to full document.
     """
-    functions = list(functions_catalog.find({}, {"_id": 1, "key": 1, "value": 1}))
+    functions = list(get_catalog().find({}, {"_id": 1, "key": 1, "value": 1, "content_hash": 1}))
     logger.info(f"Loaded {len(functions)} functions from 'functions_catalog'")
 
     if not functions:
@@ -58,181 +201,812 @@ def load_function_data():
     for func in functions:
         doc_id = str(func["_id"])
         text_key = func["key"]
+        # Entries written before unify_database.py stored hashes get one here
+        if not func.get("content_hash"):
+            func["content_hash"] = compute_content_hash(func)
         function_map[doc_id] = func
         descriptions.append(text_key)
     return descriptions, function_map
 
 
-def build_faiss_index():
+def unique_entries(function_map):
+    """
+    Return (content_hash, key) for each distinct catalog entry, in catalog
+    order. Entries with identical content share one vector.
+    """
+    entries = {}
+    for func in function_map.values():
+        entries.setdefault(func["content_hash"], func["key"])
+    return list(entries.items())
+
+
+def build_documents(store, function_map):
+    """
+    Build the local doc store: a list indexed by index ID holding the
+    {"key", "value"} of each catalog entry (None for removed IDs).
+    """
+    by_hash = {func["content_hash"]: func for func in function_map.values()}
+    documents = [None] * store.next_id
+    for entry_id, entry in store.entries.items():
+        func = by_hash.get(entry["hash"])
+        if func is not None:
+            documents[entry_id] = {"key": func["key"], "value": func["value"]}
+    return documents
+
+
+def embed_texts(texts, batch_size=100):
+    """
+    Embed catalog texts for an index build, batch_size texts per request,
+    with several requests in flight (see BatchEmbedder). Returns an (n, d)
+    float32 matrix; raises if a batch still fails after retries, leaving the
+    finished batches checkpointed so the next build resumes from them.
+    """
+    embedder = BatchEmbedder(
+        embed=embedding_provider.embed,
+        identity=embedding_provider.identity,
+        checkpoint_root=os.path.join(VECTOR_DIR, "checkpoints"),
+        batch_size=batch_size,
+        concurrency=EMBED_CONCURRENCY,
+        requests_per_minute=EMBED_REQUESTS_PER_MINUTE or None,
+        tokens_per_minute=EMBED_TOKENS_PER_MINUTE or None,
+        max_retries=EMBED_MAX_RETRIES
+    )
+    return embedder.embed_all(texts)
+
+
+def dedup_threshold(index_params):
+    """
+    The cosine threshold for collapsing near-duplicate entries (0 groups
+    by function name only), or None when duplicates are not collapsed.
+    """
+    if not index_params.get("dedup", DEDUP_ENABLED):
+        return None
+    return float(index_params.get("dedup_threshold", DEDUP_THRESHOLD))
+
+
+def index_from_store(store, index_type, index_params, recall_k=10, documents=None, previous=None):
+    """
+    Build an ID-mapped FAISS index over every vector in an EmbeddingStore.
+    Unless index_params["dedup"] is False, entries for the same function
+    are first collapsed to one vector (see dedup.collapse_duplicates) and
+    their keys are folded into documents as aliases, in place.
+    With index_params["shard_by"] ("package" or "hash", plus "num_shards")
+    it builds a ShardedIndex instead, grouping IDs by their documents;
+    shards of a previous ShardedIndex whose IDs did not change are reused.
+    Returns (index, build_info), which records the index size and its
+    memory saving against a float32 flat index.
+    """
+    build_start = time.perf_counter()
+    create_params = {k: v for k, v in index_params.items()
+                     if k not in ("shard_by", "num_shards", "dedup", "dedup_threshold")}
+    threshold = dedup_threshold(index_params)
+    ids, vectors = store.ids, store.vectors
+    dedup_info = None
+    if threshold is not None:
+        rows, groups = collapse_duplicates(documents, store.ids, store.vectors, threshold)
+        fold_aliases(documents, groups)
+        ids, vectors = store.ids[rows], store.vectors[rows]
+        dedup_info = {"threshold": threshold, "version": DEDUP_VERSION, "groups": len(groups),
+                      "collapsed": len(store.ids) - len(rows)}
+
+    shard_by = index_params.get("shard_by")
+    if shard_by:
+        num_shards = index_params.get("num_shards") or DEFAULT_NUM_SHARDS
+        shard_groups = assign_shards(documents, ids, shard_by, num_shards)
+        index = ShardedIndex.build(
+            shard_groups, ids,
+            lambda rows: create_index(index_type, vectors[rows], ids=ids[rows], **create_params),
+            shard_by, vectors.shape[1], num_shards=num_shards, previous=previous
+        )
+        index_bytes = index.stored_bytes()
+    else:
+        index = create_index(index_type, vectors, ids=ids, **create_params)
+        index_bytes = index_memory_bytes(index)
+    flat_bytes = store.vectors.shape[0] * store.vectors.shape[1] * 4
+    build_info = {
+        "index_type": index_type,
+        "index_params": index_params,
+        "build_seconds": round(time.perf_counter() - build_start, 3),
+        "embedding_store_version": store.version,
+        "index_bytes": index_bytes,
+        "memory_reduction": round(flat_bytes / max(index_bytes, 1), 2),
+        "dedup": dedup_info
+    }
+    logger.info(f"{index_type} index takes {index_bytes / 2**20:.1f} MiB "
+                f"({build_info['memory_reduction']}x smaller than float32 flat)")
+    exact = (index_type == "flat" and not index_params.get("reduce_dim")
+             and index_params.get("vector_dtype", "float32") == "float32")
+    if not exact:
+        recall = measure_recall(index, vectors, ids=ids, k=recall_k)
+        build_info[f"recall@{recall_k}"] = round(recall, 4)
+        logger.info(f"{index_type} index recall@{recall_k} against flat baseline: {recall:.4f}")
+    return index, build_info
+
+
+def build_faiss_index(index_type=None, index_params=None, recall_k=10):
     """
     Build a FAISS index using the 'key' fields from 'functions_catalog'.
-    Returns the (index, descriptions, function_map).
+    index_type is one of INDEX_TYPES (default AUTODS_INDEX_TYPE) and
+    index_params are passed to index_builders.create_index. Approximate
+    indexes are scored with recall@recall_k against an exact flat scan.
+    Returns the (index, documents, function_map, build_info), where documents
+    is the local doc store indexed by index ID (see build_documents).
     """
+    index_type = index_type or INDEX_TYPE
+    index_params = supported_params(index_type, index_params or {})
     descriptions, function_map = load_function_data()
     if not descriptions:
         logger.warning("No descriptions to embed. Stopping build process.")
-        return None, [], {}
-
-    logger.info(f"Generating embeddings for {len(descriptions)} functions.")
-    batch_size = 100
-    all_embeddings = []
-
-    # Generate embeddings in batches
-    for i in range(0, len(descriptions), batch_size):
-        batch = descriptions[i:i + batch_size]
-        total_batches = (len(descriptions) + batch_size - 1) // batch_size
-        logger.info(f"Processing batch {i // batch_size + 1} of {total_batches}")
-        try:
-            response = openai.Embedding.create(
-                model="text-embedding-3-small",
-                input=batch
-            )
-            embeddings = [np.array(item["embedding"]) for item in response["data"]]
-            all_embeddings.extend(embeddings)
-        except Exception as e:
-            logger.error(f"Error generating embeddings: {e}")
-            return None, [], {}
-
-    if not all_embeddings:
+        return None, [], {}, {}
+
+    entries = unique_entries(function_map)
+    logger.info(f"Generating embeddings for {len(entries)} functions.")
+    try:
+        embeddings_array = embed_texts([key for _, key in entries])
+    except Exception as e:
+        logger.error(f"Error generating embeddings: {e}. Finished batches are checkpointed; rerun to resume.")
+        return None, [], {}, {}
+
+    if not len(embeddings_array):
         logger.warning("No embeddings were generated.")
-        return None, [], {}
+        return None, [], {}, {}
 
-    embeddings_array = np.array(all_embeddings).astype('float32')
-    dimension = embeddings_array.shape[1]
+    # Persist the matrix next to the index so later updates and rebuilds
+    # with different index parameters never re-embed unchanged entries
+    store = EmbeddingStore(embedding_provider.name, embedding_provider.model, dtype=EMBEDDING_DTYPE)
+    store.add([h for h, _ in entries], [key for _, key in entries], embeddings_array)
+    store.save(VECTOR_DIR)
 
-    # Build FAISS index using L2 distance
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings_array)
+    # Build the FAISS index (L2 distance for every index type)
+    documents = build_documents(store, function_map)
+    index, build_info = index_from_store(store, index_type, index_params, recall_k, documents)
 
     # Print some sample function keys for debugging
     if descriptions:
         logger.info(f"Sample function keys: {descriptions[:5]}")
 
-    return index, descriptions, function_map
+    return index, documents, function_map, build_info
+
+
+def load_doc_store():
+    """
+    The saved doc store (see save_faiss_index), or None if there is none.
+    """
+    try:
+        with open(os.path.join(VECTOR_DIR, DOC_STORE_FILENAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def regroup_duplicates(store, documents, previous, changed, threshold):
+    """
+    Re-run duplicate collapsing only in the (language, package, module)
+    buckets of the changed (id, key) entries, added or removed, and carry
+    the previous grouping over for every other bucket. previous is the saved doc store,
+    whose canonical documents record that grouping in their aliases.
+    documents is filled in place. Returns (stale_ids, fresh_ids, fresh_rows):
+    the canonical IDs to drop from the index, and the IDs and store rows of
+    the canonical entries to add in their place.
+    """
+    # Removed and alias entries have no document of their own, so their
+    # bucket is found through the canonical document that lists them
+    buckets_by_key = {}
+    for doc in previous:
+        if doc is not None:
+            bucket = dedup_bucket(doc["value"])
+            for key in [doc["key"], *(alias["key"] for alias in doc.get("aliases", []))]:
+                buckets_by_key.setdefault(key, set()).add(bucket)
+    buckets = set()
+    for doc_id, key in changed:
+        doc = documents[doc_id] if doc_id < len(documents) else None
+        if doc is not None:
+            buckets.add(dedup_bucket(doc["value"]))
+        buckets.update(buckets_by_key.get(key, ()))
+
+    def affected(doc):
+        return doc is not None and dedup_bucket(doc["value"]) in buckets
+
+    rows = []
+    for row, doc_id in enumerate(store.ids.tolist()):
+        if affected(documents[doc_id]):
+            rows.append(row)
+        elif doc_id < len(previous):
+            documents[doc_id] = previous[doc_id]
+    rows = np.array(rows, dtype=np.int64)
+    stale_ids = [doc_id for doc_id, doc in enumerate(previous) if affected(doc)]
+    kept, groups = collapse_duplicates(documents, store.ids[rows], store.vectors[rows], threshold)
+    fold_aliases(documents, groups)
+    logger.info(f"Re-grouped duplicates in {len(buckets)} changed module(s) over {len(rows)} entries")
+    return stale_ids, store.ids[rows[kept]], rows[kept]
+
+
+def update_faiss_index(index_type=None, index_params=None, recall_k=10):
+    """
+    Bring the saved index up to date with 'functions_catalog', embedding only
+    entries whose content hash is new and removing entries that are gone.
+    The index is patched in place by ID when its type allows it; with
+    duplicates collapsed, only the packages that gained or lost entries are
+    re-grouped and their canonical vectors swapped. Otherwise the index is
+    rebuilt from the saved embedding matrix without re-embedding.
+    Falls back to a full build when there is no compatible saved matrix.
+    Returns True on success.
+    """
+    store = EmbeddingStore.load(VECTOR_DIR)
+    if store is None or not store.matches(embedding_provider):
+        logger.info("No embedding store for the current backend; running a full build")
+        index, documents, function_map, build_info = build_faiss_index(index_type, index_params, recall_k)
+        if index is None:
+            return False
+        save_faiss_index(index, documents, function_map, build_info)
+        return True
+
+    meta = read_index_meta(VECTOR_DIR)
+    index_type = index_type or meta.get("index_type", INDEX_TYPE)
+    if index_params is None:
+        index_params = meta.get("index_params", {}) if index_type == meta.get("index_type") else {}
+    index_params = supported_params(index_type, index_params)
 
+    descriptions, function_map = load_function_data()
+    entries = unique_entries(function_map)
+    current_hashes = {content_hash for content_hash, _ in entries}
+    removed_ids = [entry_id for content_hash, entry_id in store.hash_to_id.items()
+                   if content_hash not in current_hashes]
+    added = [(content_hash, key) for content_hash, key in entries if content_hash not in store.hash_to_id]
+    logger.info(f"Catalog changes: {len(added)} new or changed entries, {len(removed_ids)} removed")
+
+    rebuild_index = (
+        index_type != meta.get("index_type")
+        or index_params != meta.get("index_params", {})
+        or meta.get("embedding_store_version") != store.version
+        or (meta.get("dedup") or {}).get("threshold") != dedup_threshold(index_params)
+        or (dedup_threshold(index_params) is not None and (meta.get("dedup") or {}).get("version") != DEDUP_VERSION)
+    )
+    if not added and not removed_ids and not rebuild_index:
+        logger.info("Index is already up to date")
+        return True
+
+    # Only text that was never embedded goes to the provider; entries whose
+    # value changed but whose key text did not reuse their stored vector
+    rows_by_key = store.vectors_by_key()
+    to_embed = list(dict.fromkeys(key for _, key in added if key not in rows_by_key))
+    try:
+        fresh = dict(zip(to_embed, embed_texts(to_embed))) if to_embed else {}
+    except Exception as e:
+        logger.error(f"Error generating embeddings: {e}. Finished batches are checkpointed; rerun to resume.")
+        return False
+    new_vectors = np.array(
+        [fresh[key] if key in fresh else store.vectors[rows_by_key[key]] for _, key in added],
+        dtype=np.float32
+    ).reshape(len(added), store.vectors.shape[1])
+    logger.info(f"Embedded {len(to_embed)} texts; reused {len(added) - len(to_embed)} stored vectors")
+
+    removed = [(entry_id, store.entries[entry_id]["key"]) for entry_id in removed_ids]
+    store.remove(removed_ids)
+    new_ids = store.add([h for h, _ in added], [key for _, key in added], new_vectors)
+    store.save(VECTOR_DIR)
+
+    documents = build_documents(store, function_map)
+    index_path = os.path.join(VECTOR_DIR, INDEX_FILENAME)
+    threshold = dedup_threshold(index_params)
+    previous = load_doc_store() if threshold is not None else None
+    if not rebuild_index and index_params.get("shard_by"):
+        # Only shards whose membership changed are rebuilt
+        index, build_info = index_from_store(store, index_type, index_params, recall_k, documents,
+                                             previous=ShardedIndex.load(VECTOR_DIR))
+    elif (not rebuild_index and index_type in REMOVABLE_INDEX_TYPES and os.path.exists(index_path)
+          and (threshold is None or previous is not None)):
+        if threshold is not None:
+            # An added entry may join an existing group and a removed one may
+            # have led one, so the changed packages are grouped afresh
+            changed = removed + list(zip(new_ids.tolist(), [key for _, key in added]))
+            stale_ids, add_ids, rows = regroup_duplicates(store, documents, previous, changed, threshold)
+            remove_ids, add_vectors = removed_ids + stale_ids, store.vectors[rows]
+        else:
+            remove_ids, add_ids, add_vectors = removed_ids, new_ids, new_vectors
+        index = faiss.read_index(index_path)
+        if remove_ids:
+            index.remove_ids(np.array(remove_ids, dtype=np.int64))
+        if len(add_ids):
+            index.add_with_ids(np.ascontiguousarray(add_vectors, dtype=np.float32), add_ids)
+        build_info = {k: v for k, v in meta.items() if k not in ("dimension", "ntotal")}
+        build_info["embedding_store_version"] = store.version
+        if threshold is not None:
+            build_info["dedup"] = {"threshold": threshold, "version": DEDUP_VERSION,
+                                   "groups": sum(1 for doc in documents if doc and doc.get("aliases")),
+                                   "collapsed": len(store) - index.ntotal}
+        logger.info(f"Patched index in place: -{len(remove_ids)} +{len(add_ids)} vectors")
+    else:
+        index, build_info = index_from_store(store, index_type, index_params, recall_k, documents)
+        logger.info(f"Rebuilt {index_type} index from {len(store)} stored vectors")
+
+    save_faiss_index(index, documents, function_map, build_info)
+    return True
 
-def save_faiss_index(index, descriptions, function_map):
+
+def save_faiss_index(index, documents, function_map, build_info=None):
     """
-    Save the FAISS index along with descriptions and function map to files.
+    Save the FAISS index along with descriptions, the local doc store and the
+    function map to files. documents is indexed by index ID and holds either
+    {"key", "value"} dicts or plain key strings; entries given only as keys
+    are resolved from MongoDB at search time. build_info (index type,
+    parameters, recall) is recorded in the metadata.
     """
     if index is None:
         logger.warning("No FAISS index to save; skipping save operation.")
         return
 
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    vector_dir = os.path.join(script_dir, "vectors")
+    vector_dir = VECTOR_DIR
     os.makedirs(vector_dir, exist_ok=True)
 
-    # Save the index, descriptions, and function map
-    faiss.write_index(index, os.path.join(vector_dir, "functions.index"))
-    with open(os.path.join(vector_dir, "descriptions.txt"), "w") as f:
+    # Write everything to temporary files first and swap them in with
+    # os.replace, so a process searching the resident index never reads
+    # a half-written file when it reloads
+    # One line per ID, so keys containing line breaks must be flattened
+    descriptions = [" ".join((doc["key"] if isinstance(doc, dict) else (doc or "")).splitlines())
+                    for doc in documents]
+    doc_store = [doc if isinstance(doc, dict) else None for doc in documents]
+    index_path = os.path.join(vector_dir, INDEX_FILENAME)
+    descriptions_path = os.path.join(vector_dir, DESCRIPTIONS_FILENAME)
+    doc_store_path = os.path.join(vector_dir, DOC_STORE_FILENAME)
+    if not isinstance(index, ShardedIndex):
+        faiss.write_index(index, f"{index_path}.tmp")
+    with open(f"{descriptions_path}.tmp", "w") as f:
         f.write("\n".join(descriptions))
+    with open(f"{doc_store_path}.tmp", "w") as f:
+        json.dump(doc_store, f, separators=(",", ":"), default=str)
     with open(os.path.join(vector_dir, "function_map.json"), "w") as f:
         json.dump({k: {"key": v["key"]} for k, v in function_map.items()}, f)
 
-    logger.info(f"Saved FAISS index, descriptions, and function map to {vector_dir}")
+    # Record which embedding backend built the index so queries embedded
+    # with a different backend are refused instead of returning garbage
+    meta_path = os.path.join(vector_dir, META_FILENAME)
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump({
+            "embedding_backend": embedding_provider.name,
+            "embedding_model": embedding_provider.model,
+            "dimension": index.d,
+            "ntotal": index.ntotal,
+            **(build_info or {"index_type": "flat"})
+        }, f, indent=2)
+    os.replace(f"{meta_path}.tmp", meta_path)
+    os.replace(f"{descriptions_path}.tmp", descriptions_path)
+    os.replace(f"{doc_store_path}.tmp", doc_store_path)
+    manifest_path = os.path.join(vector_dir, SHARD_MANIFEST_FILENAME)
+    if isinstance(index, ShardedIndex):
+        index.save(vector_dir)
+        stale_path = index_path
+    else:
+        os.replace(f"{index_path}.tmp", index_path)
+        stale_path = manifest_path
+    # Only one layout may be present; the index manager prefers the shard manifest
+    if os.path.exists(stale_path):
+        os.remove(stale_path)
+
+    # Bump the version stamp last; searchers reload when it changes
+    write_version_stamp(vector_dir, time.time_ns())
+    index_manager.invalidate()
+    result_cache.clear()
+    semantic_cache.clear()
+
+    logger.info(f"Saved FAISS index, descriptions, doc store, and function map to {vector_dir}")
+
+
+def check_index_compatible(meta):
+    """
+    Refuse to search an index built by a different embedding backend or model.
+    Indexes saved before metadata was recorded were built with OpenAI.
+    """
+    built_backend = meta.get("embedding_backend", "openai")
+    built_model = meta.get("embedding_model", "text-embedding-3-small")
+    if (built_backend, built_model) != (embedding_provider.name, embedding_provider.model):
+        logger.error(
+            f"Index was built with {built_backend}:{built_model} but queries use "
+            f"{embedding_provider.identity}. Rebuild the index or change AUTODS_EMBEDDING_BACKEND."
+        )
+        return False
+    return True
+
+
+def resolve_documents(snapshot, ids):
+    """
+    Map index IDs to catalog documents. Documents come from the snapshot's
+    local doc store; only IDs it does not cover (an index saved before the
+    doc store existed) are looked up in MongoDB, in a single query.
+    """
+    documents = {}
+    missing = {}
+    for idx in set(int(i) for i in ids):
+        doc = snapshot.document(idx)
+        if doc is not None:
+            documents[idx] = doc
+        elif 0 <= idx < len(snapshot.descriptions) and snapshot.descriptions[idx]:
+            missing[idx] = snapshot.descriptions[idx]
+
+    if missing:
+        logger.info(f"{len(missing)} matches are not in the local doc store; looking them up in MongoDB")
+        by_key = {}
+        with span("mongo.find", keys=len(set(missing.values()))):
+            for doc in get_catalog().find({"key": {"$in": list(set(missing.values()))}}, {"key": 1, "value": 1}):
+                by_key.setdefault(doc["key"], {"key": doc["key"], "value": doc["value"]})
+        for idx, key in missing.items():
+            if key in by_key:
+                documents[idx] = by_key[key]
+            else:
+                logger.warning(f"Function with key '{key}' not found in database")
+    return documents
+
+
+def hybrid_search(snapshot, queries, top_k, batch_size=100, filters=None, embed=None):
+    """
+    Rank catalog documents for each query. Single-identifier queries that
+    name a function exactly ("t.test", "stats::lm") are answered from the
+    lexical index without an embedding call. All other queries fuse the BM25
+    ranking with the FAISS ranking by reciprocal-rank fusion. With filters,
+    both rankings only consider the matching partition, and the vector
+    search scans only that partition's vectors. embed(texts, batch_size)
+    replaces get_embeddings for embedding the queries. Returns one list of
+    result dicts per query.
+    """
+    embed = embed or get_embeddings
+    lexical = snapshot.lexical
+    filter_key = normalize_filters(filters)
+    partition = snapshot.partitions.get(filter_key) if filter_key else None
+    if partition is not None and not len(partition):
+        logger.info(f"No functions match filters {filters}")
+        return [[] for _ in queries]
+    candidates = partition.ids if partition is not None else None
+    searcher = partition if partition is not None else snapshot
+
+    exact = []
+    for query in queries:
+        ids = lexical.exact_matches(query)
+        if ids is not None and candidates is not None:
+            # Folded aliases are not partition members and match by their own value
+            ids = ids[np.isin(ids, candidates) | np.array(
+                [doc_id in snapshot.aliases and matches_filters(snapshot.aliases[doc_id]["value"], filter_key)
+                 for doc_id in ids.tolist()], dtype=bool)]
+        exact.append(ids if ids is not None and len(ids) else None)
+    rankings = [None] * len(queries)
+    distances_by_query = [{} for _ in queries]
+
+    for row, query in enumerate(queries):
+        if exact[row] is not None:
+            # Order duplicate names by how well the rest of the entry matches
+            scored = lexical.search(query, top_k=len(exact[row]), candidates=exact[row])
+            ranked = [doc_id for doc_id, _ in scored]
+            rankings[row] = ranked + [doc_id for doc_id in exact[row].tolist() if doc_id not in ranked]
+            distances_by_query[row] = {doc_id: 0.0 for doc_id in rankings[row]}
+
+    dense_rows = [row for row in range(len(queries)) if exact[row] is None]
+    if dense_rows:
+        num_candidates = max(top_k, HYBRID_CANDIDATES)
+        query_embeddings = embed([queries[row] for row in dense_rows], batch_size=batch_size)
+        with span("faiss.search", queries=len(dense_rows), k=num_candidates, filtered=partition is not None):
+            distances, indices = searcher.search(query_embeddings, num_candidates)
+        with span("lexical.fuse", queries=len(dense_rows)):
+            lexical_indices, _ = lexical.search_many([queries[row] for row in dense_rows],
+                                                     top_k=num_candidates, candidates=candidates)
+            fused = fuse_rankings([indices, lexical_indices])
+            for i, row in enumerate(dense_rows):
+                distances_by_query[row] = {int(idx): float(d) for idx, d in zip(indices[i], distances[i]) if idx >= 0}
+                rankings[row] = fused[i]
+
+    # Resolve a few spare candidates in case some IDs no longer resolve
+    candidate_ids = [doc_id for ranking in rankings for doc_id in ranking[:top_k * 2]]
+    with span("resolve", ids=len(candidate_ids)):
+        matched_docs = resolve_documents(snapshot, candidate_ids)
+
+    all_results = []
+    for row, ranking in enumerate(rankings):
+        results = []
+        for doc_id in ranking:
+            matched_doc = matched_docs.get(doc_id)
+            if matched_doc is None:
+                continue
+            results.append({
+                "score": distances_by_query[row].get(doc_id),
+                "key": matched_doc["key"],
+                "value": matched_doc["value"],
+                "aliases": [alias["key"] for alias in matched_doc.get("aliases", [])]
+            })
+            if len(results) == top_k:
+                break
+        all_results.append(results)
+    return all_results
+
+
+def cached_hybrid_search(snapshot, queries, top_k, batch_size=100, filters=None, embed=None):
+    """
+    hybrid_search through two caches. Queries answered before against the
+    same index version are served from the result cache. The remaining
+    non-identifier queries are embedded (through the embedding cache) and
+    checked against the semantic cache, so a close paraphrase of an earlier
+    query reuses its results. Only what is left is searched, reusing the
+    vectors embedded for the semantic lookup. embed is passed on to
+    hybrid_search for any other query it embeds.
+    """
+    embed = embed or get_embeddings
+    version = (snapshot.mtime, snapshot.version)
+    filter_key = normalize_filters(filters)
+    context = (top_k, filter_key, version)
+    keys = [ResultCache.make_key(query, top_k, filter_key, version) for query in queries]
+    with span("result_cache", queries=len(queries)) as stage:
+        all_results = [result_cache.get(key) for key in keys]
+        missing = [row for row, results in enumerate(all_results) if results is None]
+        stage.set(hits=len(queries) - len(missing))
+
+    semantic_rows = []
+    if missing and semantic_cache.enabled:
+        semantic_rows = [row for row in missing if snapshot.lexical.exact_matches(queries[row]) is None]
+    if semantic_rows:
+        vectors = embed([queries[row] for row in semantic_rows], batch_size=batch_size)
+        with span("semantic_cache", queries=len(semantic_rows)) as stage:
+            reused = semantic_cache.lookup_many(vectors, [context] * len(semantic_rows))
+            stage.set(hits=sum(results is not None for results in reused))
+        for row, results in zip(semantic_rows, reused):
+            if results is not None:
+                result_cache.put(keys[row], results)
+                all_results[row] = results
+        missing = [row for row in missing if all_results[row] is None]
+
+    if missing:
+        search_embed = embed
+        if semantic_rows:
+            # Queries embedded for the semantic lookup are not embedded again
+            embedded = {queries[row]: vectors[i] for i, row in enumerate(semantic_rows)}
+
+            def search_embed(texts, batch_size=100):
+                unknown = [text for text in dict.fromkeys(texts) if text not in embedded]
+                if unknown:
+                    embedded.update(zip(unknown, embed(unknown, batch_size=batch_size)))
+                return np.array([embedded[text] for text in texts], dtype=np.float32)
+
+        searched = hybrid_search(snapshot, [queries[row] for row in missing], top_k,
+                                 batch_size=batch_size, filters=filters, embed=search_embed)
+        for row, results in zip(missing, searched):
+            result_cache.put(keys[row], results)
+            all_results[row] = results
+
+        searched_rows = set(missing)
+        new_rows = [i for i, row in enumerate(semantic_rows) if row in searched_rows]
+        if new_rows:
+            semantic_cache.put_many(vectors[new_rows], [context] * len(new_rows),
+                                    [queries[semantic_rows[i]] for i in new_rows],
+                                    [all_results[semantic_rows[i]] for i in new_rows])
+    return all_results
+
+
+def search_cache_stats():
+    """
+    Hit statistics of the embedding, result and semantic query caches.
+    """
+    return {
+        "embeddings": embedding_cache.stats(),
+        "results": result_cache.stats(),
+        "semantic": semantic_cache.stats()
+    }
 
 
-def search_function(query, top_k=1):
+def rank_query(snapshot, query, top_k, filters=None, args=None, rerank=False, embed=None):
     """
-    Embed the given query, load the FAISS index, search for the closest match,
-    and return the matching function document(s).
+    Ranked matches for one query against a snapshot, re-ranked when asked.
     """
-    # Special case for linear regression to ensure we get the right function
-    if "linear regression" in query.lower() or "linear model" in query.lower():
-        logger.info("Using direct database lookup for linear regression")
+    if rerank:
+        candidates = cached_hybrid_search(snapshot, [query], max(top_k, RERANK_CANDIDATES),
+                                          filters=filters, embed=embed)[0]
+        with span("rerank", candidates=len(candidates), budget_ms=RERANK_BUDGET_MS):
+            return rerank_results(query, candidates, args, budget_ms=RERANK_BUDGET_MS)[:top_k]
+    return cached_hybrid_search(snapshot, [query], top_k, filters=filters, embed=embed)[0]
+
+
+def _best_matches(query, results, top_k):
+    for result in results:
+        logger.info(f"Found match: '{result['key']}' with distance {result['score']}")
+    if not results:
+        logger.warning(f"No matching functions found for query: '{query}'")
+        return None
+    return results[0] if top_k == 1 else results
 
-        # Try direct database lookup first for reliable matching
-        db_match = functions_catalog.find_one({
-            "$or": [
-                {"key": {"$regex": "linear regression|stats::lm", "$options": "i"}},
-                {"value.package": "stats", "value.function_name": "lm"}
-            ],
-            "value.language": "r"
-        })
 
-        if db_match:
-            logger.info(f"Found direct match: {db_match['key']}")
-            return {
-                "score": 0.0,  # Perfect match
-                "key": db_match["key"],
-                "value": db_match["value"]
-            }
+def search_function(query, top_k=1, filters=None, args=None, rerank=None):
+    """
+    Find the catalog function(s) best matching the query with hybrid lexical
+    and vector search (see hybrid_search). filters may restrict the search
+    by language ("python"/"r"), package prefix and/or module prefix, e.g.
+    {"language": "python", "package": "sklearn"}. "score" is the L2 distance
+    of a vector match, 0.0 for an exact identifier match, or None for a match
+    found only lexically. With rerank (default AUTODS_RERANK), the top
+    RERANK_CANDIDATES are re-ordered by reranker.rerank using the query and
+    the user's args before the top_k are taken.
+    """
+    rerank = RERANK_ENABLED if rerank is None else rerank
+    if not os.path.exists(VECTOR_DIR):
+        logger.error(f"Vector directory not found at {VECTOR_DIR}")
+        return None
 
-    # Normal FAISS search path
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    vector_dir = os.path.join(script_dir, "vectors")
-    index_path = os.path.join(vector_dir, "functions.index")
+    try:
+        with span("search", top_k=top_k, rerank=bool(rerank)) as stage:
+            # Use the resident index; it is only reloaded when the files change
+            with span("index.snapshot"):
+                snapshot = index_manager.snapshot()
+            if snapshot is None:
+                return None
+            if not check_index_compatible(snapshot.meta):
+                return None
+
+            logger.info(f"Searching for query: '{query}'")
+            results = rank_query(snapshot, query, top_k, filters, args, rerank)
+            stage.set(matches=len(results))
+            return _best_matches(query, results, top_k)
 
-    # Check if vector directory exists
-    if not os.path.exists(vector_dir):
-        logger.error(f"Vector directory not found at {vector_dir}")
+    except Exception as e:
+        logger.error(f"Error during search: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
         return None
 
-    # Check if index file exists
-    if not os.path.exists(index_path):
-        logger.error("No 'functions.index' found. Run the index build process first.")
+
+async def search_function_async(query, top_k=1, filters=None, args=None, rerank=None):
+    """
+    Async search_function. Loading the index and searching it (FAISS
+    releases the GIL) run in a worker thread, so the event loop keeps
+    serving other queries. Queries found in the result cache are answered
+    without an embedding; otherwise the embedding is awaited from the
+    provider's async client on the event loop. Matches come from the local doc store, so only indexes saved
+    without one touch MongoDB, from that worker thread.
+    """
+    rerank = RERANK_ENABLED if rerank is None else rerank
+    if not os.path.exists(VECTOR_DIR):
+        logger.error(f"Vector directory not found at {VECTOR_DIR}")
         return None
 
     try:
-        # Load the index and supporting data
-        index = faiss.read_index(index_path)
-        with open(os.path.join(vector_dir, "descriptions.txt"), "r") as f:
-            descriptions = f.read().splitlines()
+        with span("search", top_k=top_k, rerank=bool(rerank)) as stage:
+            with span("index.snapshot"):
+                snapshot = await asyncio.to_thread(index_manager.snapshot)
+            if snapshot is None:
+                return None
+            if not check_index_compatible(snapshot.meta):
+                return None
+
+            logger.info(f"Searching for query: '{query}'")
+            loop = asyncio.get_running_loop()
+            embedded = {}
+
+            def embed(texts, batch_size=100):
+                # Only called past the result cache, so cached queries are never
+                # embedded; misses go back to the loop's async client
+                missing = [text for text in dict.fromkeys(texts) if text not in embedded]
+                if missing:
+                    future = asyncio.run_coroutine_threadsafe(aget_embeddings(missing, batch_size=batch_size), loop)
+                    embedded.update(zip(missing, future.result()))
+                return np.array([embedded[text] for text in texts], dtype=np.float32)
+
+            # to_thread copies the context, so spans opened in the worker join this trace
+            results = await asyncio.to_thread(rank_query, snapshot, query, top_k, filters, args, rerank, embed)
+            stage.set(matches=len(results))
+            return _best_matches(query, results, top_k)
 
-        # Process the query and perform search
-        logger.info(f"Searching for query: '{query}'")
-        query_embedding = np.array([get_embedding(query)]).astype('float32')
-        distances, indices = index.search(query_embedding, top_k)
+    except Exception as e:
+        logger.error(f"Error during search: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return None
 
-        results = []
-        for rank, idx in enumerate(indices[0]):
-            if idx >= len(descriptions) or idx < 0:
-                logger.warning(f"Invalid index {idx} found in search results")
-                continue
 
-            desc = descriptions[idx]
-            logger.info(f"Found match: '{desc}' with distance {distances[0][rank]}")
-
-            # Find corresponding document in the catalog
-            matched_doc = functions_catalog.find_one({"key": desc})
-            if matched_doc:
-                results.append({
-                    "score": float(distances[0][rank]),
-                    "key": desc,
-                    "value": matched_doc["value"]
-                })
-            else:
-                logger.warning(f"Function with key '{desc}' not found in database")
+def search_functions(queries, top_k=1, batch_size=100, filters=None, args=None, rerank=None):
+    """
+    Resolve many queries at once: embed the non-identifier queries in chunked
+    provider calls, run a single index.search over the (N, d) query matrix,
+    and resolve all matches from the local doc store. filters apply to every
+    query, as in search_function. args is one dict of user arguments per
+    query; with rerank (default AUTODS_RERANK) the top RERANK_CANDIDATES of
+    each query are retrieved in the same batch and re-ordered with its args,
+    so matches agree with search_function. Returns one ranked list of matches
+    per query (empty when nothing matched), or None if the index is
+    unavailable.
+    """
+    rerank = RERANK_ENABLED if rerank is None else rerank
+    queries = list(queries)
+    if not queries:
+        return []
+    args = list(args) if args is not None else [None] * len(queries)
 
-        if not results:
-            logger.warning(f"No matching functions found for query: '{query}'")
+    try:
+        snapshot = index_manager.snapshot()
+        if snapshot is None:
+            return None
+        if not check_index_compatible(snapshot.meta):
             return None
 
-        return results[0] if top_k == 1 else results
+        logger.info(f"Searching for {len(queries)} queries in batch")
+        if not rerank:
+            return cached_hybrid_search(snapshot, queries, top_k, batch_size=batch_size, filters=filters)
+        candidates = cached_hybrid_search(snapshot, queries, max(top_k, RERANK_CANDIDATES),
+                                          batch_size=batch_size, filters=filters)
+        with span("rerank", queries=len(queries), budget_ms=RERANK_BUDGET_MS):
+            return [rerank_results(query, found, query_args, budget_ms=RERANK_BUDGET_MS)[:top_k]
+                    for query, found, query_args in zip(queries, candidates, args)]
 
     except Exception as e:
-        logger.error(f"Error during search: {e}")
+        logger.error(f"Error during batch search: {e}")
         import traceback
         logger.error(traceback.format_exc())
         return None
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the AutoDS vector store")
+    parser.add_argument("--prewarm", metavar="QUERY_LOG",
+                        help="Pre-warm the query embedding cache from a query log instead of building")
+    parser.add_argument("--update", action="store_true",
+                        help="Embed only new or changed catalog entries and patch the existing index")
+    parser.add_argument("--concurrency", type=int,
+                        help="Embedding requests in flight during builds (default: AUTODS_EMBED_CONCURRENCY or 4)")
+    parser.add_argument("--index-type", choices=INDEX_TYPES,
+                        help="FAISS index type to build (default: AUTODS_INDEX_TYPE or flat; "
+                             "--update keeps the saved index's type)")
+    parser.add_argument("--nlist", type=int, help="IVF: number of inverted lists (default ~4*sqrt(N))")
+    parser.add_argument("--nprobe", type=int, help="IVF: lists probed per query")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW: graph neighbours per node (M)")
+    parser.add_argument("--ef-construction", type=int, help="HNSW: candidate list size while building")
+    parser.add_argument("--ef-search", type=int, help="HNSW: candidate list size while searching")
+    parser.add_argument("--pq-m", type=int, help="IVFPQ: number of sub-quantizers")
+    parser.add_argument("--pq-bits", type=int, help="IVFPQ: bits per sub-quantizer code")
+    parser.add_argument("--reduce-dim", type=int,
+                        help="Project embeddings to this many dimensions before indexing")
+    parser.add_argument("--reduction", choices=("pca", "truncate"),
+                        help="How --reduce-dim reduces: learned PCA (default) or Matryoshka truncation")
+    parser.add_argument("--shard-by", choices=SHARD_STRATEGIES,
+                        help="Split the index into shards by package or by ID hash, searched in parallel")
+    parser.add_argument("--num-shards", type=int, help="Hash sharding: number of shards (default: AUTODS_NUM_SHARDS or 8)")
+    parser.add_argument("--no-dedup", dest="dedup", action="store_const", const=False,
+                        help="Index every catalog entry instead of collapsing duplicates of one function")
+    parser.add_argument("--dedup-threshold", type=float,
+                        help="Cosine similarity at which entries in one package are merged "
+                             "(default: AUTODS_DEDUP_THRESHOLD or 0.97; 0 merges by name only)")
+    parser.add_argument("--fp16", dest="vector_dtype", action="store_const", const="float16",
+                        help="Store flat/HNSW/IVF index vectors at half precision (ignored for ivfpq)")
+    cli_args = parser.parse_args()
+    if cli_args.concurrency:
+        EMBED_CONCURRENCY = cli_args.concurrency
+
+    if cli_args.prewarm:
+        prewarm_embedding_cache(cli_args.prewarm)
+        sys.exit(0)
+
     logger.info("Building FAISS index from 'functions_catalog' ...")
 
     # Check first if functions_catalog has entries
-    function_count = functions_catalog.count_documents({})
+    try:
+        require_connection()
+    except CatalogUnavailableError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    function_count = get_catalog().count_documents({})
     logger.info(f"Found {function_count} functions in the catalog")
 
     if function_count == 0:
         logger.error("No functions in catalog! Please run unify_database.py first.")
         sys.exit(1)
 
+    build_params = {
+        name: getattr(cli_args, name)
+        for name in ("nlist", "nprobe", "hnsw_m", "ef_construction", "ef_search", "pq_m", "pq_bits",
+                     "reduce_dim", "reduction", "vector_dtype", "shard_by", "num_shards",
+                     "dedup", "dedup_threshold")
+        if getattr(cli_args, name) is not None
+    }
+
+    if cli_args.update:
+        updated = update_faiss_index(cli_args.index_type, build_params or None)
+        sys.exit(0 if updated else 1)
+
     # Proceed with build
-    index, descriptions, function_map = build_faiss_index()
+    index, documents, function_map, build_info = build_faiss_index(cli_args.index_type, build_params)
     if index:
-        save_faiss_index(index, descriptions, function_map)
+        save_faiss_index(index, documents, function_map, build_info)
         logger.info("Vector store built successfully.")
 
         # Quick test of the search functionality
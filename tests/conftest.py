@@ -0,0 +1,34 @@
+import os
+import sys
+import logging
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The AutoDS modules import each other from the src directory
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+
+@pytest.fixture(scope="session")
+def vector_store(tmp_path_factory):
+    """
+    vector_store over a flat index of a small synthetic catalog, embedded
+    offline with the hashing embedder and held in an in-memory MongoDB.
+    """
+    # vector_store reads its settings at import, so they are set first
+    os.environ.update({
+        "AUTODS_EMBEDDING_BACKEND": "hashing",
+        "AUTODS_EMBEDDING_MODEL": "64",
+        "AUTODS_VECTOR_DIR": str(tmp_path_factory.mktemp("vectors")),
+        "AUTODS_EMBEDDING_CACHE": ""
+    })
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+    from benchmark_suite import InMemoryClient, synthetic_catalog
+    from catalog.mongo_client import get_catalog, set_client
+    set_client(InMemoryClient())
+    import vector.vector_store as vs
+    get_catalog().insert_many(synthetic_catalog(200, 0))
+    vs.save_faiss_index(*vs.build_faiss_index("flat"))
+    logging.getLogger("AutoDS").setLevel(logging.WARNING)
+    return vs
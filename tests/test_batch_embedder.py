@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from vector.batch_embedder import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    A fake monotonic clock that time.sleep advances.
+    """
+    now = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(time, "sleep", lambda seconds: now.__setitem__(0, now[0] + seconds))
+    return now
+
+
+def test_request_rate_below_one_per_second_is_enforced(clock):
+    # AUTODS_EMBED_RPM=30
+    bucket = TokenBucket(30 / 60.0)
+    for _ in range(10):
+        bucket.acquire()
+    assert 9 / clock[0] == pytest.approx(0.5)
+
+
+def test_requests_larger_than_the_bucket_are_charged_in_full(clock):
+    # 50-token batches against a 10 tokens/second limit
+    bucket = TokenBucket(10.0)
+    for _ in range(5):
+        bucket.acquire(50)
+    assert 4 * 50 / clock[0] == pytest.approx(10.0)
@@ -0,0 +1,81 @@
+import json
+import asyncio
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def batch_runner(vector_store):
+    import batch_runner
+    return batch_runner
+
+
+def test_invalid_filters_fail_only_their_request(batch_runner, tmp_path):
+    requests = [
+        {"id": "good-1", "query": "arithmetic mean of the data", "args": {"data": [1, 2, 3]}},
+        {"id": "bad", "query": "median middle value", "args": {"data": [1, 2, 3]}, "filters": {"lang": "python"}},
+        {"id": "good-2", "query": "median middle value", "args": {"data": [1, 5, 3]},
+         "filters": {"language": "python"}},
+    ]
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    input_path.write_text("".join(json.dumps(request) + "\n" for request in requests))
+
+    summary = asyncio.run(batch_runner.run_batch(str(input_path), str(output_path)))
+
+    records = {record["id"]: record for record in map(json.loads, output_path.read_text().splitlines())}
+    assert set(records) == {"good-1", "bad", "good-2"}
+    assert records["good-1"]["result"]["success"]
+    assert records["good-2"]["result"]["success"]
+    assert not records["bad"]["result"]["success"]
+    assert "Invalid filters" in records["bad"]["result"]["error"]
+    assert (summary["succeeded"], summary["failed"], summary["no_match"]) == (2, 1, 0)
+
+
+def test_workers_size_the_python_execution_pool(batch_runner, tmp_path):
+    from agent import agent
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    input_path.write_text(json.dumps({"query": "arithmetic mean of the data", "args": {"data": [1, 2]}}) + "\n")
+
+    asyncio.run(batch_runner.run_batch(str(input_path), str(output_path), workers=6))
+
+    python_executor, _ = agent._executors()
+    assert python_executor._max_workers == 6
+
+
+def test_batched_search_reranks_with_each_requests_args(vector_store, monkeypatch):
+    seen = []
+
+    def rerank(query, candidates, args=None, budget_ms=5.0):
+        seen.append((query, args))
+        return candidates[::-1]
+
+    monkeypatch.setattr(vector_store, "rerank_results", rerank)
+    queries = ["arithmetic mean of the data", "median middle value"]
+    args = [{"data": [1, 2]}, {"values": [3]}]
+
+    batched = vector_store.search_functions(queries, args=args, rerank=True)
+    single = [vector_store.search_function(query, 1, args=query_args, rerank=True)
+              for query, query_args in zip(queries, args)]
+
+    assert [found[0]["key"] for found in batched] == [match["key"] for match in single]
+    assert seen[:2] == list(zip(queries, args))
+
+
+def test_failed_search_fails_only_its_chunk(batch_runner, monkeypatch, tmp_path):
+    calls = []
+
+    def search_functions(queries, *rest):
+        calls.append(queries)
+        return None if len(calls) == 1 else [[] for _ in queries]
+
+    monkeypatch.setattr(batch_runner, "search_functions", search_functions)
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    input_path.write_text("".join(json.dumps({"id": i, "query": f"query {i}"}) + "\n" for i in range(4)))
+
+    summary = asyncio.run(batch_runner.run_batch(str(input_path), str(output_path), batch_size=2))
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [record["index"] for record in records] == [0, 1, 2, 3]
+    assert [record["result"]["error"] for record in records] == [batch_runner.SEARCH_FAILED_ERROR] * 2 + \
+        [batch_runner.NO_MATCH_ERROR] * 2
+    assert (summary["failed"], summary["no_match"]) == (2, 2)
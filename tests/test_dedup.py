@@ -0,0 +1,56 @@
+import numpy as np
+
+from vector.dedup import collapse_duplicates, fold_aliases
+from vector.index_manager import IndexSnapshot
+from vector.lexical_index import LexicalIndex
+
+
+def method(module, name, docstring="Fit the model according to the given training data."):
+    return {
+        "key": f"Python: {module}.{name} - {docstring}",
+        "value": {"language": "python", "package": module.split(".")[0], "module": module,
+                  "function_name": name, "docstring": docstring,
+                  "parameters": [{"name": "self"}, {"name": "X"}, {"name": "y", "default": "None"}]}
+    }
+
+
+def test_same_named_methods_of_different_classes_stay_apart():
+    documents = [method("sklearn.linear_model.LinearRegression", "fit"),
+                 method("sklearn.cluster.KMeans", "fit"),
+                 method("sklearn.svm.SVC", "fit")]
+    # Identical embeddings: only the module keeps them apart
+    vectors = np.ones((3, 4), dtype=np.float32)
+    rows, groups = collapse_duplicates(documents, np.arange(3), vectors, threshold=0.97)
+    assert rows.tolist() == [0, 1, 2]
+    assert groups == {}
+
+
+def test_entries_for_one_method_are_collapsed():
+    documents = [method("sklearn.cluster.KMeans", "fit"),
+                 method("sklearn.cluster.KMeans", "fit", "Compute k-means clustering."),
+                 method("sklearn.svm.SVC", "fit")]
+    vectors = np.eye(3, dtype=np.float32)
+    rows, groups = collapse_duplicates(documents, np.arange(3), vectors, threshold=0.97)
+    assert rows.tolist() == [0, 2]
+    assert groups == {0: [1]}
+    fold_aliases(documents, groups)
+    assert documents[1] is None
+    assert documents[0]["aliases"][0]["module"] == "sklearn.cluster.KMeans"
+
+
+def test_alias_with_its_own_name_resolves_to_itself():
+    documents = [{"key": f"R: stats::{name} - The Normal Distribution",
+                  "value": {"language": "r", "package": "stats", "function_name": name,
+                            "docstring": "Density, distribution function, quantile function and random generation."}}
+                 for name in ("dnorm", "pnorm")]
+    # Keys one character apart embed almost identically
+    vectors = np.array([[1.0, 0.0, 0.0], [1.0, 0.01, 0.0]], dtype=np.float32)
+    rows, groups = collapse_duplicates(documents, np.arange(2), vectors, threshold=0.97)
+    assert groups == {0: [1]}
+    fold_aliases(documents, groups)
+
+    lexical = LexicalIndex.from_documents(documents, [doc["key"] if doc else "" for doc in documents])
+    assert lexical.exact_matches("pnorm").tolist() == [1]
+    assert lexical.exact_matches("stats::dnorm").tolist() == [0]
+    snapshot = IndexSnapshot(None, [], 0, 0, documents=documents, lexical=lexical)
+    assert snapshot.document(1)["value"]["function_name"] == "pnorm"
@@ -0,0 +1,17 @@
+from vector.embedding_cache import EmbeddingCache
+
+
+def test_prewarm_and_get_or_compute_embed_the_same_text():
+    seen = []
+
+    def compute(text):
+        seen.append(text)
+        return [float(len(seen))]
+
+    prewarmed = EmbeddingCache(max_memory_entries=10)
+    prewarmed.prewarm("model", ["  Linear   Regression "], lambda texts: [compute(text) for text in texts])
+    computed = EmbeddingCache(max_memory_entries=10)
+    computed.get_or_compute("model", "  Linear   Regression ", compute)
+
+    assert seen == ["linear regression", "linear regression"]
+    assert computed.get("model", "LINEAR regression") is not None
@@ -0,0 +1,22 @@
+from execution.result_cache import ExecutionCache
+
+
+def scraped(module, name):
+    # python_function_scraper records the top-level package and the full module
+    return {"language": "python", "package": module.split(".")[0], "module": module, "function_name": name}
+
+
+def test_scraped_scipy_stats_functions_are_pure():
+    cache = ExecutionCache(enabled=True)
+    for name in ("pearsonr", "ttest_ind", "describe"):
+        value = scraped("scipy.stats", name)
+        assert cache.is_pure(value["language"], value["package"], value["function_name"], value["module"])
+        key = cache.make_key(value["language"], value["package"], value["function_name"], {"x": [1, 2]},
+                             module=value["module"])
+        assert key.startswith(f"python:scipy.stats.{name}:")
+
+
+def test_methods_are_named_by_their_class_module():
+    cache = ExecutionCache(enabled=True)
+    value = scraped("statistics.NormalDist", "samples")
+    assert not cache.is_pure(value["language"], value["package"], value["function_name"], value["module"])
@@ -0,0 +1,12 @@
+import numpy as np
+import pytest
+
+from vector.index_builders import create_index, supported_params
+
+
+def test_float16_is_dropped_from_ivfpq_params():
+    params = {"vector_dtype": "float16", "pq_m": 8}
+    assert supported_params("ivfpq", params) == {"pq_m": 8}
+    assert supported_params("ivf", params) == params
+    with pytest.raises(ValueError):
+        create_index("ivfpq", np.zeros((64, 16), dtype=np.float32), vector_dtype="float16", pq_m=8)
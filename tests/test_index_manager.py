@@ -0,0 +1,100 @@
+import os
+import shutil
+import threading
+import types
+
+import faiss
+import numpy as np
+import pytest
+
+from vector import index_manager
+from vector.index_manager import INDEX_FILENAME, IndexManager, write_version_stamp
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(index_manager, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def vector_dir(vector_store, tmp_path):
+    # A private copy, so rewriting the index does not touch the shared one
+    path = tmp_path / "vectors"
+    shutil.copytree(vector_store.VECTOR_DIR, path)
+    return str(path)
+
+
+def save_smaller_index(vector_dir, version):
+    path = f"{vector_dir}/{INDEX_FILENAME}"
+    index = faiss.read_index(path)
+    index.remove_ids(np.array([0], dtype=np.int64))
+    # Saved like save_faiss_index: written aside, then swapped in
+    faiss.write_index(index, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    write_version_stamp(vector_dir, version)
+    return index.ntotal
+
+
+def test_saved_index_is_picked_up_after_the_check_interval(vector_dir, clock):
+    manager = IndexManager(vector_dir, check_interval=1.0)
+    first = manager.snapshot()
+    ntotal = save_smaller_index(vector_dir, "rebuilt")
+
+    clock[0] += 0.5
+    assert manager.snapshot() is first
+
+    clock[0] += 0.5
+    reloaded = manager.snapshot()
+    assert reloaded is not first
+    assert (reloaded.index.ntotal, reloaded.version) == (ntotal, "rebuilt")
+    assert first.index.ntotal == ntotal + 1
+
+
+def test_readers_keep_the_old_snapshot_during_a_reload(vector_dir, clock, monkeypatch):
+    manager = IndexManager(vector_dir)
+    first = manager.snapshot()
+    ntotal = save_smaller_index(vector_dir, "rebuilt")
+
+    loading, release = threading.Event(), threading.Event()
+    load = manager._load
+
+    def slow_load(mtime, version):
+        loading.set()
+        release.wait(5)
+        return load(mtime, version)
+
+    monkeypatch.setattr(manager, "_load", slow_load)
+    clock[0] += 1.0
+    reloader = threading.Thread(target=manager.snapshot)
+    reloader.start()
+    assert loading.wait(5)
+
+    manager.invalidate()
+    during = manager.snapshot()
+    assert during is first
+    distances, ids = during.search(np.zeros((1, during.index.d), dtype=np.float32), 3)
+    assert (ids >= 0).all()
+
+    release.set()
+    reloader.join(5)
+    assert manager.current.index.ntotal == ntotal
+
+
+@pytest.mark.parametrize("damage", ["corrupt", "partial"])
+def test_unreadable_index_keeps_the_current_snapshot(vector_dir, clock, damage):
+    manager = IndexManager(vector_dir)
+    first = manager.snapshot()
+
+    path = f"{vector_dir}/{INDEX_FILENAME}"
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(b"not a faiss index" * 8 if damage == "corrupt" else data[:len(data) // 2])
+    os.replace(f"{path}.tmp", path)
+    write_version_stamp(vector_dir, "broken")
+
+    clock[0] += 1.0
+    assert manager.snapshot() is first
+    assert first.index.ntotal == len(first.documents)
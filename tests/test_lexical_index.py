@@ -0,0 +1,53 @@
+import numpy as np
+
+from vector import lexical_index
+from vector.lexical_index import LexicalIndex, fuse_rankings, reciprocal_rank_fusion
+
+
+def entry(package, name, docstring):
+    return {"key": f"Python: {package}.{name} - {docstring}",
+            "value": {"language": "python", "package": package, "function_name": name, "docstring": docstring}}
+
+
+DOCUMENTS = [
+    entry("numpy", "mean", "Compute the arithmetic mean along the specified axis."),
+    entry("numpy", "median", "Compute the median along the specified axis."),
+    None,
+    entry("scipy.stats", "ttest_ind", "Calculate the T-test for the means of two independent samples."),
+    entry("statistics", "mean", "Return the sample arithmetic mean of data."),
+    entry("sklearn.cluster", "KMeans", "K-Means clustering."),
+]
+QUERIES = ["arithmetic mean", "median of the samples", "t-test for two samples", "clustering", "nothing here"]
+
+
+def test_search_many_matches_search():
+    lexical = LexicalIndex.from_documents(DOCUMENTS, [""] * len(DOCUMENTS))
+    for candidates in (None, np.array([0, 3, 4])):
+        ids, scores = lexical.search_many(QUERIES, top_k=3, candidates=candidates)
+        assert ids.shape == scores.shape == (len(QUERIES), 3)
+        for row, query in enumerate(QUERIES):
+            expected = lexical.search(query, top_k=3, candidates=candidates)
+            found = [(int(i), s) for i, s in zip(ids[row], scores[row]) if i >= 0]
+            assert [i for i, _ in found] == [i for i, _ in expected]
+            assert np.allclose([s for _, s in found], [s for _, s in expected])
+
+
+def test_fuse_rankings_matches_reciprocal_rank_fusion():
+    vector = np.array([[4, 0, 1, -1], [1, 0, 5, 3], [-1, -1, -1, -1]])
+    lexical = np.array([[0, 4, -1], [3, 1, 0], [5, -1, -1]])
+    fused = fuse_rankings([vector, lexical])
+    for row in range(len(vector)):
+        expected = reciprocal_rank_fusion([[i for i in vector[row] if i >= 0], [i for i in lexical[row] if i >= 0]])
+        assert fused[row] == [doc_id for doc_id, _ in expected]
+
+
+def test_dense_and_sparse_scoring_agree(monkeypatch):
+    lexical = LexicalIndex.from_documents(DOCUMENTS, [""] * len(DOCUMENTS))
+    results = []
+    for ratio in (len(DOCUMENTS), 0):
+        monkeypatch.setattr(lexical_index, "DENSE_POSTINGS_RATIO", ratio)
+        results.append([dict(lexical.search(query, top_k=10, candidates=candidates))
+                        for query in QUERIES for candidates in (None, np.array([0, 3, 4]))])
+    for dense, sparse in zip(*results):
+        assert dense.keys() == sparse.keys()
+        assert np.allclose([dense[i] for i in dense], [sparse[i] for i in dense])
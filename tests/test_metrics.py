@@ -0,0 +1,31 @@
+from agent.metrics import Registry
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("autods_requests_total", "Processed queries by outcome", ["outcome"])
+    seconds = registry.histogram("autods_search_seconds", "Time to search", ["language"], buckets=(0.1, 1.0))
+    loaded = registry.gauge("autods_faiss_index_loaded", "1 if an index is loaded")
+    loaded.set_function(lambda: 1)
+
+    requests.inc(outcome="success")
+    requests.inc(2, outcome='bad "args"\\\n')
+    for value in (0.05, 0.5, 3.0):
+        seconds.observe(value, language="python")
+
+    assert registry.render().splitlines() == [
+        "# HELP autods_requests_total Processed queries by outcome",
+        "# TYPE autods_requests_total counter",
+        'autods_requests_total{outcome="bad \\"args\\"\\\\\\n"} 2',
+        'autods_requests_total{outcome="success"} 1',
+        "# HELP autods_search_seconds Time to search",
+        "# TYPE autods_search_seconds histogram",
+        'autods_search_seconds_bucket{language="python",le="0.1"} 1',
+        'autods_search_seconds_bucket{language="python",le="1.0"} 2',
+        'autods_search_seconds_bucket{language="python",le="+Inf"} 3',
+        'autods_search_seconds_sum{language="python"} 3.55',
+        'autods_search_seconds_count{language="python"} 3',
+        "# HELP autods_faiss_index_loaded 1 if an index is loaded",
+        "# TYPE autods_faiss_index_loaded gauge",
+        "autods_faiss_index_loaded 1",
+    ]
@@ -0,0 +1,47 @@
+import pytest
+
+from catalog.param_schema import ParameterError, check_arguments, compile_param_schema
+
+
+def python_entry(*parameters):
+    return {"language": "python", "package": "numpy", "function_name": "savetxt",
+            "parameters": [{"name": name, "kind": "POSITIONAL_OR_KEYWORD", "default": default}
+                           for name, default in parameters]}
+
+
+def test_python_empty_string_default_is_optional():
+    # The scraper stores str(param.default), so header='' arrives as ""
+    schema = compile_param_schema(python_entry(("fname", None), ("X", None), ("fmt", "%.18e"),
+                                               ("header", ""), ("footer", "")))
+    assert schema["required"] == ["fname", "X"]
+    assert schema["defaults"]["header"] == ""
+    check_arguments(schema, {"fname": "out.txt", "X": [[1, 2]]})
+    with pytest.raises(ParameterError):
+        check_arguments(schema, {"fname": "out.txt"})
+
+
+def test_method_self_is_not_an_argument():
+    schema = compile_param_schema(python_entry(("self", None), ("X", None), ("y", "None")))
+    assert schema["names"] == ["X", "y"]
+    assert schema["required"] == ["X"]
+
+
+def test_r_formals_without_default_are_optional():
+    schema = compile_param_schema({"language": "r", "package": "stats", "function_name": "lm",
+                                   "arguments": ["formula", "data", "subset", "weights"],
+                                   "defaults": ["", "", "", ""]})
+    assert schema["required"] == []
+    check_arguments(schema, {"formula": "y ~ x", "data": "mtcars"})
+    with pytest.raises(ParameterError):
+        check_arguments(schema, {"formula": "y ~ x", "unknown": 1})
+
+
+def test_r_catalog_entries_pass_optional_formals_through():
+    # As stored by unify_database.py before "..." was listed in the arguments
+    t_test = {"language": "r", "package": "stats", "function_name": "t.test", "arguments": ["x", "y"],
+              "defaults": ["", "NULL"], "signature": "stats::t.test(x, y = NULL, ...)"}
+    check_arguments(compile_param_schema(t_test), {"x": [1, 2, 3], "mu": 1, "paired": False})
+    lm = {"language": "r", "package": "stats", "function_name": "lm", "arguments": ["formula", "data", "..."],
+          "defaults": ["", "", ""], "signature": "stats::lm(formula, data, ...)"}
+    check_arguments(compile_param_schema(lm), {"formula": "y ~ x", "data": "mtcars", "subset": "x > 1",
+                                               "weights": "w"})
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from vector.index_builders import create_index
+from vector.partitions import PartitionCache, normalize_filters
+from vector.shards import ShardedIndex, assign_shards
+
+MODULES = ["sklearn.cluster", "sklearn.svm", "scipy.stats"]
+
+
+@pytest.mark.parametrize("index_type", ["ivf", "hnsw"])
+def test_filter_inside_a_package_shard_searches_an_approximate_index(index_type):
+    rng = np.random.default_rng(0)
+    documents = [{"key": f"Python: {MODULES[i % 3]}.f{i}",
+                  "value": {"language": "python", "package": MODULES[i % 3].split(".")[0],
+                            "module": MODULES[i % 3], "function_name": f"f{i}"}} for i in range(600)]
+    vectors = rng.standard_normal((600, 16)).astype(np.float32)
+    ids = np.arange(600)
+    groups = assign_shards(documents, ids, "package")
+    index = ShardedIndex.build(groups, ids, lambda rows: create_index(index_type, vectors[rows], ids[rows]),
+                               "package", 16)
+
+    # No stored vectors: the Python shards are searched with an ID selector
+    partition = PartitionCache(index, documents).get(normalize_filters({"language": "python",
+                                                                        "module": "sklearn.cluster"}))
+    assert partition.shards == ["python-scipy", "python-sklearn"]
+    _, found = partition.search(vectors[:4], 5)
+    assert (found >= 0).all()
+    assert np.isin(found, partition.ids).all()
+
+
+@pytest.mark.parametrize("num_vectors, top_k", [(600, 10), (40, 10), (40, 50)])
+def test_sharded_search_matches_an_unsharded_flat_index(num_vectors, top_k):
+    rng = np.random.default_rng(1)
+    documents = [{"key": f"Python: pkg{i % 7}.f{i}", "value": {"language": "python", "package": f"pkg{i % 7}"}}
+                 for i in range(num_vectors)]
+    vectors = rng.standard_normal((num_vectors, 16)).astype(np.float32)
+    ids = rng.permutation(num_vectors)
+    groups = assign_shards(documents, ids, "hash", num_shards=8)
+    sharded = ShardedIndex.build(groups, ids, lambda rows: create_index("flat", vectors[rows], ids[rows]),
+                                 "hash", 16, num_shards=8)
+    flat = create_index("flat", vectors, ids)
+
+    queries = rng.standard_normal((20, 16)).astype(np.float32)
+    expected_distances, expected_ids = flat.search(queries, top_k)
+    distances, found = sharded.search(queries, top_k)
+    np.testing.assert_array_equal(found, expected_ids)
+    np.testing.assert_allclose(distances[found >= 0], expected_distances[expected_ids >= 0], rtol=1e-5)
+    assert np.isinf(distances[found < 0]).all()
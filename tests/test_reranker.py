@@ -0,0 +1,32 @@
+from vector import reranker
+
+
+def candidate(name, docstring, parameters):
+    return {"key": f"Python: stats.{name} - {docstring}",
+            "value": {"language": "python", "package": "stats", "function_name": name, "docstring": docstring,
+                      "signature": f"{name}({', '.join(p['name'] for p in parameters)})",
+                      "parameters": parameters}}
+
+
+CANDIDATES = [
+    candidate("histogram", "Compute a histogram of the values.", [{"name": "values", "default": None}]),
+    candidate("pearsonr", "Pearson correlation coefficient of two samples.",
+              [{"name": "x", "default": None}, {"name": "y", "default": None}]),
+]
+
+
+def test_features_reorder_candidates():
+    ranked = reranker.rerank("pearson correlation of x and y", CANDIDATES, {"x": [1, 2], "y": [2, 1]},
+                             budget_ms=1000.0)
+    assert [c["value"]["function_name"] for c in ranked] == ["pearsonr", "histogram"]
+
+
+def test_spent_budget_keeps_search_order_without_building_features(monkeypatch):
+    def fail(*_):
+        raise AssertionError("features built past the deadline")
+
+    monkeypatch.setattr(reranker, "_coverage", fail)
+    monkeypatch.setattr(reranker, "_arg_fit", fail)
+    ranked = reranker.rerank("pearson correlation of x and y", CANDIDATES, {"x": [1, 2], "y": [2, 1]},
+                             budget_ms=-1.0)
+    assert ranked == CANDIDATES
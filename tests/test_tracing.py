@@ -0,0 +1,32 @@
+import asyncio
+
+from agent import tracing
+
+
+def test_traced_request_nests_span_timings(vector_store, monkeypatch):
+    from agent.agent import process_query_async
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", True)
+
+    result = asyncio.run(process_query_async("geometric mean of the data", {"data": [1, 2, 4]}))
+
+    timings = result["timings"]
+    spans = {span["span_id"]: span for span in timings["spans"]}
+    by_name = {span["name"]: span for span in timings["spans"]}
+    root = by_name["process_query"]
+    assert root["parent_id"] is None
+    assert root["attributes"]["query"] == "geometric mean of the data"
+    assert timings["total_ms"] == root["duration_ms"]
+
+    # Spans opened in worker threads still join the request's trace
+    assert by_name["search"]["parent_id"] == root["span_id"]
+    assert by_name["index.snapshot"]["parent_id"] == by_name["search"]["span_id"]
+    assert by_name["infer_parameters"]["parent_id"] == root["span_id"]
+    assert set(timings["stages"]) == set(by_name)
+
+    # Each span runs inside its parent, allowing for rounding to 1 us
+    for span in timings["spans"]:
+        if span["parent_id"] is None:
+            continue
+        parent = spans[span["parent_id"]]
+        assert span["start_ms"] >= parent["start_ms"] - 0.001
+        assert span["start_ms"] + span["duration_ms"] <= parent["start_ms"] + parent["duration_ms"] + 0.002
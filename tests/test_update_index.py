@@ -0,0 +1,93 @@
+import copy
+
+import pytest
+
+from catalog.mongo_client import get_catalog
+from vector.embedding_store import compute_content_hash
+from vector.index_manager import IndexManager
+
+
+@pytest.fixture
+def update_env(vector_store, monkeypatch, tmp_path):
+    """
+    vector_store writing to a private directory over a catalog that is
+    restored afterwards, with embed_texts and index_from_store recorded.
+    """
+    catalog = get_catalog()
+    saved = copy.deepcopy(catalog.documents)
+    monkeypatch.setattr(vector_store, "VECTOR_DIR", str(tmp_path))
+
+    embedded, rebuilds = [], []
+    embed_texts, index_from_store = vector_store.embed_texts, vector_store.index_from_store
+
+    def recording_embed_texts(texts, batch_size=100):
+        embedded.extend(texts)
+        return embed_texts(texts, batch_size=batch_size)
+
+    def recording_index_from_store(*args, previous=None, **kwargs):
+        rebuilds.append(previous)
+        return index_from_store(*args, previous=previous, **kwargs)
+
+    monkeypatch.setattr(vector_store, "embed_texts", recording_embed_texts)
+    monkeypatch.setattr(vector_store, "index_from_store", recording_index_from_store)
+    yield vector_store, catalog, embedded, rebuilds
+    catalog.documents[:] = saved
+
+
+def edit_catalog(catalog):
+    """
+    Remove one entry, change the key of another, change only the value of a
+    third and add a new one. Returns (removed key, keys to embed, all keys).
+    """
+    docs = catalog.documents
+    removed = docs.pop(5)
+    changed = docs[6]
+    changed["key"] = changed["key"].replace(" - ", " - Rewritten summary. ", 1)
+    docs[7]["value"]["docstring"] += " Now with more detail."
+    added = copy.deepcopy(docs[8])
+    added["_id"] = max(doc["_id"] for doc in docs) + 1
+    added["value"]["function_name"] = "brand_new_function"
+    added["key"] = "Python: newpkg.brand_new_function - Estimate a brand new statistic from the data"
+    docs.append(added)
+    for doc in (changed, docs[7], added):
+        doc["content_hash"] = compute_content_hash(doc)
+    return removed["key"], [changed["key"], added["key"]], {doc["key"] for doc in docs}
+
+
+def top_keys(vs, snapshot, keys):
+    _, ids = snapshot.search(vs.embedding_provider.embed(keys), 1)
+    return [snapshot.document(int(idx))["key"] if idx >= 0 else None for idx in ids[:, 0]]
+
+
+@pytest.mark.parametrize("index_type, index_params, rebuilt", [
+    ("flat", {"dedup": False}, False),
+    ("flat", {}, False),
+    ("ivf", {"dedup": False, "nprobe": 1024}, False),
+    ("hnsw", {"dedup": False}, True),
+    ("flat", {"dedup": False, "shard_by": "package", "num_shards": 4}, True),
+])
+def test_update_adds_changes_and_removes_entries(update_env, index_type, index_params, rebuilt):
+    vs, catalog, embedded, rebuilds = update_env
+    assert vs.update_faiss_index(index_type, index_params)
+    embedded.clear()
+    rebuilds.clear()
+
+    removed_key, new_keys, catalog_keys = edit_catalog(catalog)
+    assert vs.update_faiss_index()
+
+    # Only new key text is embedded; the value-only change reuses its vector
+    assert embedded == new_keys
+    # HNSW cannot remove IDs and sharded indexes rebuild only changed shards
+    assert len(rebuilds) == int(rebuilt)
+    if index_params.get("shard_by"):
+        assert rebuilds[0] is not None
+
+    snapshot = IndexManager(vs.VECTOR_DIR).snapshot()
+    assert snapshot.meta["index_type"] == index_type
+    documents = [doc for doc in snapshot.documents if doc]
+    alias_keys = {alias["key"] for doc in documents for alias in doc.get("aliases", [])}
+    assert {doc["key"] for doc in documents} | alias_keys == catalog_keys
+    assert snapshot.index.ntotal == len(documents)
+    assert top_keys(vs, snapshot, new_keys) == new_keys
+    assert top_keys(vs, snapshot, [removed_key]) != [removed_key]
+    assert len(vs.EmbeddingStore.load(vs.VECTOR_DIR)) == len(catalog.documents)
@@ -0,0 +1,31 @@
+import asyncio
+
+
+def test_async_search_embeds_only_on_a_result_cache_miss(vector_store, monkeypatch):
+    embedded = []
+    aget_embeddings = vector_store.aget_embeddings
+
+    async def counting_aget_embeddings(texts, batch_size=100):
+        embedded.extend(texts)
+        return await aget_embeddings(texts, batch_size=batch_size)
+
+    monkeypatch.setattr(vector_store, "aget_embeddings", counting_aget_embeddings)
+    filters = {"language": "python"}
+
+    first = asyncio.run(vector_store.search_function_async("standard deviation of a sample", top_k=3,
+                                                           filters=filters, rerank=False))
+    assert embedded == ["standard deviation of a sample"]
+
+    # Same query after normalization, same filters: served from the result cache
+    again = asyncio.run(vector_store.search_function_async("  Standard deviation of a SAMPLE ", top_k=3,
+                                                           filters={"language": "Python"}, rerank=False))
+    assert embedded == ["standard deviation of a sample"]
+    assert [match["key"] for match in again] == [match["key"] for match in first]
+
+
+def test_semantic_cache_miss_is_embedded_once(vector_store):
+    before = vector_store.embedding_cache.stats()
+    vector_store.search_function("variance of a numeric sample", top_k=3, rerank=False)
+    after = vector_store.embedding_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["memory_hits"] + after["disk_hits"] == before["memory_hits"] + before["disk_hits"]